@@ -0,0 +1,53 @@
+"""
+Benchmark: calibration of classifier output
+===========================================
+Compares the per-prediction calibration loop (np.argmin over all bins for
+every prediction) with the vectorized nearest bin lookup in
+phenoai.utils.nearest_bin, as used by AInalysisResults.get_predictions, for
+10^6 predictions and 100 to 10,000 bins. The loop is timed on a subset of the
+predictions and extrapolated, as it takes minutes for the full set.
+
+Usage: python bench_calibration.py
+"""
+
+import time
+
+import numpy as np
+
+from phenoai import utils
+
+N_PREDICTIONS = 1000000
+N_LOOP = 10000
+
+
+def calibrate_loop(predictions, bins, values):
+    predscal = np.zeros(len(predictions))
+    for j, prediction in enumerate(predictions):
+        b = np.argmin(np.abs(bins - prediction))
+        predscal[j] = values[b]
+    return predscal
+
+
+def calibrate_vectorized(predictions, bins, values):
+    return values[utils.nearest_bin(predictions, bins)]
+
+
+if __name__ == "__main__":
+    rng = np.random.RandomState(0)
+    predictions = rng.rand(N_PREDICTIONS)
+    print("{} predictions (loop timed on {})".format(N_PREDICTIONS, N_LOOP))
+    print("{:>8s} {:>12s} {:>12s} {:>10s}".format(
+        "bins", "loop [s]", "vector [s]", "speedup"))
+    for n_bins in [100, 1000, 10000]:
+        bins = (np.arange(n_bins) + 0.5) / n_bins
+        values = rng.rand(n_bins)
+        start = time.perf_counter()
+        ref = calibrate_loop(predictions[:N_LOOP], bins, values)
+        t_loop = (time.perf_counter() - start) * N_PREDICTIONS / N_LOOP
+        start = time.perf_counter()
+        result = calibrate_vectorized(predictions, bins, values)
+        t_vector = time.perf_counter() - start
+        if not np.array_equal(ref, result[:N_LOOP]):
+            raise RuntimeError("Results of loop and vectorized lookup differ")
+        print("{:8d} {:12.2f} {:12.3f} {:10.0f}".format(
+            n_bins, t_loop, t_vector, t_loop / t_vector))
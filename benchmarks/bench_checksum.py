@@ -0,0 +1,102 @@
+"""
+Benchmark: checksums of an AInalysis folder
+===========================================
+Measures the throughput of phenoai.utils.calculate_ainalysis_checksums on a
+temporary AInalysis-like folder (a large estimator, a configuration, a
+functions.py and a nested folder of smaller files), hashing the files on a
+single thread and on a thread pool. The old implementation (serial 64 KiB
+reads, estimator hashed twice) is timed as a reference.
+
+Usage: python bench_checksum.py
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+from phenoai import utils
+
+ESTIMATOR_SIZE = 256 * 1024 * 1024
+N_SMALL = 200
+SMALL_SIZE = 64 * 1024
+REPEATS = 3
+
+
+def old_file_checksum(filepath):
+    crcvalue = 0
+    with open(filepath, "rb") as afile:
+        buffr = afile.read(65536)
+        while buffr:
+            crcvalue = zlib.crc32(buffr, crcvalue)
+            buffr = afile.read(65536)
+    return crcvalue
+
+
+def old_folder_checksum(folderpath):
+    crcvalue = 0
+    for root, subdirs, files in os.walk(folderpath):
+        for f in files:
+            if f != "checksums.sfv":
+                crcvalue += old_file_checksum("{}/{}".format(root, f))
+        for s in subdirs:
+            crcvalue += old_folder_checksum(folderpath + "/" + s)
+    return crcvalue
+
+
+def old_ainalysis_checksums(folder):
+    return {
+        "estimator": old_file_checksum(folder + "/estimator.pkl"),
+        "configuration.yaml": old_file_checksum(
+            folder + "/configuration.yaml"),
+        "functions.py": old_file_checksum(folder + "/functions.py"),
+        "total": old_folder_checksum(folder)
+    }
+
+
+def create_folder(folder):
+    with open(folder + "/estimator.pkl", "wb") as f:
+        for _ in range(ESTIMATOR_SIZE // (16 * 1024 * 1024)):
+            f.write(os.urandom(16 * 1024 * 1024))
+    for name in ["configuration.yaml", "functions.py"]:
+        with open(folder + "/" + name, "wb") as f:
+            f.write(os.urandom(4096))
+    os.makedirs(folder + "/data/sub")
+    for i in range(N_SMALL):
+        sub = "/data/sub" if i % 2 else "/data"
+        with open("{}{}/file{}.dat".format(folder, sub, i), "wb") as f:
+            f.write(os.urandom(SMALL_SIZE))
+
+
+def timed(function):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp()
+    try:
+        create_folder(folder)
+        size = ESTIMATOR_SIZE + N_SMALL * SMALL_SIZE + 2 * 4096
+        print("{:.0f} MiB in {} files, {} CPUs, best of {}".format(
+            size / 1024**2, N_SMALL + 3, os.cpu_count(), REPEATS))
+        print("{:>24s} {:>10s} {:>12s}".format("", "time [s]", "MiB/s"))
+        cases = [
+            ("old (serial, 64 KiB)", lambda: old_ainalysis_checksums(folder)),
+            ("new, 1 thread", lambda: utils.calculate_ainalysis_checksums(
+                folder, n_workers=1)),
+            ("new, thread pool", lambda: utils.calculate_ainalysis_checksums(
+                folder))
+        ]
+        for name, function in cases:
+            elapsed = timed(function)
+            print("{:>24s} {:10.3f} {:12.0f}".format(
+                name, elapsed, size / 1024**2 / elapsed))
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,62 @@
+"""
+Benchmark: import time
+======================
+Measures the time it takes to import PhenoAI in a fresh interpreter, for the
+package itself, for the PhenoAI class and for adding an AInalysis (optional,
+pass the path to an AInalysis folder). The time to start the interpreter
+without any imports is subtracted. Also lists which heavy libraries (machine
+learning libraries, requests, h5py, pyslha, matplotlib) were imported.
+
+Usage: python bench_import.py [ainalysis_folder] [n_repeats]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+AINALYSIS = sys.argv[1] if len(sys.argv) > 1 else None
+N_REPEATS = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+HEAVY_MODULES = ["numpy", "yaml", "sklearn", "tensorflow", "keras",
+                 "requests", "h5py", "pyslha", "matplotlib"]
+STATEMENTS = [("pass", "interpreter"),
+              ("import phenoai", "import phenoai"),
+              ("from phenoai import PhenoAI", "from phenoai import PhenoAI")]
+if AINALYSIS is not None:
+    STATEMENTS.append((("from phenoai import PhenoAI, logger\n"
+                        "logger.mute()\n"
+                        "PhenoAI().add({!r})").format(AINALYSIS),
+                       "PhenoAI().add(...)"))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = dict(os.environ)
+ENV["PYTHONPATH"] = ROOT
+
+
+def run(code):
+    """ Runs code in a fresh interpreter, returns elapsed time and modules """
+    code = ("import sys\n{}\nprint('MODULES:' + ','.join(m for m in {} if m "
+            "in sys.modules))").format(code, HEAVY_MODULES)
+    start = time.time()
+    output = subprocess.check_output([sys.executable, "-c", code], env=ENV)
+    elapsed = time.time() - start
+    line = [line for line in output.decode("utf-8").splitlines()
+            if line.startswith("MODULES:")][0]
+    return (elapsed, [m for m in line[len("MODULES:"):].split(",") if m])
+
+
+baseline = None
+for code, name in STATEMENTS:
+    times = []
+    for _ in range(N_REPEATS):
+        elapsed, modules = run(code)
+        times.append(elapsed)
+    median = np.median(times)
+    if baseline is None:
+        baseline = median
+        print("{:<30}{:>8.1f} ms".format(name, 1000 * median))
+        continue
+    print("{:<30}{:>8.1f} ms   imported: {}".format(
+        name, 1000 * (median - baseline), ", ".join(modules) or "-"))
@@ -0,0 +1,76 @@
+"""
+Benchmark: persistent connections to a PhenoAI server
+=====================================================
+Measures the number of small requests per second a client can make to a
+local PhenoAI server, with a new connection for every request (module level
+requests functions against a HTTP/1.0 handler, as before keep-alive support)
+and with persistent connections (a requests.Session against the HTTP/1.1
+PhenoAIRequestHandler, as used by PhenoAIClient). Both GET requests (as made
+by PhenoAIClient.check_connection) and small POST requests (requesting the
+configurations of zero AInalyses, so that no AInalysis is needed) are timed.
+
+Usage: python bench_keepalive.py
+"""
+
+import json
+import threading
+import time
+
+import requests
+
+from phenoai import core
+from phenoai import logger
+
+N_REQUESTS = 500
+PORT = 31499
+
+
+class HTTP10RequestHandler(core.PhenoAIRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HTTP11RequestHandler(core.PhenoAIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handler, port):
+    server = core.ThreadedHTTPServer(("localhost", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def requests_per_second(get, post, url):
+    data = {"mode": "configuration", "ainalysis_ids": json.dumps([])}
+    rates = []
+    for request in [lambda: get(url, timeout=5),
+                    lambda: post(url, data=data, timeout=5)]:
+        start = time.perf_counter()
+        for _ in range(N_REQUESTS):
+            request().raise_for_status()
+        rates.append(N_REQUESTS / (time.perf_counter() - start))
+    return rates
+
+
+if __name__ == "__main__":
+    logger.mute()
+    core.__serverinstance__ = core.PhenoAI()
+    old = start_server(HTTP10RequestHandler, PORT)
+    new = start_server(HTTP11RequestHandler, PORT + 1)
+    session = requests.Session()
+    cases = [
+        ("new connection", requests.get, requests.post,
+         "http://localhost:{}".format(PORT)),
+        ("keep-alive", session.get, session.post,
+         "http://localhost:{}".format(PORT + 1))
+    ]
+    print("{} requests per case".format(N_REQUESTS))
+    print("{:>16s} {:>10s} {:>10s}".format("", "GET [1/s]", "POST [1/s]"))
+    for name, get, post, url in cases:
+        print("{:>16s} {:10.0f} {:10.0f}".format(
+            name, *requests_per_second(get, post, url)))
+    old.shutdown()
+    new.shutdown()
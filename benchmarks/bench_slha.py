@@ -0,0 +1,112 @@
+"""
+Benchmark: reading .slha files
+==============================
+Compares reading [BLOCK, SWITCH] entries from .slha files via a full
+pyslha.Doc (fast=False) with the streaming extractor (fast=True). A set of
+spectrum files with the size and layout of a typical pMSSM spectrum (a few
+dozen blocks followed by decay tables for all sparticles) is generated in a
+temporary folder. The script checks that both methods give identical results.
+
+Usage: python bench_slha.py [n_files]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+
+from phenoai import io
+
+N_FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+PIDS = ([1000001 + i for i in range(6)] + [2000001 + i for i in range(6)] +
+        [1000011 + i for i in range(6)] + [2000011, 2000013, 2000015] +
+        [1000021, 1000022, 1000023, 1000024, 1000025, 1000035, 1000037,
+         24, 25, 35, 36, 37, 5, 6])
+READER_LIST = [["MINPAR", 1], ["MINPAR", 2], ["MINPAR", 3],
+               ["MASS", 1000022], ["MASS", 1000023], ["MASS", 1000024],
+               ["NMIX", [1, 1]], ["HMIX", 1]]
+
+
+def write_spectrum(path, rng):
+    lines = ["# SUSY Les Houches Accord 2 - benchmark spectrum",
+             "BLOCK SPINFO  # Spectrum calculator information",
+             "     1   SOFTSUSY    # spectrum calculator",
+             "     2   4.1.0       # version number",
+             "BLOCK MODSEL  # Select model",
+             "     1     0   # general MSSM",
+             "BLOCK SMINPUTS  # Standard Model inputs"]
+    for i in range(1, 8):
+        lines.append("     {}   {: .8e}   # SM input".format(
+            i, rng.uniform(0, 100)))
+    lines.append("BLOCK MINPAR  # Input parameters")
+    for i in range(1, 5):
+        lines.append("     {}   {: .8e}   # input".format(
+            i, rng.uniform(-1000, 1000)))
+    lines.append("BLOCK EXTPAR  # Input parameters")
+    for i in range(1, 50):
+        lines.append("   {:3d}   {: .8e}   # input".format(
+            i, rng.uniform(-3000, 3000)))
+    for name in ["NMIX", "UMIX", "VMIX", "STOPMIX", "SBOTMIX", "STAUMIX"]:
+        lines.append("BLOCK {}  # Mixing matrix".format(name))
+        n = 4 if name == "NMIX" else 2
+        for i in range(1, n + 1):
+            for j in range(1, n + 1):
+                lines.append("  {}  {}   {: .8e}   # {}_{}{}".format(
+                    i, j, rng.uniform(-1, 1), name, i, j))
+    lines.append("BLOCK ALPHA  # Effective Higgs mixing parameter")
+    lines.append("          {: .8e}   # alpha".format(rng.uniform(-1, 0)))
+    lines.append("BLOCK HMIX Q=  1.00000000e+03  # Higgs parameters")
+    for i in range(1, 5):
+        lines.append("     {}   {: .8e}   # HMIX".format(
+            i, rng.uniform(0, 1000)))
+    for name in ["GAUGE", "YU", "YD", "YE", "AU", "AD", "AE", "MSOFT"]:
+        lines.append("BLOCK {} Q=  1.00000000e+03  # Running".format(name))
+        for i in range(1, 4):
+            for j in range(1, 4):
+                lines.append("  {}  {}   {: .8e}   # {}".format(
+                    i, j, rng.uniform(-1000, 1000), name))
+    lines.append("BLOCK MASS  # Mass spectrum")
+    for pid in PIDS:
+        lines.append("  {:8d}   {: .8e}   # mass".format(
+            pid, rng.uniform(100, 3000)))
+    for pid in PIDS:
+        lines.append("DECAY  {:8d}   {: .8e}   # width".format(
+            pid, rng.uniform(0, 10)))
+        lines.append("#          BR         NDA      ID1       ID2")
+        for _ in range(12):
+            lines.append("     {: .8e}    2   {:8d}  {:8d}   # BR".format(
+                rng.uniform(0, 1), int(rng.choice(PIDS)),
+                int(rng.choice(PIDS))))
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def read_all(paths, fast):
+    start = time.perf_counter()
+    data = np.array([io.read_slha(p, READER_LIST, fast=fast) for p in paths])
+    return data, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp()
+    try:
+        rng = np.random.RandomState(0)
+        paths = []
+        for i in range(N_FILES):
+            paths.append(os.path.join(folder, "spectrum{:05d}.slha".format(i)))
+            write_spectrum(paths[-1], rng)
+        size = os.path.getsize(paths[0])
+        print("{} files of {:.1f} kB, {} entries per file".format(
+            N_FILES, size / 1024, len(READER_LIST)))
+        data_doc, t_doc = read_all(paths, False)
+        data_fast, t_fast = read_all(paths, True)
+        if not np.array_equal(data_doc, data_fast):
+            raise RuntimeError("Results of pyslha and extractor differ")
+        print("pyslha.Doc: {:8.2f} ms/file".format(1e3 * t_doc / N_FILES))
+        print("extractor:  {:8.2f} ms/file".format(1e3 * t_fast / N_FILES))
+        print("speedup:    {:8.1f}x".format(t_doc / t_fast))
+    finally:
+        shutil.rmtree(folder)
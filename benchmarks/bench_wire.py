@@ -0,0 +1,62 @@
+"""
+Benchmark: encoding of data sent to a PhenoAI server
+====================================================
+Compares the text encoding of data arrays sent by PhenoAIClient.predict
+(tolist, json.dumps and URL-encoding at the client, parse_qs and
+ast.literal_eval at the server) with the binary messages of
+phenoai.io.encode_binary and phenoai.io.decode_binary, for batches of 10
+parameters. Times are for encoding plus decoding, excluding the network.
+
+Usage: python bench_wire.py
+"""
+
+import ast
+import json
+import time
+import urllib.parse
+
+import numpy as np
+
+from phenoai import io
+
+N_PARAMETERS = 10
+REPEATS = 3
+
+
+def text_roundtrip(data):
+    body = urllib.parse.urlencode({"mode": "values",
+                                   "data": json.dumps(data.tolist())})
+    post = urllib.parse.parse_qs(body, keep_blank_values=1)
+    return np.array(ast.literal_eval(post["data"][0])), len(body)
+
+
+def binary_roundtrip(data):
+    body = io.encode_binary({"mode": "values"}, {"data": data})
+    return io.decode_binary(body)[1]["data"], len(body)
+
+
+def timed(function, data):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result, size = function(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result, size
+
+
+if __name__ == "__main__":
+    rng = np.random.RandomState(0)
+    print("{} parameters, best of {}".format(N_PARAMETERS, REPEATS))
+    print("{:>8s} {:>10s} {:>10s} {:>10s} {:>10s} {:>8s}".format(
+        "points", "text [s]", "text [MB]", "bin [s]", "bin [MB]", "speedup"))
+    for n_points in [1000, 10000, 100000]:
+        data = rng.rand(n_points, N_PARAMETERS)
+        t_text, r_text, s_text = timed(text_roundtrip, data)
+        t_bin, r_bin, s_bin = timed(binary_roundtrip, data)
+        if not np.array_equal(r_text, data) or not np.array_equal(r_bin,
+                                                                  data):
+            raise RuntimeError("Decoded data differs from the original")
+        print("{:8d} {:10.4f} {:10.2f} {:10.4f} {:10.2f} {:8.0f}".format(
+            n_points, t_text, s_text / 1e6, t_bin, s_bin / 1e6,
+            t_text / t_bin))
@@ -0,0 +1,55 @@
+"""
+Example 06c: Asynchronous remote client
+===============================================
+The client of example 06b waits for the server to respond before it sends its
+next request. If you need predictions on many batches of data (e.g. when
+scanning a parameter space), or if your code already runs in an asyncio event
+loop, the AsyncPhenoAIClient can send multiple requests to the server at the same
+time. Its methods are coroutines, so that your event loop keeps running while the
+server makes its predictions.
+This script shows how to use the phenoai.client module to query a server for its
+predictions asynchronously. To run this script, a server should be running and be
+accessible over the network from this machine (e.g. by running the server script
+of example 06a on the same machine).
+"""
+
+
+# Define server variables
+
+# IP and PORT should match the values used in the server script, see ex06b for
+# more information on them.
+IP = "127.0.0.1"
+PORT = 31415
+
+# CONCURRENCY is the maximum number of requests that is sent to the server at the
+# same time. Choose it in line with the number of requests the server can handle
+# in parallel (e.g. its number of worker processes).
+CONCURRENCY = 8
+
+
+# Define the coroutine that queries the server
+
+import asyncio
+import numpy as np
+from phenoai.client import AsyncPhenoAIClient
+
+async def main():
+    # Using the client as context manager closes its connections afterwards
+    async with AsyncPhenoAIClient(IP, PORT, concurrency=CONCURRENCY) as client:
+        # A single prediction works like the predict method of PhenoAIClient,
+        # except that it has to be awaited
+        X = np.random.rand(5,3)
+        results = await client.predict(data=X, map_data=False, data_ids=['a','b','c','e','d'])
+        results.summary()
+
+        # Multiple chunks of data are sent concurrently. The results are returned
+        # in the order of the chunks.
+        chunks = [np.random.rand(100,3) for _ in range(20)]
+        all_results = await client.predict_many(chunks)
+        print("Received results for {} chunks".format(len(all_results)))
+        all_results[-1].summary()
+
+
+# Run the coroutine in an event loop
+
+asyncio.run(main())
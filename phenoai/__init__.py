@@ -12,10 +12,39 @@ To load estimators, they have to be wrapped in a PhenoAI-specific format: an
 AInalysis. The .maker module allows the user to store estimators in this
 format."""
 
-from phenoai.__version__ import __version__, __versionnumber__, __versiondate__, __author__
-from phenoai.core import PhenoAI
-from phenoai.client import PhenoAIClient
-from phenoai.ainalyses import AInalysis
+import importlib
+
+from phenoai.__version__ import (__version__, __versionnumber__,
+                                 __versiondate__, __author__)
+
+# Classes available at package level and the modules implementing them. These
+# modules (and the libraries they depend on, like requests) are only imported
+# when the class is first accessed, to keep `import phenoai` fast.
+_LAZY_ATTRIBUTES = {
+    "PhenoAI": "core",
+    "PhenoAIClient": "client",
+    "AInalysis": "ainalyses"
+}
+_SUBMODULES = ["ainalyses", "batcher", "client", "containers", "core",
+               "estimatorpool", "estimators", "exceptions", "filecache", "io",
+               "logger", "maker", "updatechecker", "utils"]
+
+
+def __getattr__(name):
+    """ Imports the classes available at package level and the submodules of
+    the package on first access """
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module("phenoai." + _LAZY_ATTRIBUTES[name])
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module("phenoai." + name)
+    raise AttributeError("module 'phenoai' has no attribute '{}'".format(name))
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES) + _SUBMODULES)
 
 
 try:
@@ -63,14 +92,28 @@ except Exception:
                          "Contact: b.stienen@science.ru.nl"))
 
 
-def check_updates():
+def check_updates(mode=None):
     """ Calls :func:`phenoai.updatechecker.check_phenoai_update` and shows
-    output """
+    output
+
+    Parameters
+    ----------
+    mode: :obj:`bool`, :obj:`str`, `None`. Optional
+        Mode of the update check, see
+        :func:`phenoai.updatechecker.get_mode`. Default is `None`. """
 
     # Check for package updates
     from phenoai import updatechecker
-    error, _, txt = updatechecker.check_phenoai_update()
-    if not error:
-        print(txt+"\n")
-    else:
-        print("Could not check for updates, because: "+txt+"\n")
+
+    def show(error, _, txt):
+        if not error:
+            print(txt+"\n")
+        else:
+            print("Could not check for updates, because: "+txt+"\n")
+
+    mode = updatechecker.get_mode(mode)
+    if mode == "background":
+        updatechecker.check_in_background(updatechecker.check_phenoai_update,
+                                          callback=show)
+    elif mode == "sync":
+        show(*updatechecker.check_phenoai_update())
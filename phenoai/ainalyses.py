@@ -15,10 +15,9 @@ directly on AInalysis folders, it is in many cases advisable to use instances
 of :obj:`phenoai.core.PhenoAI` as interface instead. """
 
 import os
-import importlib.machinery
-import importlib.util
+import threading
 from inspect import signature
-from copy import deepcopy
+from copy import copy, deepcopy
 
 import numpy as np
 
@@ -31,6 +30,44 @@ from phenoai import logger
 from phenoai import updatechecker
 from phenoai import utils
 
+# Policies for the validation of the checksums of an AInalysis on loading
+CHECKSUM_POLICIES = ["full", "cached", "lazy", "background", "trusted"]
+
+
+def get_checksum_policy(policy=None):
+    """ Returns the policy for validating checksums of AInalyses on loading
+
+    Available policies are
+
+    - "full": all files are read and checked on loading;
+    - "cached": as "full", but checksums of files that did not change (same
+      size, modification time and inode) are taken from the checksum cache
+      (see :func:`phenoai.utils.cached_file_checksum`);
+    - "lazy": checksums are checked (with cache) when the AInalysis is run
+      for the first time instead of on loading;
+    - "background": checksums are checked (with cache) on a background
+      thread, so that loading is not delayed;
+    - "trusted": checksums are not checked at all.
+
+    Parameters
+    ----------
+    policy: :obj:`str`, `None`. Optional
+        Requested policy. If `None`, the policy is read from the environment
+        variable `PHENOAI_CHECKSUM_VALIDATION`, defaulting to "cached".
+        Default is `None`.
+
+    Returns
+    -------
+    policy: :obj:`str`
+        The checksum validation policy. """
+    if policy is None:
+        policy = os.environ.get("PHENOAI_CHECKSUM_VALIDATION", "cached")
+    if policy not in CHECKSUM_POLICIES:
+        raise exceptions.AInalysisException(
+            "Unknown checksum validation policy '{}', use one of {}.".format(
+                policy, CHECKSUM_POLICIES))
+    return policy
+
 
 class AInalysis:
     """ Main data juggler class, dealing with dataflows from and to estimators
@@ -56,9 +93,40 @@ class AInalysis:
     estimator: :obj:`phenoai.containers.Estimator`
         The estimator of the AInalysis.
     folder: :obj:`str`
-        Path to the AInalysis folder"""
-
-    def __init__(self, folder, ainalysis_id=None, load_estimator=True):
+        Path to the AInalysis folder
+    functions: :obj:`module`, `None`
+        Cached functions.py module of the AInalysis, see
+        :meth:`~phenoai.ainalyses.AInalysis.get_functions`. `None` if the
+        module was not loaded yet.
+    functions_cache_validation: :obj:`str`
+        How the cached functions.py module is checked for changes of the file
+        on disk: "mtime" (modification time and file size) or "checksum"
+        (crc32 of the file content). Default is "mtime".
+    functions_cache_hits: :obj:`int`
+        Number of times the cached functions.py module could be reused.
+    functions_cache_misses: :obj:`int`
+        Number of times functions.py had to be (re)executed.
+    read_workers: :obj:`int`
+        Default number of worker processes used by
+        :meth:`~phenoai.ainalyses.AInalysis.read_files`. Default is 1 (files
+        are read in the current process).
+    read_chunksize: :obj:`int`, `None`
+        Default number of files sent to a worker process at once by
+        :meth:`~phenoai.ainalyses.AInalysis.read_files`. Default is `None`,
+        letting :func:`phenoai.io.read_files` decide.
+    file_cache: :obj:`phenoai.filecache.FileCache`, `None`
+        Persistent cache consulted by
+        :meth:`~phenoai.ainalyses.AInalysis.read_files` before reading files.
+        Default is `None` (no cache).
+    check_updates: :obj:`bool`, :obj:`str`, `None`
+        Mode of the update check on loading, see
+        :func:`phenoai.updatechecker.get_mode`. Default is `None`.
+    checksum_validation: :obj:`str`, `None`
+        Policy for validating the checksums on loading, see
+        :func:`phenoai.ainalyses.get_checksum_policy`. Default is `None`."""
+
+    def __init__(self, folder, ainalysis_id=None, load_estimator=True,
+                 check_updates=None, checksum_validation=None):
         """ Initialises the object
 
         Parameters
@@ -75,15 +143,54 @@ class AInalysis:
             initialization of the AInalysis object. If set to `False` the
             estimator will be loaded on running of the AInalysis. Default is
             `True`.
+        check_updates: :obj:`bool`, :obj:`str`, `None`, optional
+            Mode of the check for updates of the AInalysis when it is loaded:
+            `True` or "sync" (check right away), "background" (check on a
+            background thread without delaying loading) or `False` or "off"
+            (no check). If `None`, the mode is taken from the environment
+            (see :func:`phenoai.updatechecker.get_mode`). Default is `None`.
+        checksum_validation: :obj:`str`, `None`, optional
+            Policy for validating the checksums of the AInalysis on loading:
+            "full", "cached", "lazy", "background" or "trusted". If `None`,
+            the policy is taken from the environment (see
+            :func:`phenoai.ainalyses.get_checksum_policy`). Default is
+            `None`.
         """
         self.ainalysis_id = ainalysis_id
+        self.check_updates = check_updates
+        self.checksum_validation = checksum_validation
+        self._checksum_pending = False
         self.folder = None
         self.estimator = None
+        self.functions = None
+        self.functions_cache_validation = "mtime"
+        self.functions_cache_hits = 0
+        self.functions_cache_misses = 0
+        self._functions_stamp = None
+        self.read_workers = 1
+        self.read_chunksize = None
+        self.file_cache = None
         self.configuration = AInalysisConfiguration()
         self.load(folder, load_estimator)
         if self.ainalysis_id is None:
             self.ainalysis_id = self.configuration["defaultid"]
 
+    def __getstate__(self):
+        """ Returns the state of the AInalysis for pickling
+
+        The cached functions.py module cannot be pickled and a loaded
+        estimator can be large, so neither is included: both are loaded again
+        from the AInalysis folder when needed. This allows AInalyses to be
+        sent to worker processes efficiently (see
+        :class:`phenoai.core.PhenoAI`). """
+        state = self.__dict__.copy()
+        state["functions"] = None
+        state["_functions_stamp"] = None
+        if self.estimator is not None and self.estimator.is_loaded():
+            state["estimator"] = copy(self.estimator)
+            state["estimator"].est = None
+        return state
+
     def load(self, folder, load_estimator=True):
         """ Loads the configuration from the AInalysis (and the estimator as
         well, if requested) into memory
@@ -106,9 +213,24 @@ class AInalysis:
         if folder[-1] == "/":
             folder = folder[:-1]
         self.folder = folder
+        self.clear_functions_cache()
         # Load and validate configuration
         self.configuration.load(self.folder + "/configuration.yaml")
-        self.configuration.validate()
+        policy = get_checksum_policy(self.checksum_validation)
+        self.configuration.validate(
+            validate_checksum=policy in ["full", "cached"],
+            use_cache=policy == "cached")
+        self._checksum_pending = False
+        if policy == "lazy":
+            logger.debug("Checksums will be validated on first run")
+            self._checksum_pending = True
+        elif policy == "background":
+            logger.debug("Validating checksums in the background")
+            threading.Thread(target=self.configuration.validate_checksum,
+                             kwargs={"use_cache": True},
+                             name="phenoai-checksums", daemon=True).start()
+        elif policy == "trusted":
+            logger.debug("AInalysis is trusted, checksums are not validated")
         # Initialize estimator
         logger.set_indent("+")
         estfac = estimators.EstimatorFactory()
@@ -138,13 +260,53 @@ class AInalysis:
             provided information in the AInalysis folder. """
         if not self.configuration.validated:
             self.configuration.validate()
+        if self._checksum_pending:
+            self._checksum_pending = False
+            self.configuration.validate_checksum(use_cache=True)
         if not self.estimator.is_loaded():
             self.estimator.load()
         if not self.configuration.validated or not self.estimator.is_loaded():
             return False
         return True
 
-    def read_files(self, paths):
+    def get_functions(self):
+        """ Returns the functions.py module of the AInalysis
+
+        The functions.py file is executed only once and the resulting module
+        is cached on the AInalysis. On every call the file on disk is compared
+        to the cached version (by modification time and size or by checksum,
+        see :attr:`~phenoai.ainalyses.AInalysis.functions_cache_validation`),
+        so that edits to functions.py are picked up without reloading the
+        AInalysis.
+
+        Returns
+        -------
+        functions: :obj:`module`
+            The (cached) functions.py module of this AInalysis. """
+        path = self.folder + "/functions.py"
+        if self.functions_cache_validation == "checksum":
+            stamp = utils.calculate_file_checksum(path, False)
+        else:
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        if self.functions is not None and stamp == self._functions_stamp:
+            self.functions_cache_hits += 1
+            return self.functions
+        logger.debug("Loading functions.py of AInalysis '{}'".format(
+            self.ainalysis_id))
+        self.functions_cache_misses += 1
+        self.functions = utils.load_module(path)
+        self._functions_stamp = stamp
+        return self.functions
+
+    def clear_functions_cache(self):
+        """ Removes the cached functions.py module, forcing it to be executed
+        again the next time it is needed. Cache counters are not reset. """
+        self.functions = None
+        self._functions_stamp = None
+
+    def read_files(self, paths, n_workers=None, chunksize=None,
+                   return_failures=False):
         """ Reads the content from requested files following the definitions
         provided in the AInalysis configuration.
 
@@ -154,10 +316,31 @@ class AInalysis:
         it), a :exc:`phenoai.exceptions.AInalysisException` is raised. Else the
         defined filereader if used to extract data from the provided files.
 
+        Files can be read in parallel by a pool of worker processes by setting
+        `n_workers` (or the
+        :attr:`~phenoai.ainalyses.AInalysis.read_workers` attribute) to a
+        value larger than 1. Files that could not be read do not abort the
+        reading of the other files: their row in the returned array is filled
+        with `NaN` and a warning is logged.
+
+        If a :obj:`phenoai.filecache.FileCache` is set as the
+        :attr:`~phenoai.ainalyses.AInalysis.file_cache` attribute, files of
+        which the content is in the cache are not read again and the content
+        of newly read files is added to the cache.
+
         Parameters
         ----------
         paths: :obj:`str`, :obj:`list(str)` Locations of the files that should
-            be read.
+            be read. Buffers with the content of files are accepted as well
+            (see :func:`phenoai.io.is_buffer`).
+        n_workers: :obj:`int`, `None`, optional Number of worker processes
+            used to read the files. If `None`, the value of the read_workers
+            attribute is used. Default is `None`.
+        chunksize: :obj:`int`, `None`, optional Number of files sent to a
+            worker process at once. If `None`, the value of the
+            read_chunksize attribute is used. Default is `None`.
+        return_failures: :obj:`bool`, optional If `True`, the list of files
+            that could not be read is returned as well. Default is `False`.
 
         Returns
         -------
@@ -165,57 +348,117 @@ class AInalysis:
             provided files. Shape of the numpy array will be `(x, y)`, where
             `x` is the number of provided files and `y` the number of
             parameters defined for this AInalysis (as defined in the parameters
-            value in the configuration card). """
+            value in the configuration card). failures: :obj:`list(tuple)`
+            List of `(index, path, message)` tuples for all files that could
+            not be read. Only returned if `return_failures` is `True`. """
 
         # Check if file reading is enabled
         if (self.configuration["filereader"] is None
                 or self.configuration["filereader"] is False):
             raise exceptions.AInalysisException(
                 ("AInalysis {} has no file reader.").format(self.ainalysis_id))
-        # Initialize reader by function if necessary
-        if self.configuration["filereader"] == "function":
-            loader = importlib.machinery.SourceFileLoader(
-                'module', self.folder + "/functions.py")
-            spec = importlib.util.spec_from_loader(loader.name, loader)
-            functions = importlib.util.module_from_spec(spec)
-            loader.exec_module(functions)
+        if n_workers is None:
+            n_workers = self.read_workers
+        if chunksize is None:
+            chunksize = self.read_chunksize
         # Make paths to list if a string
-        if isinstance(paths, str):
+        if isinstance(paths, str) or io.is_buffer(paths):
             paths = [paths]
-        # Loop over paths
         logger.debug("AInalysis '{}' is reading {} file(s)".format(
             self.ainalysis_id, len(paths)))
-        data = None
-        warning_given = False
-        for i, path in enumerate(paths):
-            # Check if file extension is in format list
-            if (isinstance(self.configuration["filereader.formats"], list)
-                    and not warning_given):
-                found = False
-                for f in self.configuration["filereader.formats"]:
-                    if path.endswith(f):
-                        found = True
-                if not found:
-                    logger.warning(
-                        ("One or more files did not have the defined "
-                         "extension for file reading: {}. This might yield "
-                         "errors later in the program.").format(
-                             self.configuration["filereader.formats"]))
-            # Get data from file
+        self.check_file_formats(paths)
+        # Select reader: worker processes load functions.py themselves
+        if self.configuration["filereader"] == "function":
+            if n_workers > 1:
+                reader = self.folder + "/functions.py"
+            else:
+                reader = self.get_functions().read
+        else:
+            reader = self.configuration["filereader"]
+        # Get data from files
+        n_parameters = len(self.configuration["parameters"])
+        if self.file_cache is not None:
             if self.configuration["filereader"] == "function":
-                d = functions.read(path)
-            elif isinstance(self.configuration["filereader"], list):
-                d = io.read_slha(path, self.configuration["filereader"])
-            # Create data array if not existing
-            if data is None:
-                data = np.zeros((len(paths), len(d)))
-            # Add new data to data array
-            data[i, :] = d
+                signature = self.file_cache.signature(
+                    self.folder + "/functions.py", n_parameters)
+            else:
+                signature = self.file_cache.signature(reader, n_parameters)
+            data, failures = self.file_cache.read_files(
+                paths, reader, n_parameters, n_workers, chunksize, signature)
+        else:
+            data, failures = io.read_files(paths, reader, n_parameters,
+                                           n_workers, chunksize)
+        self.log_read_failures(paths, failures)
         # Return data to user
         logger.debug("Files read")
+        if return_failures:
+            return (data, failures)
         return data
 
-    def map_data(self, data):
+    def check_file_formats(self, paths):
+        """ Checks if the extensions of files are in the `filereader.formats`
+        entry of the AInalysis configuration. If not, a warning is logged.
+
+        Parameters
+        ----------
+        paths: :obj:`list(str)` Locations of the files to check. """
+        formats = self.configuration["filereader.formats"]
+        if isinstance(formats, list):
+            for path in paths:
+                path = io.source_name(path)
+                if path is not None and not path.endswith(tuple(formats)):
+                    logger.warning(
+                        ("One or more files did not have the defined "
+                         "extension for file reading: {}. This might yield "
+                         "errors later in the program.").format(formats))
+                    break
+
+    def log_read_failures(self, paths, failures):
+        """ Logs files that could not be read
+
+        Parameters
+        ----------
+        paths: :obj:`list(str)` Locations of all files that were read.
+        failures: :obj:`list(tuple)` List of `(index, path, message)` tuples
+            for the files that could not be read. """
+        if failures:
+            logger.warning("{} of {} file(s) could not be read".format(
+                len(failures), len(paths)))
+            logger.set_indent("+")
+            for _, path, message in failures:
+                logger.debug("{}: {}".format(io.source_name(path) or "buffer",
+                                             message))
+            logger.set_indent("-")
+
+    def drop_read_failures(self, data, paths, failures):
+        """ Removes the rows of files that could not be read
+
+        Parameters
+        ----------
+        data: :obj:`numpy.ndarray` Data read from the files, one row per file.
+        paths: :obj:`list(str)` Locations of the files, used as data IDs.
+        failures: :obj:`list(tuple)` List of `(index, path, message)` tuples
+            for the files that could not be read.
+
+        Returns
+        -------
+        data: :obj:`numpy.ndarray` Data of the files that could be read.
+        data_ids: :obj:`list(str)` Locations of the files that could be
+            read. Buffers are identified by their name, or by their position
+            if they have no name. """
+        data_ids = [io.source_name(path) or "buffer{}".format(i)
+                    for i, path in enumerate(paths)]
+        if not failures:
+            return (data, data_ids)
+        if len(failures) == len(data):
+            raise exceptions.AInalysisException(
+                "None of the provided files could be read.")
+        # Continue with the files that could be read
+        keep = np.ones(len(data), dtype=bool)
+        keep[[failure[0] for failure in failures]] = False
+        return (data[keep], [data_ids[i] for i in np.flatnonzero(keep)])
+
+    def map_data(self, data, in_place=False):
         """ Maps provided data
 
         Maps provided data to the inside of the training region. The mapping
@@ -224,10 +467,18 @@ class AInalysis:
         configuration and the documentation documentation for the mapping
         procedure for more information.
 
+        If the mapping is defined by a floating point number, all parameters
+        are clipped to the mapping target area at once, using the bounds
+        precomputed at validation of the configuration (see
+        :meth:`~phenoai.ainalyses.AInalysisConfiguration.get_mapping_bounds`).
+
         Parameters
         ----------
         data: :obj:`numpy.ndarray` Numpy array of shape (nDatapoints,
             nParameters) containing the data to be mapped
+        in_place: :obj:`bool`, optional Map the provided array itself instead
+            of a copy of it. Only has effect for mapping via a floating point
+            number and arrays with a floating point dtype. Default is `False`.
 
         Returns
         -------
@@ -247,41 +498,29 @@ class AInalysis:
                 or self.configuration["mapping"] is None):
             logger.debug("Mapping is not enabled, returning data unaltered")
             return (data, False)
-        mapped = deepcopy(data)
+        data = np.asarray(data)
         # If mapping is "function" send data to map function and return
         # its result
         if self.configuration["mapping"] == "function":
             logger.debug("Data mapping by function")
-            loader = importlib.machinery.SourceFileLoader(
-                'module', self.folder + "/functions.py")
-            spec = importlib.util.spec_from_loader(loader.name, loader)
-            functions = importlib.util.module_from_spec(spec)
-            loader.exec_module(functions)
-
-            mapped = functions.mapping(mapped,
+            functions = self.get_functions()
+            mapped = functions.mapping(deepcopy(data),
                                        self.configuration["parameters"])
+            has_changed = (np.sum(np.equal(mapped, data) * 1.0, axis=-1) !=
+                           len(self.configuration["parameters"]))
         # If mapping is a floating point, perform SUSY-AI mapping
         elif isinstance(self.configuration["mapping"], float):
             logger.debug("Data mapping by mapping list")
-            for i in range(len(self.configuration["parameters"])):
-                newmax = (self.configuration["parameters"][i][3] -
-                          self.configuration["mapping"] *
-                          self.configuration["mapping"])
-                newmin = (self.configuration["parameters"][i][2] +
-                          self.configuration["mapping"] *
-                          self.configuration["mapping"])
-                if len(mapped.shape) > 1:
-                    mapped[mapped[:, i] < newmin, i] = newmin
-                    mapped[mapped[:, i] > newmax, i] = newmax
-                else:
-                    mapped[i] = newmin
-                    mapped[i] = newmax
+            mins, maxs = self.configuration.get_mapping_bounds()
+            has_changed = np.any((data < mins) | (data > maxs), axis=-1)
+            if in_place and np.issubdtype(data.dtype, np.floating):
+                mapped = np.clip(data, mins, maxs, out=data)
+            else:
+                mapped = np.clip(data, mins, maxs)
         # Raise exception if mapping mode not understood
         else:
             raise exceptions.AInalysisException(
                 "Mapping mode was not recognized. Could not map data.")
-        has_changed = (np.sum(np.equal(mapped, data) * 1.0, axis=1) != len(
-            self.configuration["parameters"]))
         logger.debug("Data is mapped, returning results")
         return (mapped, has_changed)
 
@@ -304,7 +543,9 @@ class AInalysis:
         data: :obj:`numpy.ndarray`, :obj:`str`, :obj:`list(str)` Data that has
             to be subjected to the estimator. Can be the raw data
             (numpy.ndarray), the location of a file to be read by the built-in
-            file reader in the AInalysis or a list of file locations. map_data:
+            file reader in the AInalysis or a list of file locations. Buffers
+            with the content of files can be used instead of locations.
+            map_data:
             :obj:`bool`, optional Determines if data has to be mapped before
             prediction. Mapping uses the map_data method of this AInalysis and
             follows the mapping procedure defined in the configuration file for
@@ -325,12 +566,14 @@ class AInalysis:
         # preprocessing
         logger.info("Running AInalysis '{}'".format(self.ainalysis_id))
         logger.debug("Validating input data type and length")
-        if isinstance(data, str):
+        if isinstance(data, str) or io.is_buffer(data):
             data = [data]
         if isinstance(data, list):
-            if isinstance(data[0], str):
-                data_ids = data
-                data = self.read_files(data)
+            if isinstance(data[0], str) or io.is_buffer(data[0]):
+                paths = data
+                data, failures = self.read_files(paths, return_failures=True)
+                data, data_ids = self.drop_read_failures(data, paths,
+                                                         failures)
             else:
                 data = np.array(data)
         # Check data shape
@@ -368,7 +611,7 @@ class AInalysis:
         # Map data if requested
         if map_data:
             logger.info("Mapping data")
-            data, mapped = self.map_data(data)
+            data, mapped = self.map_data(data, in_place=True)
         else:
             mapped = False
         # Create result object
@@ -376,11 +619,7 @@ class AInalysis:
                                              self.configuration, data,
                                              data_ids, mapped)
         # Perform data transformation
-        loader = importlib.machinery.SourceFileLoader(
-            'module', self.folder + "/functions.py")
-        spec = importlib.util.spec_from_loader(loader.name, loader)
-        functions = importlib.util.module_from_spec(spec)
-        loader.exec_module(functions)
+        functions = self.get_functions()
         if "transform" in dir(functions):
             logger.debug("Transforming data")
             data = functions.transform(data)
@@ -403,7 +642,56 @@ class AInalysis:
         logger.info("Prediction finished, result returned")
         return result
 
-    def check_for_update(self, print_info=True):
+    def run_iter(self, data, map_data=False, data_ids=None, chunksize=10000):
+        """ Runs the AInalysis over a stream of data in chunks
+
+        Generator version of :meth:`~phenoai.ainalyses.AInalysis.run`. The
+        data is split into chunks of at most `chunksize` data points or file
+        paths (see :func:`phenoai.utils.iter_chunks`), which are run one after
+        another. The results of every chunk are yielded as soon as they are
+        available, so that only one chunk of data and results is held in
+        memory at a time. The estimator is loaded once for the whole stream
+        and, if it was not loaded before, cleared when the stream is finished
+        (or the generator is closed).
+
+        Parameters
+        ----------
+        data: :obj:`numpy.ndarray`, :obj:`str`, :obj:`list(str)`, iterable
+            Data that has to be subjected to the estimator. Can be the raw
+            data (numpy.ndarray), the location of a file, a list of file
+            locations or an iterable (e.g. a generator) yielding any of
+            these.
+        map_data: :obj:`bool`, optional
+            Determines if data has to be mapped before prediction. Default is
+            `False`.
+        data_ids: iterable, optional
+            IDs for the data points, consumed in the same order as the data.
+            If `None` and files are read, the file paths are used as IDs.
+            Default is `None`.
+        chunksize: :obj:`int`, optional
+            Maximum number of data points or files per chunk. Default is
+            10000.
+
+        Yields
+        ------
+        result: :obj:`phenoai.containers.AInalysisResults`
+            Results for a single chunk of data. """
+        logger.info("Running AInalysis '{}' over data stream".format(
+            self.ainalysis_id))
+        estimator_was_loaded = self.estimator.is_loaded()
+        if not self.can_run():
+            raise exceptions.AInalysisException(
+                "Cannot run AInalysis {}".format(self.ainalysis_id))
+        try:
+            for chunk, chunk_ids in utils.iter_chunks(data, chunksize,
+                                                      data_ids):
+                yield self.run(chunk, map_data, chunk_ids)
+        finally:
+            if not estimator_was_loaded:
+                logger.debug("Clearing estimator from memory")
+                self.estimator.clear()
+
+    def check_for_update(self, print_info=True, check_updates=None):
         """ Checks for update of the AInalysis
 
         Uses the :func:`phenoai.updatechecker.check_ainalysis_update` function
@@ -412,10 +700,19 @@ class AInalysis:
         is used. If an update is found, this is communicated to the user via
         the logger module.
 
+        Depending on the update check mode (see
+        :func:`phenoai.updatechecker.get_mode`) the check is skipped, done
+        right away or done on a background thread, in which case the result
+        is logged when it arrives. Answers of the server are cached on disk.
+
         Parameters
         ----------
         print_info: :obj:`bool`, optional Boolean indicating if information
             should be printed to terminal. Default is `True`.
+        check_updates: :obj:`bool`, :obj:`str`, `None`, optional Mode of the
+            update check. If `None`, the
+            :attr:`~phenoai.ainalyses.AInalysis.check_updates` attribute is
+            used. Default is `None`.
 
         Returns
         -------
@@ -433,9 +730,27 @@ class AInalysis:
             return (True, None, ("no uniquedbid defined in configuration, no "
                                  "update checking will be performed"))
 
-        error, updatable, txt = updatechecker.check_ainalysis_update(
-            self.configuration["unique_db_id"],
-            self.configuration["ainalysisversion"])
+        if check_updates is None:
+            check_updates = self.check_updates
+        mode = updatechecker.get_mode(check_updates)
+        if mode == "off":
+            logger.debug("Update checks are turned off")
+            return (True, None, "update checks are turned off")
+        args = (self.configuration["unique_db_id"],
+                self.configuration["ainalysisversion"])
+        if mode == "background":
+            def report(error, updatable, txt):
+                if error:
+                    logger.debug(("Could not check for updates of AInalysis "
+                                  "'{}', because: {}").format(
+                                      self.ainalysis_id, txt))
+                elif updatable:
+                    logger.warning("\n" + txt)
+            logger.debug("Checking for updates in the background")
+            updatechecker.check_in_background(
+                updatechecker.check_ainalysis_update, args, report)
+            return (False, None, "update check is running in the background")
+        error, updatable, txt = updatechecker.check_ainalysis_update(*args)
         if print_info:
             print("""\n
 =========================================================================\n
@@ -463,9 +778,48 @@ class AInalysisConfiguration(containers.Configuration):
 
     Any changes made by the validation methods to the configuration are made to
     the configuration in active memory. Changes are never made to the
-    configuration file itself. """
+    configuration file itself.
+
+    Attributes
+    ----------
+    mapping_bounds: :obj:`tuple(numpy.ndarray)`, `None`
+        Lower and upper bounds of the mapping target area, precomputed when
+        the mapping entry is validated (see
+        :meth:`~phenoai.ainalyses.AInalysisConfiguration.get_mapping_bounds`).
+        `None` if mapping is not configured via a floating point number. """
+
+    def __init__(self, path=None, entries=None):
+        super().__init__(path, entries)
+        self.mapping_bounds = None
+        self._mapping_bounds_key = None
+
+    def get_mapping_bounds(self):
+        """ Returns the bounds of the mapping target area
 
-    def validate(self, validate_checksum=True):
+        The bounds are calculated by :func:`phenoai.utils.parameter_bounds`
+        from the `parameters` and `mapping` entries. They are stored in the
+        :attr:`~phenoai.ainalyses.AInalysisConfiguration.mapping_bounds`
+        attribute and only recalculated if one of these entries changed.
+
+        Returns
+        -------
+        bounds: :obj:`tuple(numpy.ndarray)`, `None`
+            Lower and upper bounds of the mapping target area. `None` if
+            mapping is not configured via a floating point number. """
+        mapping = self.configuration.get("mapping")
+        if not isinstance(mapping, float):
+            self.mapping_bounds = None
+            self._mapping_bounds_key = None
+            return None
+        key = (mapping, id(self.configuration["parameters"]),
+               len(self.configuration["parameters"]))
+        if self.mapping_bounds is None or self._mapping_bounds_key != key:
+            self.mapping_bounds = utils.parameter_bounds(
+                self.configuration["parameters"], mapping)
+            self._mapping_bounds_key = key
+        return self.mapping_bounds
+
+    def validate(self, validate_checksum=True, use_cache=False):
         """ Validates the configuration in the configuration property.
 
         Runs all validation methods on the loaded configuration.
@@ -474,6 +828,10 @@ class AInalysisConfiguration(containers.Configuration):
         ----------
         validate_checksum: :obj:`bool` Indicates if the checksum in the folder
             has to be validated as well. Default is `True`.
+        use_cache: :obj:`bool` Use the checksum cache when validating the
+            checksum, see
+            :meth:`~phenoai.ainalyses.AInalysisConfiguration.validate_checksum`.
+            Default is `False`.
 
         Returns
         -------
@@ -494,7 +852,7 @@ class AInalysisConfiguration(containers.Configuration):
         valid *= self.validate_type()
         valid *= self.validate_output_and_classes()
         if validate_checksum:
-            valid *= self.validate_checksum()
+            valid *= self.validate_checksum(use_cache)
         # Parameters
         valid *= self.validate_parameters()
         # Estimator type specifics
@@ -668,14 +1026,9 @@ class AInalysisConfiguration(containers.Configuration):
             logger.warning(("No information was provided on needed libraries. "
                             "This might cause problems during prediction."))
             return False
-        # Load libraries and save versions for installed ones
-        libraries = {"sklearn": None, "keras": None, "tensorflow": None}
-        for lib in libraries:
-            try:
-                package = importlib.import_module(lib)
-                libraries[lib] = package.__version__
-            except Exception:
-                pass
+        # Read versions of installed libraries from their package metadata
+        libraries = {lib: utils.get_library_version(lib)
+                     for lib in ["sklearn", "keras", "tensorflow"]}
         unsupported = 0
         for lib in self.configuration["libraries"]:
             if self.configuration["libraries"][lib] is None:
@@ -773,7 +1126,7 @@ class AInalysisConfiguration(containers.Configuration):
         logger.debug("Configuration entry 'output' was validly defined.")
         return True
 
-    def validate_checksum(self):
+    def validate_checksum(self, use_cache=False):
         """ Checks the correctness of the AInalysis checksum.
 
         Checks if a checksum is stored in the AInalysis folder and calculates
@@ -782,6 +1135,12 @@ class AInalysisConfiguration(containers.Configuration):
         any of the calculated checksums does not correspond to the one stored,
         `False` is returned. In any other case `True` is returned.
 
+        Parameters
+        ----------
+        use_cache: :obj:`bool` Take checksums of files that did not change
+            since they were last checked from the checksum cache (see
+            :func:`phenoai.utils.cached_file_checksum`). Default is `False`.
+
         Returns
         -------
         valid: :obj:`bool`
@@ -793,7 +1152,8 @@ class AInalysisConfiguration(containers.Configuration):
             logger.warning(("No checksum file found. Could not check if data "
                             "is uncorrupted."))
             return False
-        calculated_checksums = utils.calculate_ainalysis_checksums(self.folder)
+        calculated_checksums = utils.calculate_ainalysis_checksums(
+            self.folder, use_cache)
         invalid_checksums = []
         # Check checksums of important files
         for i in calculated_checksums:
@@ -1001,12 +1361,7 @@ class AInalysisConfiguration(containers.Configuration):
             self.configuration["filereader"] = None
         if self.configuration["filereader"] == "function":
             try:
-                loader = importlib.machinery.SourceFileLoader(
-                    'module', self.folder + "/functions.py")
-                spec = importlib.util.spec_from_loader(loader.name, loader)
-                functions = importlib.util.module_from_spec(spec)
-                loader.exec_module(functions)
-
+                functions = utils.load_module(self.folder + "/functions.py")
                 narguments = len(signature(functions.read).parameters)
                 if narguments != 1:
                     self.configuration["filereader"] = None
@@ -1127,12 +1482,7 @@ class AInalysisConfiguration(containers.Configuration):
             return False
         if self.configuration["mapping"] == "function":
             try:
-                loader = importlib.machinery.SourceFileLoader(
-                    'module', self.folder + "/functions.py")
-                spec = importlib.util.spec_from_loader(loader.name, loader)
-                functions = importlib.util.module_from_spec(spec)
-                loader.exec_module(functions)
-
+                functions = utils.load_module(self.folder + "/functions.py")
                 narguments = len(signature(functions.map).parameters)
                 if narguments != 1:
                     self.configuration["mapping"] = False
@@ -1157,6 +1507,7 @@ class AInalysisConfiguration(containers.Configuration):
         if (self.configuration["mapping"] is True
                 and isinstance(self.configuration["mapping"], bool)):
             self.configuration["mapping"] = 0.0
+        self.get_mapping_bounds()
         logger.debug("Configuration entry 'mapping' was validly defined.")
         return True
 
@@ -0,0 +1,256 @@
+""" Micro-batching of prediction requests
+
+This module implements the :obj:`phenoai.batcher.RequestBatcher` class, which
+combines concurrent calls to :meth:`phenoai.core.PhenoAI.run` with small
+amounts of data into a single call, so that every estimator is queried once
+for the whole batch instead of once per request. It is used by a PhenoAI
+server (see :meth:`phenoai.core.PhenoAI.run_as_server`) to handle many small
+concurrent requests efficiently.
+
+Requests are only combined if they select the same AInalyses, use the same
+map mode, either all or none provide data IDs and have data of the same
+number of parameters and dtype. The first request of a batch waits at most
+`max_wait` seconds for other requests to join, or until the batch contains
+`max_batch_size` data points, and then runs the batch on behalf of all
+requests in it. """
+
+import threading
+import time
+
+import numpy as np
+
+from phenoai import containers
+from phenoai import exceptions
+from phenoai import io
+from phenoai import logger
+
+
+class RequestBatcher:
+    """ Combines concurrent prediction requests into batches
+
+    The :meth:`~phenoai.batcher.RequestBatcher.run` method has the same
+    interface as :meth:`phenoai.core.PhenoAI.run` and returns the results of
+    the data of a single request, but the prediction itself is made for a
+    batch of concurrent requests at once. If running a batch fails, its
+    requests are run one by one, so that an error only affects the request
+    that caused it.
+
+    Attributes
+    ----------
+    phenoai: :obj:`phenoai.core.PhenoAI`
+        PhenoAI instance running the batches.
+    max_wait: :obj:`float`
+        Maximum time in seconds a request waits for other requests to join
+        its batch.
+    max_batch_size: :obj:`int`
+        Number of data points at which a batch is run without waiting any
+        longer.
+    batches: :obj:`int`
+        Number of batches run.
+    requests: :obj:`int`
+        Number of requests handled in batches.
+    points: :obj:`int`
+        Number of data points handled in batches.
+    added_latency: :obj:`float`
+        Total time in seconds requests waited for their batch to start.
+    max_added_latency: :obj:`float`
+        Longest time in seconds a request waited for its batch to start. """
+
+    def __init__(self, phenoai, max_wait=0.002, max_batch_size=1024):
+        """ Initialises the RequestBatcher object
+
+        Parameters
+        ----------
+        phenoai: :obj:`phenoai.core.PhenoAI`
+            PhenoAI instance running the batches.
+        max_wait: :obj:`float`, optional
+            Maximum time in seconds a request waits for other requests to
+            join its batch. Default is 0.002.
+        max_batch_size: :obj:`int`, optional
+            Number of data points at which a batch is run without waiting
+            any longer. Default is 1024. """
+        if max_wait < 0:
+            raise exceptions.PhenoAIException(
+                "Maximum wait time of a RequestBatcher cannot be negative.")
+        if max_batch_size < 1:
+            raise exceptions.PhenoAIException(
+                "Maximum batch size of a RequestBatcher should be at least 1.")
+        self.phenoai = phenoai
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.requests = 0
+        self.points = 0
+        self.added_latency = 0.0
+        self.max_added_latency = 0.0
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def run(self, data, map_data=False, ainalysis_ids=None, data_ids=None):
+        """ Runs the AInalyses on the data as part of a batch
+
+        See :meth:`phenoai.core.PhenoAI.run` for the parameters. File paths
+        and buffers are not batched, but run directly.
+
+        Returns
+        -------
+        results: :obj:`phenoai.containers.PhenoAIResults`
+            Results for the provided data only. """
+        if isinstance(data, str) or io.is_buffer(data) or (
+                isinstance(data, list) and data
+                and (isinstance(data[0], str) or io.is_buffer(data[0]))):
+            return self.phenoai.run(data, map_data, ainalysis_ids, data_ids)
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data.reshape(1, -1)
+        if data.ndim != 2 or len(data) == 0:
+            return self.phenoai.run(data, map_data, ainalysis_ids, data_ids)
+        if isinstance(data_ids, np.ndarray):
+            data_ids = data_ids.tolist()
+        if data_ids is not None and (not isinstance(data_ids, list)
+                                     or len(data_ids) != len(data)):
+            return self.phenoai.run(data, map_data, ainalysis_ids, data_ids)
+        if isinstance(ainalysis_ids, (list, tuple)):
+            ainalysis_ids = tuple(ainalysis_ids)
+        key = (ainalysis_ids, map_data, data_ids is not None, data.shape[1],
+               data.dtype.str)
+        request = {"data": data, "data_ids": data_ids,
+                   "submitted": time.perf_counter(),
+                   "done": threading.Event(), "results": None, "error": None}
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = {"requests": [], "points": 0,
+                         "full": threading.Event()}
+                self._open[key] = batch
+            batch["requests"].append(request)
+            batch["points"] += len(data)
+            if batch["points"] >= self.max_batch_size:
+                self._close(key, batch)
+        if leader:
+            batch["full"].wait(self.max_wait)
+            with self._lock:
+                self._close(key, batch)
+            self._run_batch(batch, key)
+        else:
+            request["done"].wait()
+        if request["error"] is not None:
+            raise request["error"]
+        return request["results"]
+
+    def get_metrics(self):
+        """ Returns the metrics of the batcher
+
+        Returns
+        -------
+        metrics: :obj:`dict`
+            Dictionary with the number of batches ("batches"), requests
+            ("requests") and data points ("points"), the mean number of
+            requests and data points per batch ("mean_batch_requests" and
+            "mean_batch_points"), the mean fill of the batches as fraction of
+            `max_batch_size` ("mean_fill") and the mean and maximum time in
+            seconds requests waited for their batch to start
+            ("mean_added_latency" and "max_added_latency"). Means are `None`
+            if no batch was run yet. """
+        with self._lock:
+            batches = self.batches
+            return {
+                "batches": batches,
+                "requests": self.requests,
+                "points": self.points,
+                "mean_batch_requests": (self.requests / batches
+                                        if batches else None),
+                "mean_batch_points": (self.points / batches
+                                      if batches else None),
+                "mean_fill": (min(1.0, self.points / batches
+                                  / self.max_batch_size)
+                              if batches else None),
+                "mean_added_latency": (self.added_latency / self.requests
+                                       if self.requests else None),
+                "max_added_latency": self.max_added_latency
+            }
+
+    def reset_metrics(self):
+        """ Sets all counters of the batcher to zero """
+        with self._lock:
+            self.batches = 0
+            self.requests = 0
+            self.points = 0
+            self.added_latency = 0.0
+            self.max_added_latency = 0.0
+
+    def _close(self, key, batch):
+        """ Stops a batch from accepting new requests. Should be called with
+        the lock of the batcher acquired. """
+        if self._open.get(key) is batch:
+            del self._open[key]
+        batch["full"].set()
+
+    def _run_batch(self, batch, key):
+        """ Runs a closed batch and hands the results to its requests """
+        requests = batch["requests"]
+        ainalysis_ids, map_data, has_ids = key[:3]
+        if ainalysis_ids is not None and not isinstance(ainalysis_ids, str):
+            ainalysis_ids = list(ainalysis_ids)
+        start = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.requests += len(requests)
+            self.points += batch["points"]
+            for request in requests:
+                latency = start - request["submitted"]
+                self.added_latency += latency
+                self.max_added_latency = max(self.max_added_latency,
+                                             latency)
+        logger.debug("Running batch of {} requests ({} data points)".format(
+            len(requests), batch["points"]))
+        try:
+            if len(requests) == 1:
+                data = requests[0]["data"]
+            else:
+                data = np.concatenate([r["data"] for r in requests])
+            data_ids = None
+            if has_ids:
+                data_ids = [i for r in requests for i in r["data_ids"]]
+            results = self.phenoai.run(data, map_data, ainalysis_ids,
+                                       data_ids)
+            bounds = np.cumsum([0] + [len(r["data"]) for r in requests])
+            for i, request in enumerate(requests):
+                request["results"] = _slice_results(results, bounds[i],
+                                                    bounds[i + 1])
+        except Exception as e:
+            if len(requests) == 1:
+                requests[0]["error"] = e
+            else:
+                logger.debug("Batch failed, running its requests one by one")
+                for request in requests:
+                    try:
+                        request["results"] = self.phenoai.run(
+                            request["data"], map_data, ainalysis_ids,
+                            request["data_ids"])
+                    except Exception as e:
+                        request["error"] = e
+        finally:
+            for request in requests:
+                request["done"].set()
+
+
+def _slice_results(results, start, stop):
+    """ Returns a :obj:`phenoai.containers.PhenoAIResults` object with the
+    results of data points `start` to `stop` of a batch """
+    sliced = containers.PhenoAIResults()
+    for result in results.results:
+        mapped = result.mapped
+        if isinstance(mapped, np.ndarray):
+            mapped = mapped[start:stop]
+        data_ids = result.data_ids
+        if data_ids is not None:
+            data_ids = data_ids[start:stop]
+        predictions = result.predictions
+        if predictions is not None:
+            predictions = predictions[start:stop]
+        sliced.add(containers.AInalysisResults(
+            result.result_id, result.configuration, result.data[start:stop],
+            data_ids, mapped, predictions))
+    return sliced
@@ -5,12 +5,18 @@ The predict method of this class does not perform any prediction itself, but
 sends the provided data to a by the user configured server that is running an
 instance of the :class:`phenoai.core.PhenoAI` class in server mode. This server
 can be the same machine as the one the :class:`~phenoai.clience.PhenoAIClient`
-instance is running on. """
+instance is running on. The :class:`~phenoai.client.AsyncPhenoAIClient` class
+offers the same functionality for use with asyncio, sending multiple
+predictions to the server concurrently. """
 
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import urllib.parse
 import numpy as np
 
+from phenoai import containers
 from phenoai import exceptions
 from phenoai import io
 
@@ -37,9 +43,28 @@ class PhenoAIClient:
         server side. Be aware that only initialized AInalyses will be
         selectable via this list.
     port: :obj:`int`
-        Port of the server to which the requests have to be send. """
-
-    def __init__(self, address, port, ainalysis_ids=None):
+        Port of the server to which the requests have to be send.
+    binary: :obj:`bool`, `None`
+        Boolean indicating if data arrays are sent to the server as binary
+        message (see :func:`phenoai.io.encode_binary`) instead of as text. If
+        `None`, binary messages are used if the server supports them.
+    array_results: :obj:`bool`, `None`
+        Boolean indicating if results are requested from the server as binary
+        message with only the arrays of the results (see
+        :meth:`phenoai.core.PhenoAIRequestHandler.encode_results`) instead of
+        as pickled :obj:`phenoai.containers.PhenoAIResults` object. The
+        configurations of the AInalyses are then requested once and cached
+        by the client. If `None`, array results are used if the server
+        supports them.
+    server_formats: :obj:`list(str)`
+        Message formats supported by the server, as reported on connecting.
+    session: :obj:`requests.Session`
+        Session through which all requests are sent. Connections to the
+        server are kept alive and reused between requests.
+        """
+
+    def __init__(self, address, port, ainalysis_ids=None, binary=None,
+                 array_results=None, pool_size=10):
         """ Initialises the client.
 
         Parameters
@@ -51,7 +76,28 @@ class PhenoAIClient:
         ainalysis_ids: :obj:`list(str)`, optional.
             List of AInalysis IDs corresponding to the AInalyses to be run at
             the server side. Be aware that only initialized AInalyses will be
-            selectable via this list. Default is `None`. """
+            selectable via this list. Default is `None`.
+        binary: :obj:`bool`, `None`, optional
+            Send data arrays as binary message instead of as text. If `None`,
+            binary messages are used if the server supports them. Default is
+            `None`.
+        array_results: :obj:`bool`, `None`, optional
+            Request results as arrays and rebuild the
+            :obj:`phenoai.containers.PhenoAIResults` object from cached
+            configurations. If `None`, array results are used if the server
+            supports them. Default is `None`.
+        pool_size: :obj:`int`, optional
+            Maximum number of connections to the server kept alive, which
+            limits the number of connections that can be reused when the
+            client is used from multiple threads. Default is 10. """
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1,
+                                                  pool_maxsize=pool_size))
+        self.binary = binary
+        self.array_results = array_results
+        self.server_formats = []
+        self._formats = []
+        self._configurations = {}
         self.set_server(address, port)
         self.ainalysis_ids = ainalysis_ids
 
@@ -86,9 +132,11 @@ class PhenoAIClient:
             raise exceptions.ClientException(
                 ("Client could not connect to http://{}:{}.\n   {}").format(
                     address, port, status[1]))
-        # Set address and port
+        # Set address, port and supported formats
         self.address = address
         self.port = port
+        self.server_formats = self._formats
+        self._configurations = {}
 
     def check_connection(self, address, port, timeout=5):
         """ Checks if a connection to a server can be made.
@@ -121,10 +169,10 @@ class PhenoAIClient:
             established, this value is `None`. """
 
         try:
-            if timeout is not None:
-                response = requests.get("http://{}:{}".format(address, port))
-            else:
-                response = requests.get("http://{}:{}".format(address, port))
+            response = self.session.get("http://{}:{}".format(address, port),
+                                        timeout=timeout)
+            self._formats = [f for f in response.headers.get(
+                "X-PhenoAI-Formats", "").split(",") if f]
             response = response.text
             if response[:10] == "phenoai-ok":
                 return (True, None)
@@ -196,84 +244,103 @@ class PhenoAIClient:
             controlled by the value of the `return_object` argument of this
             method. """
 
-        # Create dictionary for the post request
-        postdict = {"mapping": 1.0 * bool(map_data)}
-        # Add ainalysis_ids
-        if self.ainalysis_ids is None:
-            postdict["ainalysis_ids"] = json.dumps("all")
-        elif isinstance(self.ainalysis_ids, str):
-            postdict["ainalysis_ids"] = json.dumps([self.ainalysis_ids])
-        elif isinstance(self.ainalysis_ids, list):
-            postdict["ainalysis_ids"] = json.dumps(self.ainalysis_ids)
-        elif isinstance(self.ainalysis_ids, (float, int)):
-            postdict["ainalysis_ids"] = json.dumps([self.ainalysis_ids])
-        else:
-            raise exceptions.ClientException(
-                ("AInalysis IDs provided in ainalysis_ids is not a string, "
-                 "float or int (or list of these elements)"))
-
-        # Split different prediction modes
-        if isinstance(data, (list, np.ndarray)):
-            # Predict labeling from data array
-            postdict["mode"] = "values"
-            # Check data_ids argument
-            if isinstance(data_ids, np.ndarray):
-                data_ids = data_ids.tolist()
-            if data_ids is None:
-                data_ids = False
-            elif not isinstance(data_ids, list) and data_ids is not None:
-                raise exceptions.ClientException(
-                    ("Data IDs have to be provided as list or np.ndarray."))
-            # Convert numpy.ndarray to list
-            if isinstance(data, np.ndarray):
-                data = data.tolist()
-            # Check if list has correct format (all rows of same length)
-            for i, point in enumerate(data):
-                if i == 0:
-                    if not isinstance(point, list):
-                        data = [data]
-                        break
-                    length = len(point)
-                else:
-                    if len(point) != length:
-                        raise exceptions.ClientException(("Shape of provided "
-                                                          "data list/array "
-                                                          "was inconsistent."))
-            # Convert list to json and store in postdict
-            postdict["data"] = json.dumps(data)
-            postdict["data_ids"] = json.dumps(data_ids)
-
-        elif isinstance(data, str):
-            # Predict labeling of file
-            postdict["mode"] = "file"
-            # Read file to string
-            filetext = ''
-            with open(data) as f:
-                filelines = f.readlines()
-                filetext = '\n'.join(filelines)
-            if filetext == '':
-                raise exceptions.ClientException(
-                    "File '{}' does not have any content.".format(data))
-            # Convert filecontents to json
-            postdict["data"] = filetext
-            postdict["data_ids"] = json.dumps([data])
+        postdict, arrays, sent_data = _build_request(
+            self.ainalysis_ids, data, map_data, data_ids, return_object,
+            self.use_binary(), self.use_array_results())
+        return self.communicate(postdict, return_object, timeout, arrays,
+                                sent_data)
 
-        else:
-            # No prediction could be made
+    def close(self):
+        """ Closes the connections to the server kept alive by the client.
+        New connections are made when the server is queried again. """
+        self.session.close()
+
+    def use_binary(self):
+        """ Checks if data arrays are sent to the server as binary message
+
+        Returns
+        -------
+        binary: :obj:`bool`
+            `True` if :attr:`~phenoai.client.PhenoAIClient.binary` is `True`,
+            or if it is `None` and the server supports binary messages. """
+        if self.binary is None:
+            return "binary" in self.server_formats
+        return bool(self.binary)
+
+    def use_array_results(self):
+        """ Checks if results are requested from the server as arrays
+
+        Returns
+        -------
+        array_results: :obj:`bool`
+            `True` if :attr:`~phenoai.client.PhenoAIClient.array_results` is
+            `True`, or if it is `None` and the server supports array
+            results. """
+        if self.array_results is None:
+            return "arrays" in self.server_formats
+        return bool(self.array_results)
+
+    def get_configuration(self, ainalysis_id, version, timeout=5):
+        """ Returns the configuration of an AInalysis on the server
+
+        Configurations are requested from the server only once and cached by
+        AInalysis ID and version.
+
+        Parameters
+        ----------
+        ainalysis_id: :obj:`str`
+            ID of the AInalysis on the server.
+        version: :obj:`int`
+            Version of the AInalysis (its "ainalysisversion" entry).
+        timeout: :obj:`float`, `None`, optional
+            Time to wait for the server to respond. Default is `5`.
+
+        Returns
+        -------
+        configuration: :obj:`dict`
+            The configuration of the AInalysis. """
+        key = (ainalysis_id, version)
+        if key not in self._configurations:
+            configurations = self.communicate(
+                {"mode": "configuration",
+                 "ainalysis_ids": json.dumps([ainalysis_id])}, True, timeout)
+            for other_id, entry in configurations.items():
+                self._configurations[(other_id, entry[0])] = entry[1]
+        if key not in self._configurations:
             raise exceptions.ClientException(
-                ("Provided data has to be a list of lists, numpy.ndarray or "
-                 "the location of a data file. Provided was '{}'.").format(
-                     type(data)))
+                ("Server did not provide version {} of the configuration of "
+                 "AInalysis '{}'.").format(version, ainalysis_id))
+        return self._configurations[key]
 
-        # Determine return type
-        if bool(return_object):
-            postdict["get_results_as_string"] = 0.0
-        else:
-            postdict["get_results_as_string"] = 1.0
+    def decode_results(self, message, data=None, timeout=5):
+        """ Rebuilds a :obj:`phenoai.containers.PhenoAIResults` object from
+        a binary message with the arrays of the results
 
-        return self.communicate(postdict, return_object, timeout)
+        Parameters
+        ----------
+        message: :obj:`bytes`
+            Message created by
+            :meth:`phenoai.core.PhenoAIRequestHandler.encode_results`.
+        data: :obj:`numpy.ndarray`, `None`, optional
+            Data sent to the server, used for results of which the server did
+            not include the data. Default is `None`.
+        timeout: :obj:`float`, `None`, optional
+            Time to wait for the server to respond when requesting
+            configurations. Default is `5`.
 
-    def communicate(self, post_dictionary, return_object=True, timeout=5):
+        Returns
+        -------
+        results: :obj:`phenoai.containers.PhenoAIResults`
+            The results. """
+        # Decode from a mutable copy, so that the arrays are writeable
+        header, arrays = io.decode_binary(bytearray(message))
+        for entry in header["results"]:
+            self.get_configuration(entry["ainalysis_id"], entry["version"],
+                                   timeout)
+        return _rebuild_results(header, arrays, self._configurations, data)
+
+    def communicate(self, post_dictionary, return_object=True, timeout=5,
+                    arrays=None, data=None):
         """ Sends a request to the server.
 
         This method is internally used to make a request to the server. As a
@@ -294,6 +361,14 @@ class PhenoAIClient:
         timeout: :obj:`float`, `None`, optional
             Time to wait for the server to respond. If set to `None`, script
             will wait indefinitely. Default is `5`.
+        arrays: :obj:`dict`, `None`, optional
+            Arrays to send along with the post dictionary. If provided, the
+            request is sent as binary message (see
+            :func:`phenoai.io.encode_binary`). Default is `None`.
+        data: :obj:`numpy.ndarray`, `None`, optional
+            Data sent to the server, used when results are returned as arrays
+            (see :meth:`~phenoai.client.PhenoAIClient.decode_results`).
+            Default is `None`.
 
         Returns
         -------
@@ -302,34 +377,583 @@ class PhenoAIClient:
             controlled by the value of the `return_object` argument of this
             method. """
 
+        headers = None
+        if arrays is not None:
+            post_dictionary = io.encode_binary(post_dictionary, arrays)
+            headers = {"Content-Type": io.BINARY_CONTENT_TYPE}
         # Read and decode json
-        r = requests.post('http://{}:{}'.format(self.address, self.port),
-                          data=post_dictionary,
-                          timeout=timeout)
+        r = self.session.post('http://{}:{}'.format(self.address, self.port),
+                              data=post_dictionary,
+                              headers=headers,
+                              timeout=timeout)
+        if r.headers.get("Content-Type", "").startswith(
+                io.BINARY_CONTENT_TYPE):
+            return self.decode_results(r.content, data, timeout)
         response = r.json()
-        # Check if error occured
-        if response['status'] == 'error':
-            # Error occured, recreate error
-            errors = [(name, cls) for name, cls in exceptions.__dict__.items()
-                      if isinstance(cls, type)]
-            if errors:
-                for e in errors:
-                    if e[0] == response['type']:
-                        raise e[1]('[@Server] ' + response['message'])
-                raise Exception("[{} @Server]: {} ".format(
-                    errors[0], response['message']))
+        return _parse_response(response, return_object)
+
+
+class AsyncPhenoAIClient:
+    """ Asyncio client to communicate with instances of
+    :class:`phenoai.core.PhenoAI` running as a server
+
+    The AsyncPhenoAIClient has the same prediction semantics as the
+    :class:`~phenoai.client.PhenoAIClient`, but its methods are coroutines,
+    so that predictions can be made from within an asyncio event loop without
+    blocking it. Multiple predictions can be in flight at the same time:
+    :meth:`~phenoai.client.AsyncPhenoAIClient.predict_many` sends a list of
+    data chunks concurrently, over at most `concurrency` kept alive
+    connections, and returns the results in the order of the chunks.
+
+    The client does not connect on construction. The connection to the
+    server is checked on the first request, or explicitly via
+    :meth:`~phenoai.client.AsyncPhenoAIClient.connect`. The client can be
+    used as asynchronous context manager, which closes its connections on
+    exit.
+
+    Attributes
+    ----------
+    address: :obj:`str`
+        IP address of the server. 'localhost' is also a valid address.
+    port: :obj:`int`
+        Port of the server to which the requests have to be send.
+    ainalysis_ids: :obj:`list(str)`
+        List of AInalysis IDs corresponding to the AInalyses to be run at the
+        server side.
+    binary: :obj:`bool`, `None`
+        Boolean indicating if data arrays are sent to the server as binary
+        message. If `None`, binary messages are used if the server supports
+        them.
+    array_results: :obj:`bool`, `None`
+        Boolean indicating if results are requested from the server as binary
+        message with only the arrays of the results. If `None`, array results
+        are used if the server supports them.
+    concurrency: :obj:`int`
+        Maximum number of requests sent to the server at the same time, which
+        is also the maximum number of connections kept alive.
+    server_formats: :obj:`list(str)`
+        Message formats supported by the server, as reported on connecting.
+        """
+
+    def __init__(self, address, port, ainalysis_ids=None, binary=None,
+                 array_results=None, concurrency=8):
+        """ Initialises the client.
+
+        Parameters
+        ----------
+        address: :obj:`str`
+            IP address of the server. 'localhost' is also a valid address.
+        port: :obj:`int`
+            Port of the server to which the requests have to be send.
+        ainalysis_ids: :obj:`list(str)`, optional.
+            List of AInalysis IDs corresponding to the AInalyses to be run at
+            the server side. Default is `None`.
+        binary: :obj:`bool`, `None`, optional
+            Send data arrays as binary message instead of as text. If `None`,
+            binary messages are used if the server supports them. Default is
+            `None`.
+        array_results: :obj:`bool`, `None`, optional
+            Request results as arrays and rebuild the
+            :obj:`phenoai.containers.PhenoAIResults` object from cached
+            configurations. If `None`, array results are used if the server
+            supports them. Default is `None`.
+        concurrency: :obj:`int`, optional
+            Maximum number of requests sent to the server at the same time.
+            Default is 8. """
+        if concurrency < 1:
+            raise exceptions.ClientException(
+                "Concurrency of the client should be at least 1.")
+        self.address = address
+        self.port = port
+        self.ainalysis_ids = ainalysis_ids
+        self.binary = binary
+        self.array_results = array_results
+        self.concurrency = concurrency
+        self.server_formats = []
+        self._connected = False
+        self._configurations = {}
+        self._idle = []
+        self._semaphore = None
+        self._lock = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self, timeout=5):
+        """ Checks the connection to the server and retrieves the message
+        formats it supports
+
+        Raises a :exc:`phenoai.exceptions.ClientException` if no PhenoAI
+        server could be reached.
+
+        Parameters
+        ----------
+        timeout: :obj:`float`, `None`, optional
+            Time to wait for the server to respond. If set to `None`, script
+            will wait indefinitely. Default is `5`. """
+        try:
+            headers, body = await self._request("GET", timeout=timeout)
+        except Exception as e:
+            raise exceptions.ClientException(
+                ("Client could not connect to http://{}:{}.\n   {}").format(
+                    self.address, self.port, e))
+        if body[:10] != b"phenoai-ok":
+            raise exceptions.ClientException(
+                ("Client could not connect to http://{}:{}.\n   {}").format(
+                    self.address, self.port, body.decode("utf-8", "replace")))
+        self.server_formats = [f for f in headers.get(
+            "x-phenoai-formats", "").split(",") if f]
+        self._configurations = {}
+        self._connected = True
+
+    async def predict(self,
+                      data,
+                      map_data=False,
+                      data_ids=None,
+                      return_object=True,
+                      timeout=5):
+        """ Queries the server for prediction on provided data.
+
+        See :meth:`phenoai.client.PhenoAIClient.predict` for the parameters
+        and the returned results.
+
+        Returns
+        -------
+        results: :obj:`~phenoai.containers.PhenoAIResults`, :obj:`str`
+            Prediction results created at the server. """
+        if not self._connected:
+            await self.connect(timeout)
+        postdict, arrays, sent_data = _build_request(
+            self.ainalysis_ids, data, map_data, data_ids, return_object,
+            self.use_binary(), self.use_array_results())
+        return await self.communicate(postdict, return_object, timeout,
+                                      arrays, sent_data)
+
+    async def predict_many(self,
+                           chunks,
+                           map_data=False,
+                           data_ids=None,
+                           return_object=True,
+                           timeout=5):
+        """ Queries the server for predictions on multiple chunks of data
+        concurrently
+
+        At most `concurrency` chunks are sent to the server at the same time.
+        If the prediction on any of the chunks fails, the exception is
+        raised after all other predictions have finished.
+
+        Parameters
+        ----------
+        chunks: :obj:`list`
+            List of data chunks, each of which can be anything accepted by
+            :meth:`~phenoai.client.AsyncPhenoAIClient.predict`.
+        map_data: :obj:`bool`, "both", optional
+            Boolean indicating if data should be mapped by the AInalyses
+            before running a prediction on it. Default is `False`.
+        data_ids: :obj:`list`, `None`, optional
+            List with the data IDs of every chunk. Default is `None`.
+        return_object: :obj:`boolean`, optional
+            Boolean indicating if the results are returned as
+            :obj:`~phenoai.containers.PhenoAIResults` objects (`True`) or as
+            string representations (`False`). Default is `True`.
+        timeout: :obj:`float`, `None`, optional
+            Time to wait for the server to respond to every chunk. Default is
+            `5`.
+
+        Returns
+        -------
+        results: :obj:`list`
+            Prediction results of every chunk, in the order of the chunks. """
+        chunks = list(chunks)
+        if data_ids is None:
+            data_ids = [None] * len(chunks)
+        elif len(data_ids) != len(chunks):
+            raise exceptions.ClientException(
+                "Number of data ID lists should equal the number of chunks.")
+        if not self._connected:
+            await self.connect(timeout)
+        results = await asyncio.gather(
+            *[self.predict(chunk, map_data, ids, return_object, timeout)
+              for chunk, ids in zip(chunks, data_ids)],
+            return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    async def close(self):
+        """ Closes the connections to the server kept alive by the client.
+        New connections are made when the server is queried again. """
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    def use_binary(self):
+        """ Checks if data arrays are sent to the server as binary message,
+        see :meth:`phenoai.client.PhenoAIClient.use_binary` """
+        if self.binary is None:
+            return "binary" in self.server_formats
+        return bool(self.binary)
+
+    def use_array_results(self):
+        """ Checks if results are requested from the server as arrays, see
+        :meth:`phenoai.client.PhenoAIClient.use_array_results` """
+        if self.array_results is None:
+            return "arrays" in self.server_formats
+        return bool(self.array_results)
+
+    async def get_configuration(self, ainalysis_id, version, timeout=5):
+        """ Returns the configuration of an AInalysis on the server
+
+        Configurations are requested from the server only once and cached by
+        AInalysis ID and version, also if multiple predictions need the same
+        configuration at the same time.
+
+        Parameters
+        ----------
+        ainalysis_id: :obj:`str`
+            ID of the AInalysis on the server.
+        version: :obj:`int`
+            Version of the AInalysis (its "ainalysisversion" entry).
+        timeout: :obj:`float`, `None`, optional
+            Time to wait for the server to respond. Default is `5`.
+
+        Returns
+        -------
+        configuration: :obj:`dict`
+            The configuration of the AInalysis. """
+        key = (ainalysis_id, version)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if key not in self._configurations:
+                configurations = await self.communicate(
+                    {"mode": "configuration",
+                     "ainalysis_ids": json.dumps([ainalysis_id])},
+                    True, timeout)
+                for other_id, entry in configurations.items():
+                    self._configurations[(other_id, entry[0])] = entry[1]
+        if key not in self._configurations:
+            raise exceptions.ClientException(
+                ("Server did not provide version {} of the configuration of "
+                 "AInalysis '{}'.").format(version, ainalysis_id))
+        return self._configurations[key]
+
+    async def communicate(self, post_dictionary, return_object=True,
+                          timeout=5, arrays=None, data=None):
+        """ Sends a request to the server.
+
+        This method is internally used to make a request to the server, see
+        :meth:`phenoai.client.PhenoAIClient.communicate` for the parameters.
+        As a user you should use
+        :meth:`~phenoai.client.AsyncPhenoAIClient.predict` instead.
+
+        Returns
+        -------
+        results: :class:`phenoai.containers.PhenoAIResults`, :obj:`str`
+            Prediction results created at the server. """
+        if arrays is not None:
+            body = io.encode_binary(post_dictionary, arrays)
+            content_type = io.BINARY_CONTENT_TYPE
+        else:
+            body = urllib.parse.urlencode(post_dictionary).encode("utf-8")
+            content_type = "application/x-www-form-urlencoded"
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            headers, body = await self._request("POST", body, content_type,
+                                                timeout)
+        if headers.get("content-type", "").startswith(
+                io.BINARY_CONTENT_TYPE):
+            # Decode from a mutable copy, so that the arrays are writeable
+            header, arrays = io.decode_binary(bytearray(body))
+            for entry in header["results"]:
+                await self.get_configuration(entry["ainalysis_id"],
+                                             entry["version"], timeout)
+            return _rebuild_results(header, arrays, self._configurations,
+                                    data)
+        try:
+            response = json.loads(body.decode("utf-8"))
+        except ValueError:
+            raise exceptions.ClientException(
+                "Server response could not be decoded: {}".format(
+                    body[:200].decode("utf-8", "replace")))
+        return _parse_response(response, return_object)
+
+    async def _request(self, method, body=b"", content_type=None, timeout=5):
+        """ Makes a HTTP/1.1 request to the server over a kept alive
+        connection and returns the headers (with lower case names) and the
+        body of the response """
+        return await asyncio.wait_for(
+            self._exchange(method, body, content_type), timeout)
+
+    async def _exchange(self, method, body, content_type):
+        """ Sends a request and reads the response. A request on a reused
+        connection that was closed by the server is retried once on a new
+        connection. """
+        request = ["{} / HTTP/1.1".format(method),
+                   "Host: {}:{}".format(self.address, self.port),
+                   "Content-Length: {}".format(len(body))]
+        if content_type is not None:
+            request.append("Content-Type: {}".format(content_type))
+        request = ("\r\n".join(request) + "\r\n\r\n").encode("latin-1")
+        for attempt in range(2):
+            reused = bool(self._idle)
+            if reused:
+                reader, writer = self._idle.pop()
             else:
-                raise Exception(("[Unknown error @Server]: An unknown error "
-                                 "occured at the server"))
-        elif response['status'] == 'ok':
-            # No error occured: return results
-            if return_object:
-                results = io.unpickle(response['results'])
+                reader, writer = await asyncio.open_connection(self.address,
+                                                               self.port)
+            try:
+                writer.write(request + body)
+                await writer.drain()
+                status = await reader.readline()
+                if not status:
+                    raise ConnectionResetError(
+                        "Server closed the connection")
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if "content-length" in headers:
+                    content = await reader.readexactly(
+                        int(headers["content-length"]))
+                    keep_alive = (
+                        status.startswith(b"HTTP/1.1")
+                        and headers.get("connection", "").lower() != "close")
+                else:
+                    content = await reader.read()
+                    keep_alive = False
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                # Connection is in an unknown state, e.g. after a timeout
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
             else:
-                results = response["results"]
-            # Return data
-            return results
-        else:
+                writer.close()
+            return headers, content
+
+
+def _build_request(ainalysis_ids, data, map_data, data_ids, return_object,
+                   binary, array_results):
+    """ Creates the POST dictionary of a prediction request, see
+    :meth:`phenoai.client.PhenoAIClient.predict`
+
+    Returns
+    -------
+    postdict: :obj:`dict`
+        Dictionary to send by POST request.
+    arrays: :obj:`dict`, `None`
+        Arrays to send along in a binary message, `None` if the request is
+        sent as text.
+    sent_data: :obj:`numpy.ndarray`, `None`
+        Data sent to the server, `None` for files. """
+    # Create dictionary for the post request
+    postdict = {"mapping": 1.0 * bool(map_data)}
+    # Add ainalysis_ids
+    if ainalysis_ids is None:
+        postdict["ainalysis_ids"] = json.dumps("all")
+    elif isinstance(ainalysis_ids, str):
+        postdict["ainalysis_ids"] = json.dumps([ainalysis_ids])
+    elif isinstance(ainalysis_ids, list):
+        postdict["ainalysis_ids"] = json.dumps(ainalysis_ids)
+    elif isinstance(ainalysis_ids, (float, int)):
+        postdict["ainalysis_ids"] = json.dumps([ainalysis_ids])
+    else:
+        raise exceptions.ClientException(
+            ("AInalysis IDs provided in ainalysis_ids is not a string, "
+             "float or int (or list of these elements)"))
+
+    arrays = None
+    # Split different prediction modes
+    if isinstance(data, (list, np.ndarray)) and binary:
+        # Send data array as binary message
+        postdict["mode"] = "values"
+        if isinstance(data_ids, np.ndarray):
+            data_ids = data_ids.tolist()
+        if data_ids is not None and not isinstance(data_ids, list):
+            raise exceptions.ClientException(
+                ("Data IDs have to be provided as list or np.ndarray."))
+        try:
+            data = np.asarray(data)
+        except ValueError:
+            data = np.asarray(data, dtype=object)
+        if data.dtype != np.float32:
+            try:
+                data = data.astype(np.float64, copy=False)
+            except (TypeError, ValueError):
+                raise exceptions.ClientException(("Shape of provided "
+                                                  "data list/array "
+                                                  "was inconsistent."))
+        if data.ndim == 1:
+            data = data[np.newaxis]
+        postdict["data_ids"] = json.dumps(
+            False if data_ids is None else data_ids)
+        arrays = {"data": data}
+        sent_data = data
+
+    elif isinstance(data, (list, np.ndarray)):
+        # Predict labeling from data array
+        postdict["mode"] = "values"
+        # Check data_ids argument
+        if isinstance(data_ids, np.ndarray):
+            data_ids = data_ids.tolist()
+        if data_ids is None:
+            data_ids = False
+        elif not isinstance(data_ids, list) and data_ids is not None:
             raise exceptions.ClientException(
-                ("Response status '{}' was not "
-                 "recognized.").format(response['status']))
+                ("Data IDs have to be provided as list or np.ndarray."))
+        # Convert numpy.ndarray to list
+        if isinstance(data, np.ndarray):
+            data = data.tolist()
+        # Check if list has correct format (all rows of same length)
+        for i, point in enumerate(data):
+            if i == 0:
+                if not isinstance(point, list):
+                    data = [data]
+                    break
+                length = len(point)
+            else:
+                if len(point) != length:
+                    raise exceptions.ClientException(("Shape of provided "
+                                                      "data list/array "
+                                                      "was inconsistent."))
+        sent_data = np.array(data)
+        # Convert list to json and store in postdict
+        postdict["data"] = json.dumps(data)
+        postdict["data_ids"] = json.dumps(data_ids)
+
+    elif isinstance(data, str):
+        # Predict labeling of file
+        postdict["mode"] = "file"
+        # Read file to string
+        filetext = ''
+        with open(data) as f:
+            filelines = f.readlines()
+            filetext = '\n'.join(filelines)
+        if filetext == '':
+            raise exceptions.ClientException(
+                "File '{}' does not have any content.".format(data))
+        # Convert filecontents to json
+        postdict["data"] = filetext
+        postdict["data_ids"] = json.dumps([data])
+        sent_data = None
+
+    else:
+        # No prediction could be made
+        raise exceptions.ClientException(
+            ("Provided data has to be a list of lists, numpy.ndarray or "
+             "the location of a data file. Provided was '{}'.").format(
+                 type(data)))
+
+    # Determine return type
+    if bool(return_object):
+        postdict["get_results_as_string"] = 0.0
+        if array_results:
+            postdict["response_format"] = "arrays"
+    else:
+        postdict["get_results_as_string"] = 1.0
+
+    return postdict, arrays, sent_data
+
+
+def _rebuild_results(header, arrays, configurations, data=None):
+    """ Rebuilds a :obj:`phenoai.containers.PhenoAIResults` object from a
+    decoded binary message with the arrays of the results, see
+    :meth:`phenoai.client.PhenoAIClient.decode_results`
+
+    Parameters
+    ----------
+    header: :obj:`dict`
+        Header of the message.
+    arrays: :obj:`dict`
+        Arrays in the message.
+    configurations: :obj:`dict`
+        Configurations of the AInalyses, keyed by AInalysis ID and version.
+    data: :obj:`numpy.ndarray`, `None`, optional
+        Data sent to the server. Default is `None`.
+
+    Returns
+    -------
+    results: :obj:`phenoai.containers.PhenoAIResults`
+        The results. """
+    results = containers.PhenoAIResults()
+    for i, entry in enumerate(header["results"]):
+        configuration = configurations[(entry["ainalysis_id"],
+                                        entry["version"])]
+        result_data = arrays.get("data.{}".format(i))
+        if result_data is None:
+            if data is None:
+                raise exceptions.ClientException(
+                    "Server did not return the data of the results.")
+            result_data = np.array(data)
+            if result_data.ndim == 1:
+                result_data = result_data.reshape(1, -1)
+        results.add(containers.AInalysisResults(
+            entry["result_id"],
+            containers.Configuration(entries=configuration),
+            result_data, entry["data_ids"],
+            arrays.get("mapped.{}".format(i), entry["mapped"]),
+            arrays["predictions.{}".format(i)]))
+    return results
+
+
+def _parse_response(response, return_object):
+    """ Returns the results in a decoded JSON response of the server, or
+    raises the error that occured at the server
+
+    Parameters
+    ----------
+    response: :obj:`dict`
+        Decoded JSON response.
+    return_object: :obj:`bool`
+        Boolean indicating if the results are a pickled object.
+
+    Returns
+    -------
+    results: :class:`phenoai.containers.PhenoAIResults`, :obj:`str`
+        Results sent by the server. """
+    # Check if error occured
+    if response['status'] == 'error':
+        # Error occured, recreate error
+        errors = [(name, cls) for name, cls in exceptions.__dict__.items()
+                  if isinstance(cls, type)]
+        if errors:
+            for e in errors:
+                if e[0] == response['type']:
+                    raise e[1]('[@Server] ' + response['message'])
+            raise Exception("[{} @Server]: {} ".format(
+                errors[0], response['message']))
+        else:
+            raise Exception(("[Unknown error @Server]: An unknown error "
+                             "occured at the server"))
+    elif response['status'] == 'ok':
+        # No error occured: return results
+        if return_object:
+            results = io.unpickle(response['results'])
+        else:
+            results = response["results"]
+        # Return data
+        return results
+    else:
+        raise exceptions.ClientException(
+            ("Response status '{}' was not "
+             "recognized.").format(response['status']))
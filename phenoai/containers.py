@@ -3,7 +3,6 @@ phenoai package are derived. Currently these classes are
 :class:`~phenoai.containers.Estimator` and
 :class:`~phenoai.containers.Configuration`. """
 
-from copy import deepcopy
 import os.path
 
 import numpy as np
@@ -73,6 +72,26 @@ class Estimator:
              "available in instances of classes derived from the Estimator "
              "class."))
 
+    def warm_up(self, n_parameters):
+        """ Makes a prediction on a dummy data point
+
+        Some estimators (e.g. keras models) do expensive initialisation on
+        their first prediction. Calling this method right after loading moves
+        this initialisation out of the first real prediction. Errors in the
+        dummy prediction are logged and otherwise ignored.
+
+        Parameters
+        ----------
+        n_parameters: :obj:`int`
+            Number of parameters the estimator expects per data point. """
+        if not self.is_loaded():
+            return
+        logger.debug("Warming up estimator")
+        try:
+            self.predict(np.zeros((1, n_parameters)))
+        except Exception as e:
+            logger.debug("Warm-up of estimator failed: {}".format(e))
+
 
 class Configuration:
     """ The basic interface to configuration classes.
@@ -282,6 +301,11 @@ class AInalysisResults:
         self.mapped = mapped
         self.configuration = Configuration(entries=configuration.configuration)
         self.predictions = predictions
+        self._calibrated = None
+        self._calibrated_source = None
+        self._id_index = None
+        self._id_index_source = None
+        self._id_index_length = 0
 
     def get(self, array, reference=None):
         """ Returns the content of the array at location of the reference
@@ -304,6 +328,13 @@ class AInalysisResults:
             :obj:`int` and/or :obj:`str`. In that case a :obj:`numpy.ndarray`
             with the selected entries will be returned. Default is `None`.
 
+        Data IDs are looked up in an index from ID to row number, which is
+        built on first use (see
+        :meth:`~phenoai.containers.AInalysisResults.get_index`). A list of
+        references is selected from the array at once, so that the selection
+        has the same dtype as the array and shape `(len(reference),) +
+        array.shape[1:]`.
+
         Returns
         -------
         selection: :obj:`numpy.ndarray`
@@ -312,24 +343,71 @@ class AInalysisResults:
 
         if reference is None:
             return array
-        if isinstance(reference, int):
-            return array[reference]
-        if isinstance(reference, str):
-            for i, did in enumerate(self.data_ids):
-                if reference == did:
-                    return array[i]
-        elif isinstance(reference, (np.ndarray, list)):
-            if len(array.shape) == 1:
-                a = len(array)
-            else:
-                a = len(array[0])
-            selection = np.zeros((len(reference), a))
-            for i, ref in enumerate(reference):
-                selection[i, :] = self.get(array, ref)
-            return selection
+        if isinstance(reference, (int, np.integer, str)):
+            return array[self._get_row(reference)]
+        if isinstance(reference, (np.ndarray, list)):
+            if (not isinstance(reference, np.ndarray)
+                    or reference.dtype.kind not in "iu"):
+                reference = np.array(
+                    [self._get_row(ref) for ref in reference], dtype=int)
+            return np.asarray(array)[reference]
         raise exceptions.ResultsException(("Unknown reference format for get: "
                                            "{}.").format(type(reference)))
 
+    def get_index(self):
+        """ Returns the index from data ID to row number
+
+        The index is built on first use and rebuilt if the
+        :attr:`~phenoai.containers.AInalysisResults.data_ids` property was
+        replaced or changed length. If a data ID occurs more than once, the
+        first row with that ID is used.
+
+        Returns
+        -------
+        index: :obj:`dict`, `None`
+            Dictionary with the data IDs as keys and row numbers as values.
+            `None` if no data IDs are stored in this object. """
+        if self.data_ids is None:
+            return None
+        if (self._id_index is None
+                or self._id_index_source is not self.data_ids
+                or self._id_index_length != len(self.data_ids)):
+            index = {}
+            for i, did in enumerate(self.data_ids):
+                index.setdefault(did, i)
+            self._id_index = index
+            self._id_index_source = self.data_ids
+            self._id_index_length = len(self.data_ids)
+        return self._id_index
+
+    def _get_row(self, reference):
+        """ Returns the row number for a single reference
+
+        Parameters
+        ----------
+        reference: :obj:`int`, :obj:`str`
+            Row number or data ID.
+
+        Returns
+        -------
+        row: :obj:`int`
+            Row number of the reference. """
+        if isinstance(reference, (int, np.integer)):
+            return reference
+        if not isinstance(reference, str):
+            raise exceptions.ResultsException(
+                "Unknown reference format for get: {}.".format(
+                    type(reference)))
+        index = self.get_index()
+        if index is None:
+            raise exceptions.ResultsException(
+                ("Data can only be referenced by ID if data IDs were "
+                 "provided."))
+        if reference not in index:
+            raise exceptions.ResultsException(
+                "Unknown data ID: '{}'.".format(reference))
+        return index[reference]
+
     def get_ids(self):
         """ Returns data ids
 
@@ -416,6 +494,10 @@ class AInalysisResults:
         are returned. If `calibrated` is set to `False`, the raw prediction
         results will be returned either way.
 
+        Calibration maps every prediction to the value of the nearest bin (see
+        :func:`phenoai.utils.nearest_bin`). The calibrated predictions are
+        calculated for all predictions at once and cached on this object.
+
         Parameters
         ----------
         i: :obj:`int`, :obj:`numpy.ndarray`, optional
@@ -431,24 +513,35 @@ class AInalysisResults:
         predictions: :obj:`numpy.ndarray`
             Requested (calibrated) predictions. """
 
-        # Get predictions
-        preds = self.get(self.predictions, i)
         # Check requirements for calibration
         if calibrated:
             if self.configuration["type"] == 'classifier':
                 if not self.configuration["classifier.calibrated"]:
                     if self.configuration["classifier.calibrate"]:
-                        # Get calibration configuration
-                        bins = self.configuration["classifier.calibrate.bins"]
-                        values = self.configuration[
-                            "classifier.calibrate.bins"]
-                        # Perform calibration
-                        predscal = np.zeros(len(preds))
-                        for j, prediction in enumerate(preds):
-                            b = np.argmin(np.abs(bins - prediction))
-                            predscal[j] = values[b]
-                        return predscal
-        return preds
+                        return self.get(self._get_calibrated_predictions(), i)
+        return self.get(self.predictions, i)
+
+    def _get_calibrated_predictions(self):
+        """ Returns the calibrated version of all predictions
+
+        The calibrated predictions are cached and only recalculated if the
+        :attr:`~phenoai.containers.AInalysisResults.predictions` property
+        was replaced.
+
+        Returns
+        -------
+        predictions: :obj:`numpy.ndarray`
+            Calibrated predictions. """
+        if (self._calibrated is None
+                or self._calibrated_source is not self.predictions):
+            bins = self.configuration["classifier.calibrate.bins"]
+            values = np.asarray(
+                self.configuration["classifier.calibrate.values"],
+                dtype=float)
+            self._calibrated = values[utils.nearest_bin(self.predictions,
+                                                        bins)]
+            self._calibrated_source = self.predictions
+        return self._calibrated
 
     def is_outlier(self, i=None, use_map_target_area=False):
         """ Returns information about whether or not data used in prediction
@@ -467,6 +560,9 @@ class AInalysisResults:
         Note that if mapping took place before prediction (checkable via the
         is_mapped method) all values returned will be False.
 
+        See :meth:`~phenoai.containers.AInalysisResults.get_outliers`, which
+        this method calls.
+
         Parameters
         ----------
         i: :obj:`int`, :obj:`numpy.ndarray`, optional
@@ -477,34 +573,71 @@ class AInalysisResults:
             Use the mapping target area as reference area instead of the area
             from which training data was sampled. If set to `True` but the
             mapping was not configured via a floating point value in the
-            AInalysis configuration, the method will continue as if this value
-            was set to `False`. Default is `False`.
+            AInalysis configuration, a
+            :exc:`phenoai.exceptions.ResultsException` is raised. Default is
+            `False`.
 
         Returns
         -------
-        outsider: :obj:`numpy.ndarray(bool)`
+        outsider: :obj:`numpy.ndarray(bool)`, :obj:`bool`
             Numpy array containing booleans. `True` if data point is an
-            outsider, `False` otherwise."""
+            outsider, `False` otherwise. If a single data point was selected a
+            single boolean is returned."""
+        return self.get_outliers(i, use_map_target_area)
 
-        if (not isinstance(self.configuration["mapping"], float)
-                and use_map_target_area):
-            raise exceptions.ResultsException(
-                "No mapping target area defined in AInalysis configuration.")
-        selection_mins = self.get(self.data, i)
-        selection_maxs = deepcopy(selection_mins)
-        for j in range(len(self.configuration["parameters"])):
-            i_min = self.configuration["parameters"][j][2]
-            i_max = self.configuration["parameters"][j][3]
-            if use_map_target_area:
-                r = (self.configuration["parameters"][j][3] -
-                     self.configuration["parameters"][j][2])
-                i_min += r * self.configuration["mapping"]
-                i_max -= r * self.configuration["mapping"]
-            selection_mins[j] -= i_min
-            selection_maxs[j] -= i_max
-        outofrange = (selection_mins[selection_mins < 0] * 1.0 +
-                      selection_maxs[selection_maxs > 0] * 1.0)
-        return np.sum(outofrange) == 1.0
+    def get_outliers(self, i=None, use_map_target_area=False, counts=False):
+        """ Returns for all selected data points at once whether they lie
+        outside of the region sampled with training data.
+
+        The parameter bounds are taken from the AInalysis configuration (see
+        :func:`phenoai.utils.parameter_bounds`) and compared with all selected
+        data points at once. The reference area is either the region from
+        which training data was sampled or, if `use_map_target_area` is
+        `True`, the target area of the mapping procedure.
+
+        Parameters
+        ----------
+        i: :obj:`int`, :obj:`str`, :obj:`list`, :obj:`numpy.ndarray`, optional
+            Reference used for selecting data. See the documentation for the
+            get method for allowed values and consequences. Default is `None`.
+        use_map_target_area: :obj:`bool`, optional
+            Use the mapping target area as reference area. Raises a
+            :exc:`phenoai.exceptions.ResultsException` if the mapping was not
+            configured via a floating point value. Default is `False`.
+        counts: :obj:`bool`, optional
+            Return per parameter the number of selected data points outside of
+            the reference area, instead of a mask per data point. Default is
+            `False`.
+
+        Returns
+        -------
+        outliers: :obj:`numpy.ndarray`, :obj:`bool`
+            If `counts` is `False`, an array of booleans of shape
+            `(nDatapoints,)` that is `True` for data points outside of the
+            reference area (a single boolean if a single data point was
+            selected). If `counts` is `True`, an array of integers of shape
+            `(nParameters,)` with the number of data points outside of the
+            reference area for each parameter. """
+        if use_map_target_area:
+            if not isinstance(self.configuration["mapping"], float):
+                raise exceptions.ResultsException(
+                    ("No mapping target area defined in AInalysis "
+                     "configuration."))
+            mapping = self.configuration["mapping"]
+        else:
+            mapping = 0.0
+        mins, maxs = utils.parameter_bounds(self.configuration["parameters"],
+                                            mapping)
+        selection = np.asarray(self.get(self.data, i))
+        single = selection.ndim == 1
+        selection = selection.reshape(-1, len(mins))
+        violations = (selection < mins) | (selection > maxs)
+        if counts:
+            return np.sum(violations, axis=0)
+        outliers = np.any(violations, axis=1)
+        if single:
+            return bool(outliers[0])
+        return outliers
 
     def is_mapped(self, i=None):
         """ Returns information about whether or not provided data was mapped
@@ -602,6 +735,7 @@ class PhenoAIResults:
 
     def __init__(self):
         self.results = []
+        self._index = {}
 
     def add(self, result):
         """ Appends an :obj:`~phenoai.containers.AInalysisResults` instance to
@@ -616,11 +750,12 @@ class PhenoAIResults:
         result: :obj:`phenoai.containers.AInalysisResults`
             :obj:`~phenoai.containers.AInalysisResults` that has to be added to
             the container. """
-        if self.get(result.result_id) is not None:
+        if self._find(result.result_id) is not None:
             raise exceptions.ResultsException(
                 ("Already an AInalysisResults instance stored with "
                  "AInalysisID '{}'").format(result.result_id))
         self.results.append(result)
+        self._index[result.result_id] = len(self.results) - 1
 
     def num(self):
         """ Returns the number of stored AInalysisResults in this container.
@@ -659,9 +794,12 @@ class PhenoAIResults:
             :obj:`~phenoai.containers.AInalysisResults` instance with the
             requested AInalysisID. If no such instance was found, `None` is
             returned. """
-        for i in range(len(self.results)):
-            if self.results[i].result_id == result_id:
-                return self.results[i]
+        try:
+            position = self._find(result_id)
+        except TypeError:
+            position = None
+        if position is not None:
+            return self.results[position]
         if (isinstance(result_id, int) and result_id >= 0
                 and result_id < len(self.results)):
             return self.results[result_id]
@@ -670,6 +808,38 @@ class PhenoAIResults:
     def __getitem__(self, result_id):
         return self.get(result_id)
 
+    def _find(self, result_id):
+        """ Returns the position of the
+        :obj:`~phenoai.containers.AInalysisResults` instance with a ResultID
+        in the :attr:`~phenoai.containers.PhenoAIResults.results` list
+
+        Positions are looked up in an index from ResultID to position, which
+        is kept up to date by :meth:`~phenoai.containers.PhenoAIResults.add`.
+        As the results list can also be changed directly, a position found in
+        the index is only used if the result at that position still has the
+        requested ResultID; otherwise (and if the ResultID is not in the
+        index) the index is rebuilt from the results list. If a ResultID
+        occurs more than once, the first position is used.
+
+        Parameters
+        ----------
+        result_id: :obj:`str`
+            ResultID to look for.
+
+        Returns
+        -------
+        position: :obj:`int`, `None`
+            Position of the result in the results list, `None` if no result
+            has the requested ResultID. """
+        position = self._index.get(result_id)
+        if (position is None or position >= len(self.results)
+                or self.results[position].result_id != result_id):
+            self._index = {}
+            for i, result in enumerate(self.results):
+                self._index.setdefault(result.result_id, i)
+            position = self._index.get(result_id)
+        return position
+
     def get_ids(self):
         """ Returns a list of the ResultIDs of all stored
         :obj:`~phenoai.containers.AInalysisResults` instances.
@@ -1,8 +1,15 @@
 import traceback
 import ast
+import gc
 import urllib
 import os
+import signal
+import threading
+import time
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
 from socketserver import ThreadingMixIn
 
 import numpy as np
@@ -17,6 +24,13 @@ from phenoai import utils
 
 __serverinstance__ = None
 
+# RequestBatcher used by the server to combine requests (if any)
+__serverbatcher__ = None
+
+# Estimators kept in memory by worker processes of a PhenoAI instance with a
+# process pool executor (static mode only), keyed by estimator folder
+__workerestimators__ = {}
+
 
 class PhenoAI:
     """ The main interface for running PhenoAI.
@@ -36,13 +50,39 @@ class PhenoAI:
     solves this problem by only loading the estimator of an AInalysis if it is
     needed to make a prediction. If it is loaded after this check and
     prediction has finished, the estimator is cleared from memory. This of
-    course comes at the cost of speed: loading the estimator takes time.
+    course comes at the cost of speed: loading the estimator takes time. Runs
+    that use the same instance concurrently (e.g. requests to a server) share
+    dynamically loaded estimators, which are cleared when the last of these
+    runs is finished.
 
     Instances of this class can also be run as a server via the run_as_server
     method. This locks the PhenoAI instance in its current modus, but allows
     :obj:`phenoai.client.phenoaiClient` instances to communicate with it over
     the network or internet.
 
+    AInalyses can be run concurrently by providing an executor. With a thread
+    pool every AInalysis and map mode is run as a separate job; estimators
+    that are loaded dynamically are cleared once all jobs are finished. With a
+    process pool every AInalysis (in all map modes) is run as a job in a
+    worker process, which loads the estimator itself. In static mode the
+    worker processes keep the estimators in memory for subsequent runs.
+    Results are always added to the returned
+    :obj:`phenoai.containers.PhenoAIResults` in the same order as when
+    running the AInalyses one after another.
+
+    Instead of the static and dynamic modes, the estimators can be managed by
+    an :obj:`phenoai.estimatorpool.EstimatorPool`, which keeps a bounded
+    number (or size) of estimators in memory and clears the least recently
+    or least frequently used ones. Worker processes of a process pool
+    executor do not use the estimator pool.
+
+    When running AInalyses one after another, the estimator of the next
+    AInalysis can be loaded on a background thread while the current one
+    predicts (`prefetch`), at the cost of having two estimators in memory at
+    the same time. Freshly loaded estimators can be warmed up with a dummy
+    prediction (`warm_up`), so that the first real prediction is not slowed
+    down by lazy initialisation of the estimator.
+
     Attributes
     ----------
     ainalyses: :obj:`list(ainalyses.AInalysis)`
@@ -55,9 +95,39 @@ class PhenoAI:
         If `True`, estimators of the AInalyses will be loaded only when
         necessary. When finished, the estimator will be cleared from memory.
         This property is useful when running on low RAM machines or when a
-        large collection of AInalyses is stored in the PhenoAI instance."""
+        large collection of AInalyses is stored in the PhenoAI instance.
+
+    executor: `None`, :obj:`str`, :obj:`concurrent.futures.Executor`
+        Executor used to run AInalyses concurrently: `None` (run one after
+        another), "thread", "process" or an executor instance.
+
+    n_workers: :obj:`int`, `None`
+        Number of workers of the executor created for "thread" and
+        "process". If `None`, the default of the executor class is used.
+
+    estimator_pool: :obj:`phenoai.estimatorpool.EstimatorPool`, `None`
+        Pool managing the loaded estimators. If set, the `dynamic` setting is
+        ignored when running AInalyses.
 
-    def __init__(self, dynamic=True):
+    prefetch: :obj:`bool`
+        Load the estimator of the next AInalysis in the run order in the
+        background while the current AInalysis predicts.
+
+    warm_up: :obj:`bool`
+        Make a dummy prediction with every estimator right after it is
+        loaded.
+
+    check_updates: :obj:`bool`, :obj:`str`, `None`
+        Mode of the update checks of added AInalyses, see
+        :func:`phenoai.updatechecker.get_mode`.
+
+    checksum_validation: :obj:`str`, `None`
+        Policy for validating the checksums of added AInalyses, see
+        :func:`phenoai.ainalyses.get_checksum_policy`."""
+
+    def __init__(self, dynamic=True, executor=None, n_workers=None,
+                 estimator_pool=None, prefetch=False, warm_up=False,
+                 check_updates=None, checksum_validation=None):
         """ Instantiates instance
 
         Parameters
@@ -67,9 +137,97 @@ class PhenoAI:
             necessary. When finished, the estimator will be cleared from
             memory. This property is useful when running on low RAM machines
             or when a large collection of AInalyses is stored in the PhenoAI
-            instance. Default is `True` """
+            instance. Default is `True`
+        executor: `None`, :obj:`str`, :obj:`concurrent.futures.Executor`.
+            Optional
+            Executor used to run AInalyses concurrently. Can be `None` (no
+            concurrency), "thread" (thread pool), "process" (process pool) or
+            an existing executor instance, which is not shut down by this
+            object. Default is `None`.
+        n_workers: :obj:`int`. Optional
+            Number of workers of the thread or process pool. If `None`, the
+            default of the pool class is used. Default is `None`.
+        estimator_pool: :obj:`phenoai.estimatorpool.EstimatorPool`.
+            Optional
+            Pool that loads and clears the estimators of the AInalyses. If
+            set, estimators are not loaded when AInalyses are added, and
+            they are kept in memory within the budget of the pool instead of
+            following the dynamic or static mode. Default is `None`.
+        prefetch: :obj:`bool`. Optional
+            If `True`, the estimator of the next AInalysis is loaded on a
+            background thread while the current AInalysis predicts. Only
+            used when AInalyses are run one after another. Default is
+            `False`.
+        warm_up: :obj:`bool`. Optional
+            If `True`, every estimator makes a prediction on a dummy data
+            point right after it is loaded (see
+            :meth:`phenoai.containers.Estimator.warm_up`). Default is
+            `False`.
+        check_updates: :obj:`bool`, :obj:`str`, `None`. Optional
+            Mode of the check for updates when an AInalysis is added: `True`
+            or "sync", "background" (never delays adding) or `False` or "off"
+            (e.g. on machines without internet access). If `None`, the mode
+            is taken from the environment, see
+            :func:`phenoai.updatechecker.get_mode`. Default is `None`.
+        checksum_validation: :obj:`str`, `None`. Optional
+            Policy for validating the checksums of added AInalyses: "full",
+            "cached", "lazy", "background" or "trusted". If `None`, the
+            policy is taken from the environment, see
+            :func:`phenoai.ainalyses.get_checksum_policy`. Default is
+            `None`. """
+        if (executor is not None and executor not in ["thread", "process"]
+                and not isinstance(executor, Executor)):
+            raise exceptions.PhenoAIException(
+                ("Executor has to be None, 'thread', 'process' or an "
+                 "Executor instance."))
         self.ainalyses = []
         self.dynamic = dynamic
+        self.executor = executor
+        self.n_workers = n_workers
+        self.estimator_pool = estimator_pool
+        self.prefetch = prefetch
+        self.warm_up = warm_up
+        self.check_updates = check_updates
+        self.checksum_validation = checksum_validation
+        self._pool = None
+        self._prefetcher = None
+        # Number of runs using each dynamically loaded estimator, so that
+        # concurrent runs (e.g. of a server) do not clear estimators in use
+        self._estimator_users = {}
+        self._estimator_lock = threading.Lock()
+
+    def get_executor(self):
+        """ Returns the executor used to run AInalyses concurrently
+
+        Thread and process pools are created on first use and reused for
+        subsequent runs, until :meth:`~phenoai.core.PhenoAI.close` is called.
+
+        Returns
+        -------
+        executor: :obj:`concurrent.futures.Executor`, `None`
+            The executor, or `None` if AInalyses are run one after another. """
+        if self.executor is None:
+            return None
+        if isinstance(self.executor, Executor):
+            return self.executor
+        if self._pool is None:
+            logger.debug("Creating {} pool for running AInalyses".format(
+                self.executor))
+            if self.executor == "thread":
+                self._pool = ThreadPoolExecutor(self.n_workers)
+            else:
+                self._pool = ProcessPoolExecutor(self.n_workers)
+        return self._pool
+
+    def close(self):
+        """ Shuts down the thread or process pool created by this object (if
+        any). A new pool is created when AInalyses are run again. """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown()
+            self._prefetcher = None
 
     def add(self, ainalysis_folder, ainalysis_id=None):
         """ Adds an AInalysis to the PhenoAI instance
@@ -94,8 +252,10 @@ class PhenoAI:
             `None`."""
         logger.info("Adding AInalysis to PhenoAI object")
         logger.set_indent("+")
-        a = ainalyses.AInalysis(ainalysis_folder, ainalysis_id,
-                                not self.dynamic)
+        # The estimator is only loaded once the ID is known to be unique
+        a = ainalyses.AInalysis(ainalysis_folder, ainalysis_id, False,
+                                self.check_updates,
+                                self.checksum_validation)
         logger.set_indent("-")
         if self.get(a.ainalysis_id) is not None:
             aid = a.ainalysis_id
@@ -104,6 +264,10 @@ class PhenoAI:
                 ("Cannot add AInalysis '{}' "
                  "with id '{}', ID is already "
                  "known").format(ainalysis_folder, aid))
+        if not self.dynamic and self.estimator_pool is None:
+            a.estimator.load()
+            if self.warm_up:
+                a.estimator.warm_up(len(a.configuration["parameters"]))
         logger.info("AInalysis '{}' added to PhenoAI object".format(
             a.ainalysis_id))
         self.ainalyses.append(a)
@@ -158,7 +322,10 @@ class PhenoAI:
                       address,
                       port,
                       logging_path=None,
-                      to_string_function=None):
+                      to_string_function=None,
+                      workers=None,
+                      graceful_timeout=30,
+                      batcher=None):
         """ Lets the :obj:`~phenoai.core.PhenoAI` instance into a server,
         allowing it to perform predictions on data sent to it from an external
         script.
@@ -208,6 +375,28 @@ class PhenoAI:
         generated string is always determined by the client via the requests
         made.
 
+        By default all requests are handled by threads of a single process,
+        so that predictions are limited by the GIL. If `workers` is set, the
+        server instead forks this number of worker processes (POSIX only),
+        which accept requests on the same socket. Before forking, the
+        estimators of all AInalyses are loaded (the instance is put in static
+        mode, or the estimator pool is filled within its budget) and the
+        garbage collector is frozen, so that the workers share the memory of
+        the estimators copy-on-write. The parent process supervises the
+        workers and restarts workers that die. Sending SIGTERM (or pressing
+        <Ctrl-C>) to the parent lets all workers finish the requests they
+        are handling and stops the server; workers that did not finish
+        within `graceful_timeout` seconds are killed. Sending SIGHUP to the
+        parent restarts all workers in the same graceful way. Estimators
+        that are not fork-safe (e.g. keras models on a tensorflow session)
+        cannot be used in this mode.
+
+        Many small concurrent requests can be combined into batches by
+        providing a :obj:`phenoai.batcher.RequestBatcher`, so that each
+        estimator is queried once per batch. Only requests with data values
+        are batched, not requests with files. With worker processes, every
+        worker batches its own requests.
+
         Parameters
         ----------
         address: :obj:`str` IP address of the server. 'localhost' is also a
@@ -224,14 +413,37 @@ class PhenoAI:
         to_string_function: :func:`function`, `None` Function used to convert
             :obj:`phenoai.containers.PhenoAIResults` instance to a string. See
             explanation above for more information. Can be set to `None` to use
-            the default function. """
+            the default function.
 
-        global __serverinstance__
+        workers: :obj:`int`, `None` Number of worker processes handling the
+            requests. If `None`, requests are handled by threads of this
+            process. Default is `None`.
+
+        graceful_timeout: :obj:`float` Time in seconds workers get to finish
+            their requests when the server is stopped or restarted, before
+            they are killed. Default is 30.
+
+        batcher: :obj:`phenoai.batcher.RequestBatcher`, `None` Batcher
+            combining requests with data values, created for this
+            :obj:`~phenoai.core.PhenoAI` instance. If `None`, every request
+            is run on its own. Default is `None`. """
+
+        global __serverinstance__, __serverbatcher__
         logger.info("Starting server...")
         logger.info("Checking for valid PhenoAI instance")
         if port < 1025:
             raise exceptions.ServerException(("Port of the server should be"
                                               "at least 1025."))
+        if workers is not None and (not isinstance(workers, int)
+                                    or workers < 1):
+            raise exceptions.ServerException(
+                "Number of workers of the server should be at least 1.")
+        if batcher is not None and batcher.phenoai is not self:
+            raise exceptions.ServerException(
+                "RequestBatcher should be created for this PhenoAI instance.")
+        if workers is not None and not hasattr(os, "fork"):
+            raise exceptions.ServerException(
+                "Worker processes are not supported on this platform.")
         server_address = (address, port)
 
         handler = PhenoAIRequestHandler
@@ -250,6 +462,7 @@ class PhenoAI:
         server = ThreadedHTTPServer(server_address, handler)
 
         __serverinstance__ = self
+        __serverbatcher__ = batcher
         if logging_path is not None:
             if logger.__filechannel__ is not None:
                 logger.warning(("File logging will be continued in server"
@@ -257,9 +470,122 @@ class PhenoAI:
                 logger.remove_file_channel()
             logger.info("Start logging to server log file")
             logger.to_file(logging_path)
+        if workers is not None:
+            self._serve_prefork(server, workers, graceful_timeout)
+            return
         logger.warning("Server is running! Use <Ctrl-C> to stop")
         server.serve_forever()
 
+    def _serve_prefork(self, server, workers, graceful_timeout):
+        """ Serves requests with forked worker processes
+
+        Loads the estimators of all AInalyses, forks the workers and
+        supervises them until the server is stopped. See
+        :meth:`~phenoai.core.PhenoAI.run_as_server`.
+
+        Parameters
+        ----------
+        server: :obj:`phenoai.core.ThreadedHTTPServer`
+            Server listening on the socket shared by the workers.
+        workers: :obj:`int`
+            Number of worker processes.
+        graceful_timeout: :obj:`float`
+            Time in seconds workers get to finish their requests when
+            stopped, before they are killed. """
+        logger.info("Loading estimators to share them with the workers")
+        self.close()
+        if self.estimator_pool is None:
+            self.is_dynamic(False)
+        else:
+            for ainalysis in self.ainalyses:
+                self.estimator_pool.acquire(ainalysis.estimator)
+                self.estimator_pool.release(ainalysis.estimator)
+        if self.warm_up:
+            for ainalysis in self.ainalyses:
+                if ainalysis.estimator.is_loaded():
+                    ainalysis.estimator.warm_up(
+                        len(ainalysis.configuration["parameters"]))
+        # Keep the garbage collector from touching (and thereby copying) the
+        # objects shared with the workers
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+        children = {}
+        state = {"stopping": False}
+
+        signals = [signal.SIGTERM, signal.SIGINT, signal.SIGHUP,
+                   signal.SIGALRM]
+
+        def spawn():
+            # Signals are blocked until the worker has its own handlers
+            signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+            pid = os.fork()
+            if pid == 0:
+                _serve_worker(server)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+            logger.debug("Started worker {}".format(pid))
+            children[pid] = time.time()
+
+        def terminate_children(signum=None, frame=None):
+            for pid in list(children):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+        def stop(signum, frame):
+            if state["stopping"]:
+                return
+            logger.warning("Stopping server, waiting for workers to finish")
+            state["stopping"] = True
+            terminate_children()
+            if graceful_timeout is not None:
+                signal.alarm(max(1, int(graceful_timeout)))
+
+        def kill(signum, frame):
+            for pid in list(children):
+                logger.warning("Killing worker {}".format(pid))
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+        def restart(signum, frame):
+            logger.warning("Restarting workers")
+            terminate_children()
+
+        previous = {signum: signal.getsignal(signum) for signum in signals}
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, restart)
+        signal.signal(signal.SIGALRM, kill)
+        try:
+            for _ in range(workers):
+                spawn()
+            logger.warning(("Server is running with {} workers! Use <Ctrl-C> "
+                            "to stop").format(workers))
+            while children:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                started = children.pop(pid, None)
+                if started is None or state["stopping"]:
+                    continue
+                logger.warning(("Worker {} exited with status {}, starting a "
+                                "new worker").format(pid, status))
+                # Do not restart workers that crash on start in a fast loop
+                if time.time() - started < 1:
+                    time.sleep(1)
+                spawn()
+        finally:
+            signal.alarm(0)
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+            server.server_close()
+            logger.info("Server stopped")
+
     def run(self, data, map_data=False, ainalysis_ids=None, data_ids=None):
         """ Queries each added AInalysis for prediction on provided data
 
@@ -310,68 +636,540 @@ class PhenoAI:
             array. If `None`, this functionality will not be available. Default
             is `None`."""
 
-        # Use PhenoAI object locally
-        # Create mapping iteration list
-        mapmodes = []
-        if map_data == "both":
-            mapmodes.append(True)
-            mapmodes.append(False)
-            logger.info("Running PhenoAI with mapmode 'both'")
-        else:
-            mapmodes.append(bool(map_data))
-            logger.info("Running PhenoAI with mapmode {}".format(
-                bool(map_data)))
-
+        mapmodes = self._get_mapmodes(map_data)
         # Create results object
         results = containers.PhenoAIResults()
-        # Loop over ainalyses to request prediction
-        for ainalysis in self.ainalyses:
-            # Load estimator if not loaded already
-            loaded = True
-            if self.dynamic and not ainalysis.estimator.is_loaded():
-                logger.debug("Loading estimator of AInalysis dynamically")
-                ainalysis.estimator.load()
-                loaded = False
-
-            # Iterate over mapmodes
-            for mapmode in mapmodes:
-                # Test if this AInalysis should be queried
-                if (ainalysis_ids is not None
-                        and ainalysis.ainalysis_id not in ainalysis_ids):
-                    continue
-
-                # If multi mapmode skip mapmode True if AInalysis does not
-                # allow mapping
-                if (isinstance(ainalysis.configuration['mapping'], bool)
-                        and ainalysis.configuration['mapping'] == 0.0
-                        and mapmode and len(mapmodes) > 1):
-                    continue
-                logger.info("Running AInalysis '{}' in map mode '{}'".format(
-                    ainalysis.ainalysis_id, mapmode))
-
-                # Do prediction
-                logger.set_indent("+")
-                result = ainalysis.run(data,
-                                       map_data=mapmode,
-                                       data_ids=data_ids)
-                logger.set_indent("-")
-                # Alter id if multi map mode
-                if len(mapmodes) > 1:
-                    if mapmode:
-                        result.result_id += "_mapped"
-                # Add result to AIResultContainer container
+        # Read files once for all AInalyses
+        jobs = self._prepare_inputs(self._select_ainalyses(ainalysis_ids),
+                                    data, data_ids)
+        # Run concurrently if an executor is configured
+        executor = self.get_executor()
+        if executor is not None:
+            for result in self._run_concurrently(executor, jobs, mapmodes):
                 results.add(result)
-
-            # Unload estimator
-            if not loaded:
-                logger.debug(("Clearing estimator of last AInalysis "
-                              "from memory"))
-                ainalysis.estimator.clear()
+            logger.info("PhenoAI run finished, returning result")
+            return results
+        # Loop over ainalyses to request prediction
+        prefetched = None
+        try:
+            for i, (ainalysis, ainalysis_data, ainalysis_data_ids) in (
+                    enumerate(jobs)):
+                # Load estimator if not loaded already (or wait for the
+                # prefetched estimator)
+                if prefetched is not None:
+                    future, prefetched = prefetched, None
+                    acquired = future.result()
+                else:
+                    acquired = self._acquire_estimator(ainalysis)
+                try:
+                    # Load the estimator of the next AInalysis in the
+                    # background
+                    if self.prefetch and i + 1 < len(jobs):
+                        prefetched = self._get_prefetcher().submit(
+                            self._acquire_estimator, jobs[i + 1][0])
+                    for result in self._run_ainalysis(ainalysis,
+                                                      ainalysis_data,
+                                                      mapmodes,
+                                                      ainalysis_data_ids):
+                        results.add(result)
+                finally:
+                    # Unload estimator
+                    if acquired:
+                        self._release_estimator(ainalysis)
+        finally:
+            # Release an estimator that was prefetched for an AInalysis that
+            # was not run because of an exception
+            if prefetched is not None:
+                try:
+                    if prefetched.result():
+                        self._release_estimator(jobs[i + 1][0])
+                except Exception:
+                    pass
 
         logger.info("PhenoAI run finished, returning result")
         # Return results object
         return results
 
+    def run_iter(self, data, map_data=False, ainalysis_ids=None,
+                 data_ids=None, chunksize=10000):
+        """ Queries each added AInalysis for prediction on a stream of data in
+        chunks
+
+        Generator version of :meth:`~phenoai.core.PhenoAI.run`. The data is
+        split into chunks of at most `chunksize` data points or file paths
+        (see :func:`phenoai.utils.iter_chunks`) and every chunk is sent to all
+        queried AInalyses. The results of every chunk are yielded as a
+        :obj:`phenoai.containers.PhenoAIResults` object as soon as they are
+        available, so that only one chunk of data and results is held in
+        memory at a time.
+
+        The estimators of all queried AInalyses are loaded once for the whole
+        stream, also in dynamic mode. In dynamic mode they are cleared from
+        memory again when the stream is finished (or the generator is
+        closed).
+
+        Parameters
+        ----------
+        data: :obj:`numpy.ndarray`, :obj:`str`, :obj:`list(str)`, iterable
+            Data that has to be subjected to the estimators. Can be the raw
+            data (numpy.ndarray), the location of a file, a list of file
+            locations or an iterable (e.g. a generator) yielding any of these.
+        map_data: :obj:`bool`, :obj:`str`. Optional
+            Determines if data has to be mapped before prediction. See
+            :meth:`~phenoai.core.PhenoAI.run`. Default is `False`.
+        ainalysis_ids: :obj:`list(str)`. Optional
+            If set, only AInalyses with an ID in this list are queried.
+            Default is `None`.
+        data_ids: iterable. Optional
+            IDs for the data points, consumed in the same order as the data.
+            Default is `None`.
+        chunksize: :obj:`int`. Optional
+            Maximum number of data points or files per chunk. Default is
+            10000.
+
+        Yields
+        ------
+        results: :obj:`phenoai.containers.PhenoAIResults`
+            Results of all queried AInalyses for a single chunk of data. """
+        mapmodes = self._get_mapmodes(map_data)
+        selected = self._select_ainalyses(ainalysis_ids)
+        loaded = []
+        try:
+            for ainalysis in selected:
+                if self._acquire_estimator(ainalysis):
+                    loaded.append(ainalysis)
+            for chunk, chunk_ids in utils.iter_chunks(data, chunksize,
+                                                      data_ids):
+                results = containers.PhenoAIResults()
+                for ainalysis, ainalysis_data, ainalysis_data_ids in (
+                        self._prepare_inputs(selected, chunk, chunk_ids)):
+                    for result in self._run_ainalysis(ainalysis,
+                                                      ainalysis_data,
+                                                      mapmodes,
+                                                      ainalysis_data_ids):
+                        results.add(result)
+                yield results
+        finally:
+            for ainalysis in loaded:
+                self._release_estimator(ainalysis)
+
+    def _acquire_estimator(self, ainalysis):
+        """ Makes sure the estimator of an AInalysis is loaded
+
+        If an estimator pool is set, the estimator is acquired from the pool.
+        Otherwise it is loaded in dynamic mode if it is not loaded yet.
+
+        Parameters
+        ----------
+        ainalysis: :obj:`phenoai.ainalyses.AInalysis`
+            AInalysis of which the estimator is needed.
+
+        Returns
+        -------
+        acquired: :obj:`bool`
+            `True` if :meth:`~phenoai.core.PhenoAI._release_estimator` has to
+            be called once the estimator is no longer needed. """
+        was_loaded = ainalysis.estimator.is_loaded()
+        if self.estimator_pool is not None:
+            self.estimator_pool.acquire(ainalysis.estimator)
+            acquired = True
+        elif self.dynamic:
+            with self._estimator_lock:
+                key = id(ainalysis.estimator)
+                users = self._estimator_users.get(key, 0)
+                was_loaded = ainalysis.estimator.is_loaded()
+                # Estimators loaded outside of a run are left alone
+                acquired = users > 0 or not was_loaded
+                if acquired:
+                    if not was_loaded:
+                        logger.debug(
+                            "Loading estimator of AInalysis dynamically")
+                        ainalysis.estimator.load()
+                    self._estimator_users[key] = users + 1
+        else:
+            acquired = False
+        if self.warm_up and not was_loaded:
+            ainalysis.estimator.warm_up(
+                len(ainalysis.configuration["parameters"]))
+        return acquired
+
+    def _get_prefetcher(self):
+        """ Returns the thread pool on which estimators are prefetched,
+        creating it on first use
+
+        Returns
+        -------
+        prefetcher: :obj:`concurrent.futures.ThreadPoolExecutor`
+            Thread pool with a single worker. """
+        if self._prefetcher is None:
+            self._prefetcher = ThreadPoolExecutor(1)
+        return self._prefetcher
+
+    def _release_estimator(self, ainalysis):
+        """ Releases an estimator acquired via
+        :meth:`~phenoai.core.PhenoAI._acquire_estimator`
+
+        Parameters
+        ----------
+        ainalysis: :obj:`phenoai.ainalyses.AInalysis`
+            AInalysis of which the estimator is no longer needed. """
+        if self.estimator_pool is not None:
+            self.estimator_pool.release(ainalysis.estimator)
+            return
+        with self._estimator_lock:
+            key = id(ainalysis.estimator)
+            users = self._estimator_users.get(key, 1) - 1
+            if users > 0:
+                # Still used by a concurrent run
+                self._estimator_users[key] = users
+                return
+            self._estimator_users.pop(key, None)
+            logger.debug("Clearing estimator of AInalysis from memory")
+            ainalysis.estimator.clear()
+
+    def _get_mapmodes(self, map_data):
+        """ Returns the list of map modes to run the AInalyses in
+
+        Parameters
+        ----------
+        map_data: :obj:`bool`, :obj:`str`
+            The `map_data` argument of :meth:`~phenoai.core.PhenoAI.run`.
+
+        Returns
+        -------
+        mapmodes: :obj:`list(bool)`
+            Map modes to run the AInalyses in. """
+        if map_data == "both":
+            logger.info("Running PhenoAI with mapmode 'both'")
+            return [True, False]
+        logger.info("Running PhenoAI with mapmode {}".format(bool(map_data)))
+        return [bool(map_data)]
+
+    def _select_ainalyses(self, ainalysis_ids=None):
+        """ Returns the AInalyses that have to be queried
+
+        Parameters
+        ----------
+        ainalysis_ids: :obj:`list(str)`, `None`
+            IDs of the AInalyses to query. If `None`, all AInalyses are
+            queried.
+
+        Returns
+        -------
+        ainalyses: :obj:`list(phenoai.ainalyses.AInalysis)`
+            AInalyses to query, in the order in which they were added. """
+        if ainalysis_ids is None:
+            return list(self.ainalyses)
+        return [ainalysis for ainalysis in self.ainalyses
+                if ainalysis.ainalysis_id in ainalysis_ids]
+
+    def _prepare_inputs(self, selected, data, data_ids=None):
+        """ Prepares the input of every AInalysis for a run
+
+        If file paths are provided, the files are read once for all AInalyses
+        instead of once per AInalysis (and map mode):
+
+        - AInalyses reading .slha files via a [BLOCK, SWITCH] reader list
+          share a single read of the files with the union of their reader
+          lists. Every AInalysis gets the columns of its own entries. Files
+          that could not be read with the union are read again with the
+          reader list of the AInalysis itself, so that a file only fails for
+          the AInalyses for which it lacks entries.
+        - AInalyses reading files via a `read` function in functions.py are
+          grouped by the checksum of their functions.py file. Every group
+          reads the files once.
+
+        AInalyses without file reader get the file paths as they are, so that
+        running them raises the usual exception.
+
+        Parameters
+        ----------
+        selected: :obj:`list(phenoai.ainalyses.AInalysis)`
+            AInalyses to run.
+        data: :obj:`numpy.ndarray`, :obj:`str`, :obj:`list(str)`
+            Data or file paths provided to the run.
+        data_ids: :obj:`list`, :obj:`numpy.ndarray`, `None`
+            IDs for the data points provided to the run.
+
+        Returns
+        -------
+        jobs: :obj:`list(tuple)`
+            List of `(ainalysis, data, data_ids)` tuples with the input for
+            every AInalysis. If files were read, the data IDs are the paths
+            of the files that could be read. """
+        if isinstance(data, str) or io.is_buffer(data):
+            data = [data]
+        if not (isinstance(data, list) and data
+                and (isinstance(data[0], str) or io.is_buffer(data[0]))):
+            return [(ainalysis, data, data_ids) for ainalysis in selected]
+        paths = data
+        inputs = {}
+        slha = []
+        functions = {}
+        for ainalysis in selected:
+            reader = ainalysis.configuration["filereader"]
+            n_parameters = len(ainalysis.configuration["parameters"])
+            if isinstance(reader, list) and len(reader) == n_parameters:
+                slha.append(ainalysis)
+            elif reader == "function":
+                key = (utils.calculate_file_checksum(ainalysis.folder +
+                                                     "/functions.py"),
+                       n_parameters)
+                functions.setdefault(key, []).append(ainalysis)
+        # Reader lists: read the union of all entries once
+        if slha:
+            columns = {}
+            union = []
+            for ainalysis in slha:
+                for entry in ainalysis.configuration["filereader"]:
+                    key = io.slha_entry_key(entry)
+                    if key not in columns:
+                        columns[key] = len(union)
+                        union.append(entry)
+            logger.info(("Reading {} file(s) once for {} AInalyses with "
+                         "{} entries").format(len(paths), len(slha),
+                                              len(union)))
+            n_workers = max(ainalysis.read_workers for ainalysis in slha)
+            cache = next((ainalysis.file_cache for ainalysis in slha
+                          if ainalysis.file_cache is not None), None)
+            reader = io if cache is None else cache
+            shared, failures = reader.read_files(paths, union, len(union),
+                                                 n_workers,
+                                                 slha[0].read_chunksize)
+            failed = sorted(failure[0] for failure in failures)
+            rereads = {}
+            for ainalysis in slha:
+                ainalysis.check_file_formats(paths)
+                entries = ainalysis.configuration["filereader"]
+                cols = [columns[io.slha_entry_key(entry)]
+                        for entry in entries]
+                if cols == list(range(cols[0], cols[0] + len(cols))):
+                    ainalysis_data = shared[:, cols[0]:cols[0] + len(cols)]
+                else:
+                    ainalysis_data = shared[:, cols]
+                ainalysis_failures = failures
+                if failed and len(entries) < len(union):
+                    # Files might only lack entries of other AInalyses
+                    if tuple(cols) not in rereads:
+                        rereads[tuple(cols)] = io.read_files(
+                            [paths[i] for i in failed], entries, len(entries),
+                            ainalysis.read_workers, ainalysis.read_chunksize)
+                    reread, reread_failures = rereads[tuple(cols)]
+                    ainalysis_data = np.array(ainalysis_data)
+                    ainalysis_data[failed] = reread
+                    ainalysis_failures = [
+                        (failed[j], path, message)
+                        for j, path, message in reread_failures
+                    ]
+                ainalysis.log_read_failures(paths, ainalysis_failures)
+                inputs[id(ainalysis)] = ainalysis.drop_read_failures(
+                    ainalysis_data, paths, ainalysis_failures)
+        # Function readers: read once per functions.py file
+        for group in functions.values():
+            logger.info("Reading {} file(s) once for {} AInalyses".format(
+                len(paths), len(group)))
+            group_data, failures = group[0].read_files(paths,
+                                                       return_failures=True)
+            for ainalysis in group:
+                if ainalysis is not group[0]:
+                    ainalysis.check_file_formats(paths)
+                inputs[id(ainalysis)] = ainalysis.drop_read_failures(
+                    group_data, paths, failures)
+        return [(ainalysis, ) + inputs.get(id(ainalysis), (paths, data_ids))
+                for ainalysis in selected]
+
+    def _run_ainalysis(self, ainalysis, data, mapmodes, data_ids=None):
+        """ Runs a single AInalysis in all requested map modes
+
+        Parameters
+        ----------
+        ainalysis: :obj:`phenoai.ainalyses.AInalysis`
+            AInalysis to run.
+        data: :obj:`numpy.ndarray`, :obj:`str`, :obj:`list(str)`
+            Data that has to be subjected to the estimator.
+        mapmodes: :obj:`list(bool)`
+            Map modes to run the AInalysis in.
+        data_ids: :obj:`list`, :obj:`numpy.ndarray`, `None`
+            IDs for the data points.
+
+        Returns
+        -------
+        results: :obj:`list(phenoai.containers.AInalysisResults)`
+            Results of the AInalysis, one for each map mode it was run in. """
+        return _run_ainalysis(ainalysis, data, mapmodes, data_ids)
+
+    def _run_concurrently(self, executor, jobs, mapmodes):
+        """ Runs AInalyses concurrently via an executor
+
+        Parameters
+        ----------
+        executor: :obj:`concurrent.futures.Executor`
+            Executor to submit the jobs to.
+        jobs: :obj:`list(tuple)`
+            List of `(ainalysis, data, data_ids)` tuples, as returned by
+            :meth:`~phenoai.core.PhenoAI._prepare_inputs`.
+        mapmodes: :obj:`list(bool)`
+            Map modes to run the AInalyses in.
+
+        Returns
+        -------
+        results: :obj:`list(phenoai.containers.AInalysisResults)`
+            Results of all AInalyses in all map modes, in the same order as
+            when running them one after another. """
+        logger.info("Running {} AInalyses concurrently".format(len(jobs)))
+        if isinstance(executor, ProcessPoolExecutor):
+            futures = [
+                executor.submit(_run_ainalysis_in_worker, ainalysis, data,
+                                mapmodes, data_ids, self.dynamic)
+                for ainalysis, data, data_ids in jobs
+            ]
+            return [result for future in futures for result in future.result()]
+        # Thread pool: one job per AInalysis and map mode. Estimators are
+        # loaded by the first job that needs them and cleared after all jobs
+        # are finished.
+        locks = {id(job[0]): threading.Lock() for job in jobs}
+        loaded = []
+
+        def run_job(ainalysis, data, data_ids, mapmode):
+            with locks[id(ainalysis)]:
+                if (ainalysis not in loaded
+                        and self._acquire_estimator(ainalysis)):
+                    loaded.append(ainalysis)
+            return _run_ainalysis(ainalysis, data, mapmodes, data_ids,
+                                  [mapmode])
+
+        try:
+            futures = [
+                executor.submit(run_job, ainalysis, data, data_ids, mapmode)
+                for ainalysis, data, data_ids in jobs for mapmode in mapmodes
+            ]
+            return [result for future in futures for result in future.result()]
+        finally:
+            for ainalysis in loaded:
+                self._release_estimator(ainalysis)
+
+
+def _run_ainalysis(ainalysis, data, mapmodes, data_ids=None, run_modes=None):
+    """ Runs a single AInalysis in all requested map modes
+
+    Parameters
+    ----------
+    ainalysis: :obj:`phenoai.ainalyses.AInalysis`
+        AInalysis to run.
+    data: :obj:`numpy.ndarray`, :obj:`str`, :obj:`list(str)`
+        Data that has to be subjected to the estimator.
+    mapmodes: :obj:`list(bool)`
+        All map modes requested for the PhenoAI run.
+    data_ids: :obj:`list`, :obj:`numpy.ndarray`, `None`
+        IDs for the data points.
+    run_modes: :obj:`list(bool)`, `None`
+        Subset of the map modes to actually run. If `None`, all map modes are
+        run. Default is `None`.
+
+    Returns
+    -------
+    results: :obj:`list(phenoai.containers.AInalysisResults)`
+        Results of the AInalysis, one for each map mode it was run in. """
+    results = []
+    for mapmode in (mapmodes if run_modes is None else run_modes):
+        # If multi mapmode skip mapmode True if AInalysis does not
+        # allow mapping
+        if (isinstance(ainalysis.configuration['mapping'], bool)
+                and ainalysis.configuration['mapping'] == 0.0
+                and mapmode and len(mapmodes) > 1):
+            continue
+        logger.info("Running AInalysis '{}' in map mode '{}'".format(
+            ainalysis.ainalysis_id, mapmode))
+        # Do prediction
+        logger.set_indent("+")
+        result = ainalysis.run(data, map_data=mapmode, data_ids=data_ids)
+        logger.set_indent("-")
+        # Alter id if multi map mode
+        if len(mapmodes) > 1:
+            if mapmode:
+                result.result_id += "_mapped"
+        results.append(result)
+    return results
+
+
+def _run_ainalysis_in_worker(ainalysis, data, mapmodes, data_ids, dynamic):
+    """ Runs a single AInalysis in all requested map modes in a worker
+    process of a :obj:`phenoai.core.PhenoAI` process pool
+
+    The estimator is loaded in the worker process. In static mode (`dynamic`
+    is `False`) it is kept in memory for subsequent runs, as long as the
+    estimator files in the AInalysis folder do not change.
+
+    Parameters
+    ----------
+    ainalysis: :obj:`phenoai.ainalyses.AInalysis`
+        AInalysis to run.
+    data: :obj:`numpy.ndarray`, :obj:`str`, :obj:`list(str)`
+        Data that has to be subjected to the estimator.
+    mapmodes: :obj:`list(bool)`
+        Map modes to run the AInalysis in.
+    data_ids: :obj:`list`, :obj:`numpy.ndarray`, `None`
+        IDs for the data points.
+    dynamic: :obj:`bool`
+        Dynamic mode of the PhenoAI instance.
+
+    Returns
+    -------
+    results: :obj:`list(phenoai.containers.AInalysisResults)`
+        Results of the AInalysis, one for each map mode it was run in. """
+    path = ainalysis.estimator.path
+    stamp = tuple(sorted(
+        (f, os.stat(os.path.join(path, f)).st_mtime_ns)
+        for f in os.listdir(path) if f.startswith("estimator.")))
+    cached = __workerestimators__.get(path)
+    if not dynamic and cached is not None and cached[0] == stamp:
+        ainalysis.estimator = cached[1]
+    if not ainalysis.estimator.is_loaded():
+        ainalysis.estimator.load()
+    try:
+        return _run_ainalysis(ainalysis, data, mapmodes, data_ids)
+    finally:
+        if dynamic:
+            ainalysis.estimator.clear()
+        else:
+            __workerestimators__[path] = (stamp, ainalysis.estimator)
+
+
+def _serve_worker(server):
+    """ Serves requests in a worker process forked by
+    :meth:`phenoai.core.PhenoAI.run_as_server`
+
+    The worker finishes the requests it is handling and exits on SIGTERM.
+    Interrupts and hangups are left to the supervising parent process. This
+    function never returns.
+
+    Parameters
+    ----------
+    server: :obj:`phenoai.core.ThreadedHTTPServer`
+        Server listening on the socket shared by the workers. """
+    def drain(signum, frame):
+        # shutdown() blocks until serve_forever returns, so it cannot be
+        # called from the thread running serve_forever
+        server.draining = True
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, drain)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, [
+        signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGALRM])
+    status = 0
+    try:
+        server.serve_forever()
+        # Waits for the threads handling requests to finish
+        server.server_close()
+    except BaseException:
+        logger.error(traceback.format_exc())
+        status = 1
+    finally:
+        os._exit(status)
+
 
 class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     """ ThreadedHTTPServer implements multithreading for HTTP servers and is
@@ -379,8 +1177,15 @@ class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
 
     Users do not have to interact with this method directly, it is created
     automatically and correctly when calling the
-    :obj:`phenoai.core.PhenoAI.run_as_server` method. """
-    pass
+    :obj:`phenoai.core.PhenoAI.run_as_server` method.
+
+    Attributes
+    ----------
+    draining: :obj:`bool`
+        Boolean indicating if the server is stopping. Persistent connections
+        are then closed after the response that is being handled. """
+
+    draining = False
 
 
 class PhenoAIRequestHandler(BaseHTTPRequestHandler):
@@ -389,8 +1194,37 @@ class PhenoAIRequestHandler(BaseHTTPRequestHandler):
     Users do not have to interact with this method directly, it is created
     automatically and correctly when calling the
     :obj:`phenoai.core.PhenoAI.run_as_server` method of a PhenoAI instance.
+
+    Besides URL-encoded text, POST requests can be sent as binary message
+    (see :func:`phenoai.io.encode_binary`) with content type
+    `phenoai.io.BINARY_CONTENT_TYPE`. If the request contains a
+    "response_format" entry set to "arrays", results are returned as binary
+    message as well (see
+    :meth:`~phenoai.core.PhenoAIRequestHandler.encode_results`), referencing
+    the configurations of the AInalyses by AInalysis ID and version. These
+    configurations can be requested with mode "configuration". The formats
+    supported by the server are listed in the "X-PhenoAI-Formats" header of
+    the response to GET requests.
+
+    Connections are kept alive (HTTP/1.1) between requests, so that clients
+    do not have to set up a new connection for every request. Idle
+    connections are closed after `timeout` seconds.
+
+    Attributes
+    ----------
+    formats: :obj:`list(str)`
+        Message formats supported by the server besides URL-encoded text.
+    timeout: :obj:`float`
+        Time in seconds after which an idle connection is closed.
     """
 
+    formats = ["binary", "arrays"]
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+    # Headers and body are written separately, which would be delayed by
+    # Nagle's algorithm on persistent connections
+    disable_nagle_algorithm = True
+
     def do_GET(self):
         """ Takes care of the handling of HTTP GET requests made to PhenoAI
 
@@ -400,17 +1234,48 @@ class PhenoAIRequestHandler(BaseHTTPRequestHandler):
         directly, it is automatically called when needed. """
         logger.info(("Received GET request from {} - Connection availability "
                      "is probably checked").format(self.client_address[0]))
-        # Send response status code
+        # Write content as utf-8 data
+        self._send('text/html',
+                   bytes(("phenoai-ok :: Predictions can only be made"
+                          "via POST request.<br />Use the "
+                          "phenoai.client module or the C++ interface "
+                          "to do this easily."), "utf8"),
+                   {'X-PhenoAI-Formats': ",".join(self.formats)})
+
+    def log_error(self, format, *args):
+        """ Logs errors of the handler. Timeouts of idle connections are
+        expected and only logged as debug message. """
+        if format.startswith("Request timed out"):
+            logger.debug("Closing idle connection from {}".format(
+                self.client_address[0]))
+            return
+        super().log_error(format, *args)
+
+    def _send(self, content_type, body, headers=None):
+        """ Sends a response with status code 200
+
+        The length of the body is sent along, so that the connection can be
+        kept alive. If the server is stopping, the connection is closed after
+        the response.
+
+        Parameters
+        ----------
+        content_type: :obj:`str`
+            Content type of the body.
+        body: :obj:`bytes`
+            Body of the response.
+        headers: :obj:`dict`, `None`, optional
+            Additional headers. Default is `None`. """
         self.send_response(200)
-        # Send headers
-        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if getattr(self.server, "draining", False):
+            self.send_header('Connection', 'close')
+            self.close_connection = True
         self.end_headers()
-        # Write content as utf-8 data
-        self.wfile.write(
-            bytes(("phenoai-ok :: Predictions can only be made"
-                   "via POST request.<br />Use the "
-                   "phenoai.client module or the C++ interface "
-                   "to do this easily."), "utf8"))
+        self.wfile.write(body)
 
     def do_POST(self):
         """ Takes care of the handling of HTTP POST requests made to PhenoAI
@@ -426,33 +1291,54 @@ class PhenoAIRequestHandler(BaseHTTPRequestHandler):
         try:
             # Get POST data
             post = self.rfile.read(int(self.headers['Content-Length']))
-            post = post.decode('utf-8')
-            post = urllib.parse.parse_qs(post, keep_blank_values=1)
-            for k, p in post.items():
-                post[k] = p[0]
+            content_type = self.headers.get('Content-Type', '')
+            if content_type.startswith(io.BINARY_CONTENT_TYPE):
+                logger.debug("Decoding binary message")
+                post, arrays = io.decode_binary(post)
+                post["data"] = arrays["data"]
+            else:
+                post = post.decode('utf-8')
+                post = urllib.parse.parse_qs(post, keep_blank_values=1)
+                for k, p in post.items():
+                    post[k] = p[0]
             # Split by mode
+            message = None
             if post["mode"] == "values":
                 results = self._do_post_values(post)
             elif post["mode"] == "file":
                 results = self._do_post_file(post)
+            elif post["mode"] == "configuration":
+                results = self._do_post_configuration(post)
             else:
                 raise exceptions.ServerException(
-                    ("Mode not recognized, should be either 'values' or "
-                     "'file'. Provided was '{}'.").format(post['mode']))
+                    ("Mode not recognized, should be either 'values', 'file' "
+                     "or 'configuration'. Provided was '{}'.").format(
+                         post['mode']))
 
-            if ("get_results_as_string" in post
+            if post["mode"] == "configuration":
+                logger.debug("Encoding configurations to pickle")
+                results_txt = io.pickle(results)
+            elif ("get_results_as_string" in post
                     and float(post["get_results_as_string"]) == 1.0):
                 logger.debug("Converting results object to string")
                 # Return lists of results, not PhenoAIResults object
                 results_txt = self.convert_result_object_to_string(results)
             else:
                 # Convert to pickled instance
-                logger.debug("Encoding results object to pickle")
-                results_txt = io.pickle(results)
-            returndict = {"status": "ok", "results": results_txt}
+                if post.get("response_format") == "arrays":
+                    message = self.encode_results(
+                        results, post["mode"] == "values")
+                if message is None:
+                    logger.debug("Encoding results object to pickle")
+                    results_txt = io.pickle(results)
+            returndict = {"status": "ok", "results": None}
+            if message is None:
+                returndict["results"] = results_txt
         except Exception as e:
             x = traceback.format_exc()
             logger.error(x)
+            # The request may not have been read completely
+            self.close_connection = True
             returndict = {
                 "status": "error",
                 "type": str(type(e).__name__),
@@ -460,16 +1346,69 @@ class PhenoAIRequestHandler(BaseHTTPRequestHandler):
             }
 
         logger.info("Return results")
-        # Send response status code
-        self.send_response(200)
-        # Send headers
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        # Write content as utf-8 data
-        returntext = json.dumps(returndict)
-        self.wfile.write(bytes(returntext, "utf8"))
+        if returndict["status"] == "ok" and message is not None:
+            self._send(io.BINARY_CONTENT_TYPE, message)
+        else:
+            # Write content as utf-8 data
+            returntext = json.dumps(returndict)
+            self._send('text/html', bytes(returntext, "utf8"))
         logger.set_indent("-")
 
+    def encode_results(self, results, omit_data=False):
+        """ Encodes a :obj:`phenoai.containers.PhenoAIResults` object as
+        binary message
+
+        The message (see :func:`phenoai.io.encode_binary`) contains the
+        predictions, data and mapping masks of all
+        :obj:`~phenoai.containers.AInalysisResults` as arrays. Data IDs and
+        the AInalysis ID and version (the "ainalysisversion" entry of the
+        configuration) of each result are stored in the header. The
+        configurations themselves are not sent, clients request them
+        separately and cache them.
+
+        Parameters
+        ----------
+        results: :obj:`phenoai.containers.PhenoAIResults`
+            Results to encode.
+        omit_data: :obj:`bool`
+            Boolean indicating if the data of results that were not mapped
+            can be left out, because the client sent this data itself.
+            Default is `False`.
+
+        Returns
+        -------
+        message: :obj:`bytes`, `None`
+            Binary message. If the results cannot be encoded (e.g. because
+            the predictions are not numerical), `None` is returned. """
+        header = {"status": "ok", "results": []}
+        arrays = {}
+        for i, result in enumerate(results.results):
+            ainalysis_id = result.result_id
+            if (__serverinstance__.get(ainalysis_id) is None
+                    and ainalysis_id.endswith("_mapped")):
+                ainalysis_id = ainalysis_id[:-len("_mapped")]
+            ainalysis = __serverinstance__.get(ainalysis_id)
+            if ainalysis is None:
+                return None
+            mapped = isinstance(result.mapped, np.ndarray)
+            header["results"].append({
+                "result_id": result.result_id,
+                "ainalysis_id": ainalysis_id,
+                "version": ainalysis.configuration["ainalysisversion"],
+                "data_ids": result.data_ids,
+                "mapped": mapped or bool(result.mapped)
+            })
+            arrays["predictions.{}".format(i)] = result.predictions
+            if mapped:
+                arrays["mapped.{}".format(i)] = result.mapped
+            if mapped or not omit_data:
+                arrays["data.{}".format(i)] = result.data
+        try:
+            return io.encode_binary(header, arrays)
+        except (exceptions.PhenoAIException, TypeError, ValueError):
+            logger.debug("Results could not be encoded as arrays")
+            return None
+
     def _do_post_values(self, post):
         """ Handle server queries when provided bare values
 
@@ -487,8 +1426,11 @@ class PhenoAIRequestHandler(BaseHTTPRequestHandler):
             Results of the prediction routine by the PhenoAI object
         """
         logger.debug("Received raw values")
-        # Predict lists of values
-        data = ast.literal_eval(post['data'])
+        # Predict lists of values, binary messages contain an array already
+        if isinstance(post['data'], np.ndarray):
+            data = post['data']
+        else:
+            data = np.array(ast.literal_eval(post['data']))
         if not "data_ids" in post:
             data_ids = None
         elif post["data_ids"] == "false" or post["data_ids"] == "False":
@@ -503,11 +1445,48 @@ class PhenoAIRequestHandler(BaseHTTPRequestHandler):
             if ainalysis_ids == "all":
                 ainalysis_ids = None
         logger.debug(("Calling run procedure of PhenoAI server " "instance"))
-        return __serverinstance__.run(np.array(data),
+        if __serverbatcher__ is not None:
+            return __serverbatcher__.run(data,
+                                         map_data=bool(float(post['mapping'])),
+                                         ainalysis_ids=ainalysis_ids,
+                                         data_ids=data_ids)
+        return __serverinstance__.run(data,
                                       map_data=bool(float(post['mapping'])),
                                       ainalysis_ids=ainalysis_ids,
                                       data_ids=data_ids)
 
+    def _do_post_configuration(self, post):
+        """ Handle server queries for configurations of AInalyses
+
+        Should not be interacted with directly, but only through the do_POST
+        method of this class.
+
+        Parameters
+        ----------
+        post: :obj:dict
+            Dictionary containing POST headers
+
+        Returns
+        -------
+        configurations: :obj:`dict`
+            Dictionary with a tuple of the version and the configuration
+            dictionary for each of the requested AInalyses, keyed by
+            AInalysis ID.
+        """
+        logger.debug("Received request for configurations")
+        ainalysis_ids = ast.literal_eval(post["ainalysis_ids"])
+        configurations = {}
+        for ainalysis_id in ainalysis_ids:
+            ainalysis = __serverinstance__.get(ainalysis_id)
+            if ainalysis is None:
+                raise exceptions.ServerException(
+                    "No AInalysis with ID '{}' on the server.".format(
+                        ainalysis_id))
+            configurations[ainalysis_id] = (
+                ainalysis.configuration["ainalysisversion"],
+                ainalysis.configuration.configuration)
+        return configurations
+
     def _do_post_file(self, post):
         """ Handle server queries when provided with a file
 
@@ -527,36 +1506,20 @@ class PhenoAIRequestHandler(BaseHTTPRequestHandler):
         logger.debug("Received file to be interpreted")
         data_ids = ast.literal_eval(post["data_ids"])
         ainalysis_ids = ast.literal_eval(post["ainalysis_ids"])
+        if ainalysis_ids == "all":
+            ainalysis_ids = None
 
-        # Create files in tmp folder
-        filepath = "/tmp/{}.phenoai".format(utils.random_string(16))
-        filepath_interpreted = "/tmp/{}_interpreted.phenoai".format(
-            utils.random_string(16))
+        # Parse the file from memory, named after the file at the client so
+        # that readers can check its extension
+        source = StringIO(post['data'])
+        if isinstance(data_ids, list) and data_ids:
+            source.name = str(data_ids[0])
 
         logger.debug("Calling run() on PhenoAI server instance")
-        try:
-            with open(filepath, "w") as tmpfile:
-                tmpfile.write(post['data'])
-            results = __serverinstance__.run(filepath,
-                                             map_data=bool(
-                                                 float(post['mapping'])),
-                                             ainalysis_ids=ainalysis_ids,
-                                             data_ids=data_ids)
-            os.remove(filepath)
-        except Exception:
-            with open(filepath_interpreted, "w") as tmpfile:
-                tmpfile.write(post['data'])
-            results = __serverinstance__.run(filepath_interpreted,
-                                             map_data=bool(
-                                                 float(post['mapping'])),
-                                             ainalysis_ids=ainalysis_ids,
-                                             data_ids=data_ids)
-            os.remove(filepath_interpreted)
-
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        if os.path.exists(filepath_interpreted):
-            os.remove(filepath_interpreted)
+        results = __serverinstance__.run(source,
+                                         map_data=bool(float(post['mapping'])),
+                                         ainalysis_ids=ainalysis_ids,
+                                         data_ids=data_ids)
 
         return results
 
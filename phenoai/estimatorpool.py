@@ -0,0 +1,356 @@
+""" Memory-budgeted pool of loaded estimators
+
+This module implements the :obj:`phenoai.estimatorpool.EstimatorPool` class,
+which keeps a bounded number of estimators in memory. It sits on top of the
+:meth:`~phenoai.containers.Estimator.load` and
+:meth:`~phenoai.containers.Estimator.clear` methods of the estimators: an
+estimator is loaded when it is needed and not in memory yet, and estimators
+that were not needed for the longest time (LRU) or least often (LFU) are
+cleared again when the budget is exceeded.
+
+The budget can be set as a maximum number of loaded estimators and/or a
+maximum number of bytes. The size of an estimator is estimated by the size of
+its estimator.* files on disk. """
+
+import os
+import threading
+import time
+
+from phenoai import exceptions
+from phenoai import logger
+
+
+class EstimatorPool:
+    """ Pool of loaded estimators with LRU or LFU eviction
+
+    Estimators are requested via
+    :meth:`~phenoai.estimatorpool.EstimatorPool.acquire`, which loads them if
+    necessary, and handed back via
+    :meth:`~phenoai.estimatorpool.EstimatorPool.release`. Estimators that are
+    acquired but not released yet are never evicted, nor are estimators that
+    are pinned via :meth:`~phenoai.estimatorpool.EstimatorPool.pin`. If the
+    budget cannot be met because all loaded estimators are in use or pinned,
+    the budget is exceeded temporarily.
+
+    The pool keeps a reference to every estimator it has seen, so that its
+    use can be tracked between acquisitions. Estimators that will not be used
+    anymore (e.g. of an AInalysis that was reloaded) should be removed from
+    the pool via :meth:`~phenoai.estimatorpool.EstimatorPool.discard`.
+
+    The pool can be used by a :obj:`phenoai.core.PhenoAI` instance via its
+    `estimator_pool` argument, replacing the static and dynamic modes.
+
+    Attributes
+    ----------
+    max_estimators: :obj:`int`, `None`
+        Maximum number of loaded estimators. `None` means no limit.
+    max_bytes: :obj:`int`, `None`
+        Maximum total size of the loaded estimators in bytes, as estimated by
+        :meth:`~phenoai.estimatorpool.EstimatorPool.estimator_size`. `None`
+        means no limit.
+    policy: :obj:`str`
+        Eviction policy: "lru" (least recently used) or "lfu" (least
+        frequently used, ties broken by least recent use).
+    hits: :obj:`int`
+        Number of acquired estimators that were already loaded.
+    misses: :obj:`int`
+        Number of acquired estimators that had to be loaded.
+    evictions: :obj:`int`
+        Number of estimators cleared to stay within the budget.
+    load_time: :obj:`float`
+        Total time in seconds spent loading estimators. """
+
+    def __init__(self, max_estimators=None, max_bytes=None, policy="lru"):
+        """ Initialises the EstimatorPool object
+
+        Parameters
+        ----------
+        max_estimators: :obj:`int`, `None`, optional
+            Maximum number of loaded estimators. Default is `None` (no
+            limit).
+        max_bytes: :obj:`int`, `None`, optional
+            Maximum total size of the loaded estimators in bytes. Default is
+            `None` (no limit).
+        policy: :obj:`str`, optional
+            Eviction policy, "lru" or "lfu". Default is "lru". """
+        if policy not in ["lru", "lfu"]:
+            raise exceptions.PhenoAIException(
+                "Unknown eviction policy '{}', use 'lru' or 'lfu'.".format(
+                    policy))
+        for limit in [max_estimators, max_bytes]:
+            if limit is not None and limit < 1:
+                raise exceptions.PhenoAIException(
+                    "Limits of an EstimatorPool have to be at least 1.")
+        self.max_estimators = max_estimators
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+        self._entries = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimator_size(estimator):
+        """ Estimates the memory size of an estimator
+
+        The size of the estimator in memory is estimated by the total size of
+        the estimator.* files in the estimator folder.
+
+        Parameters
+        ----------
+        estimator: :obj:`phenoai.containers.Estimator`
+            The estimator.
+
+        Returns
+        -------
+        size: :obj:`int`
+            Estimated size in bytes. """
+        path = getattr(estimator, "path", None)
+        if path is None or not os.path.isdir(path):
+            return 0
+        return sum(os.path.getsize(os.path.join(path, f))
+                   for f in os.listdir(path) if f.startswith("estimator."))
+
+    def acquire(self, estimator):
+        """ Marks an estimator as in use, loading it if necessary
+
+        Before loading, other estimators are evicted to make room for the
+        estimator. Every call has to be followed by a call to
+        :meth:`~phenoai.estimatorpool.EstimatorPool.release` once the
+        estimator is no longer needed.
+
+        Parameters
+        ----------
+        estimator: :obj:`phenoai.containers.Estimator`
+            The estimator to acquire.
+
+        Returns
+        -------
+        estimator: :obj:`phenoai.containers.Estimator`
+            The acquired (and loaded) estimator. """
+        with self._lock:
+            entry = self._get_entry(estimator)
+            entry["users"] += 1
+            entry["uses"] += 1
+            self._clock += 1
+            entry["last_used"] = self._clock
+        try:
+            with entry["lock"]:
+                if estimator.is_loaded():
+                    with self._lock:
+                        self.hits += 1
+                    return estimator
+                with self._lock:
+                    self.misses += 1
+                    self._evict(1, entry["size"], keep=entry)
+                logger.debug("Loading estimator from '{}' into pool".format(
+                    estimator.path))
+                start = time.time()
+                estimator.load()
+                with self._lock:
+                    self.load_time += time.time() - start
+                return estimator
+        except Exception:
+            self.release(estimator)
+            raise
+
+    def release(self, estimator):
+        """ Marks an estimator as no longer in use by the caller
+
+        Evicts estimators if the pool is over its budget.
+
+        Parameters
+        ----------
+        estimator: :obj:`phenoai.containers.Estimator`
+            The estimator to release. """
+        with self._lock:
+            entry = self._entries.get(id(estimator))
+            if entry is None or entry["users"] == 0:
+                raise exceptions.PhenoAIException(
+                    "Estimator was not acquired from this EstimatorPool.")
+            entry["users"] -= 1
+            self._evict()
+
+    def pin(self, estimator):
+        """ Keeps an estimator loaded until it is unpinned
+
+        The estimator is loaded if necessary. Pinned estimators are never
+        evicted, but do count towards the budget.
+
+        Parameters
+        ----------
+        estimator: :obj:`phenoai.containers.Estimator`
+            The estimator to pin. """
+        self.acquire(estimator)
+        with self._lock:
+            self._entries[id(estimator)]["pinned"] = True
+            self._entries[id(estimator)]["users"] -= 1
+
+    def unpin(self, estimator):
+        """ Allows a pinned estimator to be evicted again
+
+        Parameters
+        ----------
+        estimator: :obj:`phenoai.containers.Estimator`
+            The estimator to unpin. """
+        with self._lock:
+            entry = self._entries.get(id(estimator))
+            if entry is not None:
+                entry["pinned"] = False
+                self._evict()
+
+    def evict(self, estimator=None):
+        """ Clears estimators from memory
+
+        Estimators that are in use or pinned are not cleared.
+
+        Parameters
+        ----------
+        estimator: :obj:`phenoai.containers.Estimator`, `None`, optional
+            The estimator to clear. If `None`, all estimators in the pool that
+            are not in use are cleared. Default is `None`.
+
+        Returns
+        -------
+        n_evicted: :obj:`int`
+            Number of cleared estimators. """
+        with self._lock:
+            if estimator is None:
+                entries = list(self._entries.values())
+            else:
+                entries = [self._entries.get(id(estimator))]
+            n_evicted = 0
+            for entry in entries:
+                if (entry is not None and self._is_evictable(entry)):
+                    self._clear(entry)
+                    n_evicted += 1
+            return n_evicted
+
+    def discard(self, estimator):
+        """ Removes an estimator from the pool
+
+        The estimator is cleared from memory (also if it is pinned) and the
+        pool no longer keeps a reference to it. Discarding is not counted as
+        eviction. If the estimator is acquired again later, it is treated as
+        a new estimator.
+
+        Parameters
+        ----------
+        estimator: :obj:`phenoai.containers.Estimator`
+            The estimator to discard.
+
+        Returns
+        -------
+        discarded: :obj:`bool`
+            `True` if the estimator was in the pool, `False` otherwise. """
+        with self._lock:
+            entry = self._entries.get(id(estimator))
+            if entry is None:
+                return False
+            if entry["users"] > 0:
+                raise exceptions.PhenoAIException(
+                    "Estimator cannot be discarded while it is in use.")
+            del self._entries[id(estimator)]
+            if estimator.is_loaded():
+                estimator.clear()
+            return True
+
+    def get_metrics(self):
+        """ Returns the metrics of the pool
+
+        Returns
+        -------
+        metrics: :obj:`dict`
+            Dictionary with the number of hits ("hits"), misses ("misses"),
+            evictions ("evictions"), the hit rate ("hit_rate", `None` if
+            nothing was acquired yet), the total and average time spent
+            loading in seconds ("load_time" and "mean_load_time"), the number
+            of loaded estimators ("loaded") and their estimated size in bytes
+            ("bytes"). """
+        with self._lock:
+            loaded = [entry for entry in self._entries.values()
+                      if entry["estimator"].is_loaded()]
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else None,
+                "load_time": self.load_time,
+                "mean_load_time": (self.load_time / self.misses
+                                   if self.misses else None),
+                "loaded": len(loaded),
+                "bytes": sum(entry["size"] for entry in loaded)
+            }
+
+    def reset_metrics(self):
+        """ Sets the hit, miss, eviction and load time counters to zero """
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.load_time = 0.0
+
+    def _get_entry(self, estimator):
+        """ Returns the bookkeeping entry of an estimator, creating it if the
+        estimator is new to the pool """
+        entry = self._entries.get(id(estimator))
+        if entry is None:
+            entry = {"estimator": estimator,
+                     "size": self.estimator_size(estimator),
+                     "users": 0, "uses": 0, "last_used": 0,
+                     "pinned": False, "lock": threading.Lock()}
+            self._entries[id(estimator)] = entry
+        return entry
+
+    def _is_evictable(self, entry):
+        """ Checks if an entry is loaded and neither in use nor pinned """
+        return (entry["users"] == 0 and not entry["pinned"]
+                and entry["estimator"].is_loaded())
+
+    def _clear(self, entry):
+        """ Clears the estimator of an entry from memory """
+        logger.debug("Evicting estimator from '{}' from pool".format(
+            entry["estimator"].path))
+        entry["estimator"].clear()
+        self.evictions += 1
+
+    def _evict(self, extra_estimators=0, extra_bytes=0, keep=None):
+        """ Evicts estimators until the pool is within its budget
+
+        Should be called with the lock of the pool acquired.
+
+        Parameters
+        ----------
+        extra_estimators: :obj:`int`, optional
+            Number of estimators that are about to be loaded. Default is 0.
+        extra_bytes: :obj:`int`, optional
+            Size of the estimators that are about to be loaded. Default is 0.
+        keep: :obj:`dict`, `None`, optional
+            Entry that should not be evicted. Default is `None`. """
+        loaded = [entry for entry in self._entries.values()
+                  if entry["estimator"].is_loaded()]
+        n_loaded = len(loaded) + extra_estimators
+        n_bytes = sum(entry["size"] for entry in loaded) + extra_bytes
+        if self.policy == "lru":
+            order = sorted(loaded, key=lambda e: e["last_used"])
+        else:
+            order = sorted(loaded, key=lambda e: (e["uses"], e["last_used"]))
+        for entry in order:
+            if ((self.max_estimators is None
+                 or n_loaded <= self.max_estimators)
+                    and (self.max_bytes is None or n_bytes <= self.max_bytes)):
+                return
+            if entry is keep or not self._is_evictable(entry):
+                continue
+            self._clear(entry)
+            n_loaded -= 1
+            n_bytes -= entry["size"]
+        if ((self.max_estimators is not None
+             and n_loaded > self.max_estimators)
+                or (self.max_bytes is not None and n_bytes > self.max_bytes)):
+            logger.debug(("Estimator pool exceeds its budget, all loaded "
+                          "estimators are in use or pinned"))
@@ -6,6 +6,8 @@ and all inherit from the classes.Estimator class. Currently implemented are the
 :class:`~phenoai.estimators.KerasEstimator` classes for scikit-learn
 estimators and keras tensorflow estimators respectively. """
 
+import os
+
 try:
     import cPickle as pkl
 except Exception:
@@ -14,6 +16,7 @@ except Exception:
 from phenoai import containers
 from phenoai import exceptions
 from phenoai import logger
+from phenoai import utils
 
 
 class EstimatorFactory:
@@ -54,13 +57,27 @@ class SklearnEstimator(containers.Estimator):
     """ Interface to a scikit-learn estimator. Inherits its properties from
     the :class:`phenoai.containers.Estimator` class.
 
+    The estimator is stored either as a pickle ("estimator.pkl") or in the
+    joblib format ("estimator.joblib"). The numpy arrays in a joblib file are
+    memory-mapped when loading, so that loading is fast and the pages of the
+    arrays are shared between processes that load the same estimator.
+    Estimator classes that copy their arrays on unpickling (e.g. the trees of
+    a random forest) do not benefit from the memory mapping itself, but still
+    load faster.
+
     Attributes
     ----------
     est: `estimator`
         The estimator to which Estimator derived classes provide an interface.
         Type of this variable is determined by the derived class.
     path: :obj:`str`
-        Path to the stored estimator. """
+        Path to the stored estimator.
+    mmap_mode: :obj:`str`, `None`
+        Mode in which the arrays of an "estimator.joblib" file are
+        memory-mapped, see :func:`numpy.load`. If `None`, the arrays are read
+        into memory. Default is "r". """
+
+    mmap_mode = "r"
 
     def __init__(self, path=None, load=False):
         """ Initialises the :class:`~phenoai.estimators.SklearnEstimator`
@@ -68,7 +85,9 @@ class SklearnEstimator(containers.Estimator):
 
         If the version of the sklearn installation could not be found, i.e.
         when sklearn is not installed, a
-        :exc:`phenoai.exceptions.PhenoAIException` is raised.
+        :exc:`phenoai.exceptions.PhenoAIException` is raised. The version is
+        read from the package metadata, sklearn itself is only imported when
+        the estimator is loaded.
 
         Parameters
         ----------
@@ -79,9 +98,8 @@ class SklearnEstimator(containers.Estimator):
         load: :obj:`bool`, optional
             Boolean indicating if the estimator has to be loaded at
             initialisation. Default is `False`."""
-        try:
-            from sklearn import __version__ as sklversion
-        except Exception:
+        sklversion = utils.get_library_version("sklearn")
+        if sklversion is None:
             logger.critical(("Could not create Estimator based on "
                              "scikit-learn, package sklearn was not "
                              "installed."))
@@ -95,23 +113,39 @@ class SklearnEstimator(containers.Estimator):
         """ Loads the estimator into the
         :attr:`phenoai.estimators.SklearnEstimator.est` property from the
         location stored in :attr:`phenoai.estimators.SklearnEstimator.path`.
-        """
+
+        If the location contains an "estimator.joblib" file, this file is
+        loaded with memory-mapped arrays (see
+        :attr:`~phenoai.estimators.SklearnEstimator.mmap_mode`). Otherwise
+        "estimator.pkl" is unpickled. """
         logger.debug("Loading estimator")
+        if os.path.isfile(self.path + "/estimator.joblib"):
+            joblib = _import_joblib()
+            self.est = joblib.load(self.path + "/estimator.joblib",
+                                   mmap_mode=self.mmap_mode)
+            return
         with open(self.path + "/estimator.pkl", 'rb') as f:
             self.est = pkl.load(f)
 
-    def save(self, location):
+    def save(self, location, mmap=False):
         """ Saves the estimator to provided location.
 
-        Estimator will be stored at specified location as "estimator.pkl".
+        Estimator will be stored at specified location as "estimator.pkl" or,
+        if `mmap` is `True`, as "estimator.joblib".
 
         Parameters
         ----------
         location: :obj:`str`
             Location where the estimator should be stored, NOT including name
-            and extension of the estimator."""
+            and extension of the estimator.
+        mmap: :obj:`bool`, optional
+            Store the estimator in the joblib format, of which the arrays can
+            be memory-mapped on loading. Default is `False`."""
         if location[-1] == "/":
             location = location[:-1]
+        if mmap:
+            save_joblib(self.est, location + "/estimator.joblib")
+            return
         with open(location + "/estimator.pkl", "wb") as f:
             pkl.dump(self.est, f)
 
@@ -159,6 +193,38 @@ class SklearnEstimator(containers.Estimator):
         return None
 
 
+def save_joblib(estimator, path):
+    """ Stores a scikit-learn estimator in the joblib format
+
+    The file is written uncompressed, so that its numpy arrays can be
+    memory-mapped when it is loaded by
+    :meth:`phenoai.estimators.SklearnEstimator.load`. The file is first
+    written to a temporary file, so that an interrupted write does not leave a
+    corrupt estimator behind.
+
+    Parameters
+    ----------
+    estimator: sklearn estimator
+        The estimator to store.
+    path: :obj:`str`
+        Path of the file to create. """
+    joblib = _import_joblib()
+    joblib.dump(estimator, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def _import_joblib():
+    """ Imports and returns joblib, raising a
+    :exc:`phenoai.exceptions.PhenoAIException` if it is not installed """
+    try:
+        import joblib
+    except ImportError:
+        raise exceptions.PhenoAIException(
+            ("Package joblib is required for estimators stored as "
+             "estimator.joblib, but was not installed."))
+    return joblib
+
+
 class KerasEstimator(containers.Estimator):
     """ Interface to a Tensorflow estimator in a Keras wrapper. Inherits its
     properties from the containers.Estimator class.
@@ -189,18 +255,16 @@ class KerasEstimator(containers.Estimator):
             Boolean indicating if the estimator has to be loaded at
             initialisation. Default is `False`."""
         super().__init__(path, load)
-        try:
-            from keras import __version__ as kerasversion
-        except Exception:
+        kerasversion = utils.get_library_version("keras")
+        if kerasversion is None:
             logger.critical(("Could not create Estimator based on keras + "
                              "tensorflow, package keras was not installed."))
             raise exceptions.PhenoAIException(("Could not create Estimator "
                                                "based on keras + tensorflow, "
                                                "package keras was not "
                                                "installed."))
-        try:
-            from tensorflow import __version__ as tfversion
-        except Exception:
+        tfversion = utils.get_library_version("tensorflow")
+        if tfversion is None:
             logger.critical(("Could not create Estimator based on keras + "
                              "tensorflow, package tensorflow was not "
                              "installed."))
@@ -0,0 +1,441 @@
+""" Persistent cache for data read from files
+
+This module implements the :obj:`phenoai.filecache.FileCache` class, which
+stores the parameter vectors that file readers extract from input files (e.g.
+.slha files) on disk. When AInalyses are run repeatedly over the same set of
+files, the files only have to be parsed the first time; afterwards their
+content is taken from the cache.
+
+Each reader (a [BLOCK, SWITCH] reader list or a functions.py file) gets its
+own .hdf5 store in the cache folder, so that AInalyses reading different
+parameters do not interfere. Entries are identified by the path, size and
+modification time of the file, or by a checksum of its content. """
+
+import os
+import zlib
+
+import numpy as np
+
+from phenoai import exceptions
+from phenoai import io
+from phenoai import logger
+from phenoai import utils
+
+
+class FileCache:
+    """ Persistent cache of parameter vectors read from files
+
+    Files are read via :func:`phenoai.io.read_files`. Rows of files that were
+    read before (and did not change since) are taken from the cache instead.
+    New entries are kept in memory and written to the cache folder by
+    :meth:`~phenoai.filecache.FileCache.flush`, which is called automatically
+    after every read if `auto_flush` is `True`.
+
+    Flushing appends only the new entries to the .hdf5 store, so that
+    reading many chunks of files into the same store (e.g. via
+    :meth:`phenoai.ainalyses.AInalysis.run_iter`) costs I/O proportional to
+    the number of new files. Appending is done in place: an interrupted
+    flush loses the entries that were being appended (or, if the store is
+    damaged, the store is rebuilt), while the store is replaced atomically
+    when it is written completely, which happens on its first flush and
+    after :meth:`~phenoai.filecache.FileCache.prune`. With `auto_flush` set
+    to `False`, entries are only written on an explicit call to
+    :meth:`~phenoai.filecache.FileCache.flush`, which saves the (small)
+    overhead of opening the store for every read, at the risk of losing all
+    entries added since the last flush.
+
+    The cache can be used by an AInalysis by setting its
+    :attr:`~phenoai.ainalyses.AInalysis.file_cache` attribute. Reading files
+    via the AInalysis then automatically consults the cache.
+
+    Attributes
+    ----------
+    folder: :obj:`str`
+        Folder in which the .hdf5 stores are saved.
+    key: :obj:`str`
+        How files are identified: "stat" (absolute path, size and
+        modification time) or "content" (size and crc32 checksum of the
+        file content, independent of the path).
+    auto_flush: :obj:`bool`
+        Write new entries to disk after every read.
+    hits: :obj:`int`
+        Number of files of which the content was taken from the cache.
+    misses: :obj:`int`
+        Number of files that had to be read. """
+
+    def __init__(self, folder, key="stat", auto_flush=True):
+        """ Initialises the FileCache object
+
+        Parameters
+        ----------
+        folder: :obj:`str`
+            Folder in which the .hdf5 stores are saved. Is created if it does
+            not exist yet.
+        key: :obj:`str`, optional
+            How files are identified: "stat" or "content". Default is "stat".
+        auto_flush: :obj:`bool`, optional
+            Write new entries to disk after every read. Default is `True`. """
+        if key not in ["stat", "content"]:
+            raise exceptions.FileIOException(
+                "Unknown cache key type '{}', use 'stat' or 'content'.".format(
+                    key))
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.key = key
+        self.auto_flush = auto_flush
+        self.hits = 0
+        self.misses = 0
+        self._stores = {}
+
+    @staticmethod
+    def signature(reader, n_parameters):
+        """ Creates the identifier of the store for a reader
+
+        Parameters
+        ----------
+        reader: :obj:`list(list)`, :obj:`str`
+            Reader list of [BLOCK, SWITCH] entries or path to the functions.py
+            file of which the `read` function is used.
+        n_parameters: :obj:`int`
+            Number of values read from each file.
+
+        Returns
+        -------
+        signature: :obj:`str`
+            Identifier of the store. """
+        if isinstance(reader, list):
+            crc = zlib.crc32(repr(reader).encode("utf-8"))
+            crc = utils.convert_to_hex(crc)
+            return "slha-{}-{}".format(crc, n_parameters)
+        if isinstance(reader, str):
+            crc = utils.calculate_file_checksum(reader)
+            return "function-{}-{}".format(crc, n_parameters)
+        raise exceptions.FileIOException(
+            ("A signature can only be created for a reader list or a "
+             "functions.py path, provide a signature for other readers."))
+
+    def file_key(self, path):
+        """ Creates the key under which the content of a file is cached
+
+        Parameters
+        ----------
+        path: :obj:`str`
+            Path to the file.
+
+        Returns
+        -------
+        key: :obj:`str`, `None`
+            Key of the file. `None` if the file does not exist or is a buffer
+            (see :func:`phenoai.io.is_buffer`), which is never cached. """
+        if not isinstance(path, str):
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if self.key == "content":
+            return "{}|{}".format(stat.st_size,
+                                  utils.calculate_file_checksum(path))
+        return "{}|{}|{}".format(os.path.abspath(path), stat.st_size,
+                                 stat.st_mtime_ns)
+
+    def read_files(self, paths, reader, n_parameters, n_workers=1,
+                   chunksize=None, signature=None):
+        """ Reads files, taking their content from the cache where possible
+
+        Has the same interface and return values as
+        :func:`phenoai.io.read_files`. Only files not found in the cache are
+        read; their content is added to the cache. Files that could not be
+        read are not cached.
+
+        Parameters
+        ----------
+        paths: :obj:`list(str)`
+            Paths to the files to be read.
+        reader: :obj:`list(list)`, :obj:`callable`, :obj:`str`
+            Reader used for every file, see :func:`phenoai.io.read_files`.
+        n_parameters: :obj:`int`
+            Number of values read from each file.
+        n_workers: :obj:`int`, optional
+            Number of worker processes. Default is 1.
+        chunksize: :obj:`int`, `None`, optional
+            Number of paths sent to a worker process at once. Default is
+            `None`.
+        signature: :obj:`str`, `None`, optional
+            Identifier of the store to use. If `None`, it is created by
+            :meth:`~phenoai.filecache.FileCache.signature`, which is
+            required for callable readers. Default is `None`.
+
+        Returns
+        -------
+        data: :obj:`numpy.ndarray`
+            Array of shape `(len(paths), n_parameters)` with the content of
+            the files. Rows of files that could not be read contain `NaN`.
+        failures: :obj:`list(tuple)`
+            List of `(index, path, message)` tuples for files that could not
+            be read. """
+        if signature is None:
+            signature = self.signature(reader, n_parameters)
+        store = self._get_store(signature, n_parameters)
+        data = np.full((len(paths), n_parameters), np.nan)
+        keys = [self.file_key(path) for path in paths]
+        missing = []
+        for i, key in enumerate(keys):
+            if key is not None and key in store["rows"]:
+                data[i] = store["rows"][key]
+            else:
+                missing.append(i)
+        self.hits += len(paths) - len(missing)
+        self.misses += len(missing)
+        logger.debug("File cache: {} hit(s), {} miss(es)".format(
+            len(paths) - len(missing), len(missing)))
+        failures = []
+        if missing:
+            read, read_failures = io.read_files([paths[i] for i in missing],
+                                                reader, n_parameters,
+                                                n_workers, chunksize)
+            failed = set()
+            for index, path, message in read_failures:
+                failures.append((missing[index], path, message))
+                failed.add(index)
+            for j, i in enumerate(missing):
+                data[i] = read[j]
+                if j not in failed and keys[i] is not None:
+                    if keys[i] not in store["rows"]:
+                        store["pending"].append(keys[i])
+                    store["rows"][keys[i]] = read[j]
+                    store["paths"][keys[i]] = os.path.abspath(paths[i])
+            if self.auto_flush:
+                self.flush(signature)
+        return (data, failures)
+
+    def warm(self, paths, reader, n_parameters, n_workers=1, chunksize=None,
+             signature=None):
+        """ Adds the content of files to the cache
+
+        Reads all files not in the cache yet, so that later reads of these
+        files are served from the cache. Arguments are the same as for
+        :meth:`~phenoai.filecache.FileCache.read_files`.
+
+        Returns
+        -------
+        failures: :obj:`list(tuple)`
+            List of `(index, path, message)` tuples for files that could not
+            be read. """
+        logger.info("Warming file cache with {} file(s)".format(len(paths)))
+        _, failures = self.read_files(paths, reader, n_parameters, n_workers,
+                                      chunksize, signature)
+        self.flush(signature)
+        return failures
+
+    def info(self):
+        """ Returns information on the stores in the cache folder
+
+        Returns
+        -------
+        info: :obj:`dict`
+            Dictionary with the signature of each store as key and a
+            dictionary with the number of entries ("entries"), the number of
+            parameters ("parameters") and the size of the .hdf5 file in bytes
+            ("size") as value. """
+        info = {}
+        for signature in self._signatures():
+            store = self._get_store(signature)
+            path = self._store_path(signature)
+            info[signature] = {
+                "entries": len(store["rows"]),
+                "parameters": store["n_parameters"],
+                "size": os.path.getsize(path) if os.path.isfile(path) else 0
+            }
+        return info
+
+    def prune(self, signature=None, max_entries=None):
+        """ Removes outdated entries from the cache
+
+        Entries of files that no longer exist are removed, as well as (for
+        "stat" keys) entries of files that changed since they were cached.
+        If `max_entries` is set, the oldest entries of each store are removed
+        until at most this number of entries remains.
+
+        Parameters
+        ----------
+        signature: :obj:`str`, `None`, optional
+            Store to prune. If `None`, all stores are pruned. Default is
+            `None`.
+        max_entries: :obj:`int`, `None`, optional
+            Maximum number of entries per store. Default is `None`.
+
+        Returns
+        -------
+        n_removed: :obj:`int`
+            Number of removed entries. """
+        if signature is None:
+            signatures = self._signatures()
+        else:
+            signatures = [signature]
+        n_removed = 0
+        for sig in signatures:
+            store = self._get_store(sig)
+            remove = []
+            for key, path in store["paths"].items():
+                if not os.path.isfile(path):
+                    remove.append(key)
+                elif self.key == "stat" and self.file_key(path) != key:
+                    remove.append(key)
+            if max_entries is not None:
+                keep = [key for key in store["rows"] if key not in remove]
+                remove.extend(keep[:max(0, len(keep) - max_entries)])
+            for key in remove:
+                del store["rows"][key]
+                del store["paths"][key]
+            if remove:
+                store["rewrite"] = True
+                n_removed += len(remove)
+            self.flush(sig)
+        logger.debug("Pruned {} entries from file cache".format(n_removed))
+        return n_removed
+
+    def flush(self, signature=None):
+        """ Writes changed stores to the cache folder
+
+        Entries added since the last flush are appended to the .hdf5 file of
+        the store. The file is rewritten completely if it does not exist yet,
+        was written in a format that does not allow appending, or if entries
+        were removed.
+
+        Parameters
+        ----------
+        signature: :obj:`str`, `None`, optional
+            Store to write. If `None`, all changed stores are written. Default
+            is `None`. """
+        if signature is None:
+            signatures = list(self._stores)
+        else:
+            signatures = [signature]
+        for sig in signatures:
+            store = self._stores.get(sig)
+            if store is None or not (store["pending"] or store["rewrite"]):
+                continue
+            path = self._store_path(sig)
+            if not store["rewrite"] and io.append_hdf5(
+                    path, self._encode(store, store["pending"])):
+                logger.debug("Appended {} entries to file cache '{}'".format(
+                    len(store["pending"]), sig))
+            else:
+                # Write to a temporary file first, so that an interrupted
+                # write does not corrupt the store
+                tmppath = path + ".tmp"
+                arrays = self._encode(store, list(store["rows"]))
+                mode = 'w'
+                for name in ["keys", "paths", "data"]:
+                    io.write_hdf5(tmppath, name, arrays[name], mode=mode,
+                                  resizable=True)
+                    mode = 'a'
+                os.replace(tmppath, path)
+            store["pending"] = []
+            store["rewrite"] = False
+
+    @staticmethod
+    def _encode(store, keys):
+        """ Returns the keys, paths and data of entries of a store as arrays
+        to be written to its .hdf5 file, in the order in which they are
+        appended """
+        data = np.zeros((len(keys), store["n_parameters"]))
+        for i, key in enumerate(keys):
+            data[i] = store["rows"][key]
+        return {
+            "keys": np.array([key.encode("utf-8") for key in keys],
+                             dtype=bytes),
+            "paths": np.array([store["paths"][key].encode("utf-8")
+                               for key in keys], dtype=bytes),
+            "data": data
+        }
+
+    def _store_path(self, signature):
+        """ Returns the path to the .hdf5 file of a store """
+        return os.path.join(self.folder, signature + ".hdf5")
+
+    def _signatures(self):
+        """ Returns the signatures of all stores, on disk and in memory """
+        signatures = list(self._stores)
+        for f in sorted(os.listdir(self.folder)):
+            if f.endswith(".hdf5") and f[:-5] not in signatures:
+                signatures.append(f[:-5])
+        return signatures
+
+    def _get_store(self, signature, n_parameters=None):
+        """ Returns a store, loading it from disk if necessary
+
+        Parameters
+        ----------
+        signature: :obj:`str`
+            Identifier of the store.
+        n_parameters: :obj:`int`, `None`, optional
+            Number of parameters of the store. Used to create the store if it
+            does not exist yet or could not be read, checked against the
+            number of parameters of an existing store otherwise. Default is
+            `None`.
+
+        Returns
+        -------
+        store: :obj:`dict`
+            The store, containing a "rows" dictionary with the cached content
+            per file key and a "paths" dictionary with the path per file
+            key, the keys added since the last flush ("pending") and whether
+            the store has to be rewritten completely ("rewrite"). """
+        store = self._stores.get(signature)
+        if store is None:
+            store = self._load_store(signature)
+            # A store that could not be read can only be rebuilt once the
+            # number of parameters is known
+            if store["n_parameters"] is not None or n_parameters is not None:
+                self._stores[signature] = store
+        if store["n_parameters"] is None:
+            store["n_parameters"] = n_parameters
+        elif (n_parameters is not None
+                and store["n_parameters"] != n_parameters):
+            raise exceptions.FileIOException(
+                ("File cache store '{}' contains {} parameters per file, "
+                 "{} were requested.").format(signature,
+                                              store["n_parameters"],
+                                              n_parameters))
+        return store
+
+    def _load_store(self, signature):
+        """ Loads a store from disk
+
+        Parameters
+        ----------
+        signature: :obj:`str`
+            Identifier of the store.
+
+        Returns
+        -------
+        store: :obj:`dict`
+            The store (see :meth:`~phenoai.filecache.FileCache._get_store`).
+            Empty if there is no .hdf5 file for the store; its number of
+            parameters is `None` if the file does not exist or could not be
+            read, in which case it is rewritten on the next flush. """
+        store = {"rows": {}, "paths": {}, "pending": [], "rewrite": False,
+                 "n_parameters": None}
+        path = self._store_path(signature)
+        if os.path.isfile(path):
+            try:
+                keys = io.read_hdf5(path, "keys")
+                paths = io.read_hdf5(path, "paths")
+                data = io.read_hdf5(path, "data")
+            except Exception as e:
+                logger.warning(("Could not read file cache store '{}', it "
+                                "will be rebuilt: {}").format(path, e))
+                store["rewrite"] = True
+            else:
+                store["n_parameters"] = data.shape[1]
+                if not len(keys) == len(paths) == len(data):
+                    # An append was interrupted, only complete entries are
+                    # used and the store is rewritten on the next flush
+                    store["rewrite"] = True
+                for key, p, row in zip(keys, paths, data):
+                    key = key.decode("utf-8")
+                    store["rows"][key] = row
+                    store["paths"][key] = p.decode("utf-8")
+        return store
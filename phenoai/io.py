@@ -6,14 +6,21 @@ find all files with a specific extension is implemented via the
 from os import listdir
 import os.path
 import codecs
+import ast
+import json
+import re
+import struct
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from io import StringIO
 try:
     import cPickle as pkl
 except Exception:
     import pickle as pkl
 
 import numpy as np
-import pyslha
-import h5py
 from yaml import load as yamlload
 from yaml import dump as yamldump
 try:
@@ -22,6 +29,25 @@ except ImportError:
     from yaml import Loader
 
 from phenoai import exceptions
+from phenoai import utils
+
+# Content type of messages created by encode_binary
+BINARY_CONTENT_TYPE = "application/x-phenoai-binary"
+
+# Cache of functions.py modules used as file reader in worker processes of
+# read_files, keyed by path
+__readermodules__ = {}
+
+# Regular expressions used by extract_slha. The header expressions are the
+# ones used by pyslha, the number expressions select tokens that can be
+# converted without ast.literal_eval while giving the same result.
+_SLHA_BLOCK = re.compile(r"BLOCK\s+(\w+)(\s+Q\s*=\s*.+)?")
+_SLHA_DECAY = re.compile(r"DECAY\s+(-?\d+)\s+([\d\.E+-]+|NAN).*")
+_SLHA_XSECTION = re.compile(
+    r"XSECTION\s+([\d+\.E+-]+)\s+(-?\d+)\s+(-?\d+)\s+(\d+)\s+(.*)")
+_SLHA_INT = re.compile(r"[+-]?(0+|[1-9][0-9]*)$")
+_SLHA_FLOAT = re.compile(r"[+-]?(([0-9]+\.[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?"
+                         r"|[0-9]+[eE][+-]?[0-9]+)$")
 
 
 def get_file_paths(locations, extensions=None, recursive=False):
@@ -116,7 +142,100 @@ def get_file_paths(locations, extensions=None, recursive=False):
     return locs
 
 
-def read_slha(path, reader_list=None):
+def is_buffer(source):
+    """ Checks if a file source is an in-memory buffer instead of a path
+
+    Buffers are :obj:`bytes` (or :obj:`bytearray`) objects with the content
+    of a file and file-like objects with a `read` method, such as
+    :obj:`io.StringIO`. File readers in this module accept buffers wherever
+    they accept a file path.
+
+    Parameters
+    ----------
+    source: :obj:`str`, :obj:`bytes`, file-like
+        Path or buffer.
+
+    Returns
+    -------
+    is_buffer: :obj:`bool`
+        `True` if the source is a buffer. """
+    return isinstance(source, (bytes, bytearray)) or hasattr(source, "read")
+
+
+def source_name(source):
+    """ Returns the name of a file source
+
+    Parameters
+    ----------
+    source: :obj:`str`, :obj:`bytes`, file-like
+        Path or buffer.
+
+    Returns
+    -------
+    name: :obj:`str`, `None`
+        The path itself, or the `name` attribute of a buffer. `None` if the
+        buffer has no name. """
+    if isinstance(source, str):
+        return source
+    name = getattr(source, "name", None)
+    return name if isinstance(name, str) else None
+
+
+def read_buffer(source):
+    """ Returns the text content of a buffer
+
+    File-like objects are read from their start if they are seekable. Bytes
+    are decoded as UTF-8.
+
+    Parameters
+    ----------
+    source: :obj:`bytes`, file-like
+        Buffer to read.
+
+    Returns
+    -------
+    content: :obj:`str`
+        Content of the buffer. """
+    if isinstance(source, (bytes, bytearray)):
+        content = source
+    else:
+        if getattr(source, "seekable", lambda: False)():
+            source.seek(0)
+        content = source.read()
+    if isinstance(content, (bytes, bytearray)):
+        content = bytes(content).decode("utf-8")
+    return content
+
+
+@contextmanager
+def buffer_file(source):
+    """ Writes the content of a buffer to a temporary file
+
+    Used for readers that can only read files from disk. The file has the
+    extension of the name of the buffer (if any) and is removed when the
+    context is left.
+
+    Parameters
+    ----------
+    source: :obj:`bytes`, file-like
+        Buffer to write.
+
+    Yields
+    ------
+    path: :obj:`str`
+        Path of the temporary file. """
+    name = source_name(source)
+    suffix = os.path.splitext(name)[1] if name is not None else ""
+    handle, path = tempfile.mkstemp(suffix=suffix, prefix="phenoai_")
+    try:
+        with os.fdopen(handle, "w") as f:
+            f.write(read_buffer(source))
+        yield path
+    finally:
+        os.remove(path)
+
+
+def read_slha(path, reader_list=None, fast=True):
     """ Reads a .slha file to :obj:`pyslha.Doc` object or :obj:`numpy.ndarray`.
 
     Reads the content of a .slha file into a :obj:`pyslha.Doc`. If a reader
@@ -124,15 +243,23 @@ def read_slha(path, reader_list=None):
     :obj:`pyslha.Doc` object and returned as a :obj:`numpy.ndarray`. If no
     readerlist was provided the :obj:`pyslha.Doc` object is returned.
 
+    If a reader list was provided and `fast` is `True`, the requested entries
+    are read by :func:`phenoai.io.extract_slha` instead, which does not build
+    a :obj:`pyslha.Doc` object.
+
     Parameters
     ----------
-    path: :obj:`str`
-        Path of the .slha file to be read
+    path: :obj:`str`, :obj:`bytes`, file-like
+        Path of the .slha file to be read, or a buffer with its content (see
+        :func:`phenoai.io.is_buffer`).
     reader_list: :obj:`list(list)` of slha [BLOCK, SWITCH] entries. Optional
         List of entries in the .slha file, denoted by [BLOCK, SWITCH] entries.
         A reader list is therefore 2-dimensional object (a list of lists). If
         `None` was provided, no specific elements will be read from the file.
         Default is `None`.
+    fast: :obj:`bool`, optional
+        Use :func:`phenoai.io.extract_slha` to read the entries in the reader
+        list. Default is `True`.
 
     Returns
     -------
@@ -142,10 +269,22 @@ def read_slha(path, reader_list=None):
 
     # Read .slha file into pyslha.Doc object
     docobj = None
-    if (isinstance(path, pyslha.Doc)):
+    if _is_pyslha_doc(path):
         return path
-    if isinstance(path, str):
+    if fast and (isinstance(path, str) or is_buffer(path)) and isinstance(
+            reader_list, list):
+        return extract_slha(path, reader_list)
+    if is_buffer(path):
+        import pyslha
+        try:
+            docobj = pyslha.readSLHA(read_buffer(path))
+        except Exception as e:
+            raise exceptions.FileIOException(
+                ("Unexpected pyslha error while reading '{}': {}.").format(
+                    source_name(path) or "buffer", str(e)))
+    elif isinstance(path, str):
         if os.path.isfile(path):
+            import pyslha
             try:
                 docobj = pyslha.read(path)
             except Exception as e:
@@ -166,18 +305,10 @@ def read_slha(path, reader_list=None):
     if isinstance(reader_list, list):
         data = np.zeros(len(reader_list))
         for i, reader_entry in enumerate(reader_list):
-            if len(reader_entry[i]) != 2:
-                raise exceptions.FileIOException(("Datalist must only contain "
-                                                  "lists with format [BLOCK, "
-                                                  "SWITCH]."))
+            block, key = slha_entry_key(reader_entry)
             try:
-                try:
-                    data[i] = docobj.blocks[reader_entry[0].upper()][int(
-                        reader_entry[1])]
-                except Exception:
-                    data[i] = docobj.blocks[reader_entry[0].upper()][
-                        reader_entry[1]]
-            except ValueError as e:
+                data[i] = docobj.blocks[block][key]
+            except (TypeError, ValueError):
                 raise exceptions.FileIOException(
                     ("SWITCH '{}' could not be casted to an integer or "
                      "tuple.").format(reader_entry[1]))
@@ -189,6 +320,356 @@ def read_slha(path, reader_list=None):
     return docobj
 
 
+def _is_pyslha_doc(obj):
+    """ Checks if an object is a :obj:`pyslha.Doc`, without importing pyslha
+    if it was not imported yet (in which case no such object can exist) """
+    pyslha = sys.modules.get("pyslha")
+    return pyslha is not None and isinstance(obj, pyslha.Doc)
+
+
+def extract_slha(path, reader_list):
+    """ Reads requested [BLOCK, SWITCH] entries from a .slha file
+
+    Streaming alternative to reading a .slha file into a :obj:`pyslha.Doc`
+    and selecting entries from it. The file is scanned line by line and only
+    lines in the requested blocks are tokenized. Lines are interpreted
+    following the same rules as pyslha, so the returned values are equal to
+    the ones obtained via :obj:`pyslha.Doc`: if a block occurs more than once
+    (e.g. at several Q scales), its last occurrence replaces the earlier ones
+    and if an entry occurs more than once in a block, its last value is used.
+    Unlike pyslha, the rest of the file is not validated (e.g. the presence of
+    a MASS block is not required).
+
+    Parameters
+    ----------
+    path: :obj:`str`, :obj:`bytes`, file-like
+        Path of the .slha file to be read, or a buffer with its content.
+    reader_list: :obj:`list(list)` of slha [BLOCK, SWITCH] entries
+        List of entries in the .slha file, denoted by [BLOCK, SWITCH] entries.
+
+    Returns
+    -------
+    content: :obj:`numpy.ndarray`
+        Numpy array with the requested content. """
+    if is_buffer(path):
+        lines = StringIO(read_buffer(path))
+    elif not isinstance(path, str):
+        raise exceptions.FileIOException(
+            ("Filepath to the .slha to read has to be a string (supplied: "
+             "'{}').").format(type(path)))
+    elif not os.path.isfile(path):
+        raise exceptions.FileIOException("File not found '{}'.".format(path))
+    else:
+        lines = open(path, "r")
+    # Group requested entries by block and key
+    wanted = {}
+    for i, reader_entry in enumerate(reader_list):
+        block, key = slha_entry_key(reader_entry)
+        wanted.setdefault(block, {}).setdefault(key, []).append(i)
+    # Values of the last occurrence of every requested block, by key
+    found = {}
+    # Scan file
+    current = None
+    with lines as f:
+        for line in f:
+            if line[0].isspace():
+                # Data lines outside requested blocks are skipped untouched
+                if current is None:
+                    continue
+            elif line.startswith("#"):
+                continue
+            if "#" in line:
+                line = line[:line.index("#")]
+            if not line.strip():
+                continue
+            # Header lines
+            if not line[0].isspace():
+                header = line.strip().upper()
+                if header.startswith("BLOCK"):
+                    match = _SLHA_BLOCK.match(header)
+                    if match:
+                        current = None
+                        if match.group(1) in wanted:
+                            # A repeated block replaces earlier occurrences
+                            current = (wanted[match.group(1)], {})
+                            found[match.group(1)] = current[1]
+                elif header.startswith("DECAY"):
+                    if _SLHA_DECAY.match(header):
+                        current = None
+                elif header.startswith("XSECTION"):
+                    if _SLHA_XSECTION.match(header):
+                        current = None
+                elif isinstance(_slha_autotype(header.split()[0]), str):
+                    current = None
+                continue
+            if current is None:
+                continue
+            # Data line in a requested block, later entries overwrite earlier
+            key, value = _slha_entry(line.split())
+            if key in current[0]:
+                current[1][key] = value
+    values = [None] * len(reader_list)
+    for block, keys in wanted.items():
+        for key, indices in keys.items():
+            for i in indices:
+                values[i] = found.get(block, {}).get(key)
+    # Convert to numpy array
+    data = np.zeros(len(reader_list))
+    for i, reader_entry in enumerate(reader_list):
+        if values[i] is None:
+            raise exceptions.FileIOException(
+                "No SWITCH '{}' in BLOCK '{}' found.".format(
+                    reader_entry[1], reader_entry[0]))
+        try:
+            data[i] = values[i]
+        except (TypeError, ValueError):
+            raise exceptions.FileIOException(
+                ("SWITCH '{}' could not be casted to an integer or "
+                 "tuple.").format(reader_entry[1]))
+    return data
+
+
+def slha_entry_key(reader_entry):
+    """ Normalizes a [BLOCK, SWITCH] reader list entry
+
+    Entries that refer to the same value in a .slha file (e.g. ["MASS", 25]
+    and ["mass", "25"]) are normalized to the same key.
+
+    Parameters
+    ----------
+    reader_entry: :obj:`list`
+        [BLOCK, SWITCH] entry of a reader list.
+
+    Returns
+    -------
+    key: :obj:`tuple`
+        Tuple of the uppercase block name and the switch as used by pyslha
+        (an integer or a tuple of integers). Comma separated string switches
+        such as "1,1" are converted to a tuple of integers. """
+    if len(reader_entry) != 2:
+        raise exceptions.FileIOException(("Datalist must only contain "
+                                          "lists with format [BLOCK, "
+                                          "SWITCH]."))
+    key = reader_entry[1]
+    # Comma separated strings (e.g. "1,1") are split like pyslha does
+    if isinstance(key, str):
+        key = key.split(",")
+    if isinstance(key, (list, tuple)):
+        try:
+            key = tuple(int(k) for k in key)
+        except (TypeError, ValueError):
+            key = tuple(key)
+        key = key[0] if len(key) == 1 else key
+    else:
+        try:
+            key = int(key)
+        except (TypeError, ValueError):
+            pass
+    return (reader_entry[0].upper(), key)
+
+
+def _slha_autotype(token):
+    """ Converts a token from a .slha file to a number if possible, following
+    the conversion done by pyslha (:func:`ast.literal_eval`).
+
+    Parameters
+    ----------
+    token: :obj:`str`
+        Token to be converted.
+
+    Returns
+    -------
+    value: :obj:`int`, :obj:`float`, :obj:`str`
+        Converted token. """
+    if _SLHA_INT.match(token):
+        return int(token)
+    if _SLHA_FLOAT.match(token):
+        return float(token)
+    try:
+        return ast.literal_eval(token)
+    except (ValueError, SyntaxError):
+        return token
+
+
+def _slha_entry(items):
+    """ Splits the tokens of a data line in a .slha BLOCK into a key and a
+    value, following the interpretation of pyslha.
+
+    Parameters
+    ----------
+    items: :obj:`list(str)`
+        Tokens of the data line.
+
+    Returns
+    -------
+    key: :obj:`int`, :obj:`tuple`, `None`
+        Index of the entry.
+    value: any
+        Value of the entry. """
+    args = [_slha_autotype(item) for item in items]
+    # Re-join consecutive strings into single entries
+    i = 0
+    while i < len(args) - 1:
+        if isinstance(args[i], str) and isinstance(args[i + 1], str):
+            args[i] += " " + args[i + 1]
+            del args[i + 1]
+            continue
+        i += 1
+    if len(args) == 1:
+        return (None, args[0])
+    # Leading integers form the key (all but the last if all are integers)
+    first_nonint = -1
+    for i, arg in enumerate(args):
+        if type(arg) is not int:
+            first_nonint = i
+            break
+    if first_nonint == 0:
+        key = None
+    else:
+        key = _slha_tuple(args[:first_nonint])
+    return (key, _slha_tuple(args[first_nonint:]))
+
+
+def _slha_tuple(args):
+    """ Returns the only element of a list of length 1 and a tuple of the
+    elements otherwise. """
+    if len(args) == 1:
+        return args[0]
+    return tuple(args)
+
+
+def read_files(paths, reader, n_parameters, n_workers=1, chunksize=None):
+    """ Reads multiple files into a single :obj:`numpy.ndarray`
+
+    Every file is read with the provided reader and stored as a row in the
+    returned array, in the order in which the paths were provided. Files that
+    could not be read do not abort the reading of the other files: their row
+    is filled with `NaN` and the failure is reported in the returned list of
+    failures.
+
+    If `n_workers` is larger than 1 the files are read in a pool of worker
+    processes, each of which receives chunks of `chunksize` paths. Readers
+    that are sent to worker processes have to be picklable, which is why a
+    functions.py reader should be provided by its path in that case.
+
+    Buffers (see :func:`phenoai.io.is_buffer`) can be provided instead of
+    paths. They are read in memory by reader lists. A reader function is
+    called with the buffer first; if it rejects the buffer (raising a
+    :exc:`TypeError`, :exc:`AttributeError` or :exc:`OSError` before reading
+    from it), the content is written to a temporary file (see
+    :func:`phenoai.io.buffer_file`) and the reader is called with its path.
+
+    Parameters
+    ----------
+    paths: :obj:`list(str)`
+        Paths to the files to be read, or buffers with their content.
+    reader: :obj:`list(list)`, :obj:`callable`, :obj:`str`
+        Reader used for every file. Can be a reader list of [BLOCK, SWITCH]
+        entries (files are read via :func:`phenoai.io.read_slha`), a function
+        taking a file path and returning the values for that file, or the
+        path to a functions.py file of which the `read` function is used.
+    n_parameters: :obj:`int`
+        Number of values read from each file.
+    n_workers: :obj:`int`, optional
+        Number of worker processes. If 1, files are read in the current
+        process. Default is 1.
+    chunksize: :obj:`int`, :obj:`None`, optional
+        Number of paths sent to a worker process at once. If `None`, the paths
+        are divided in about four chunks per worker. Ignored if `n_workers`
+        is 1. Default is `None`.
+
+    Returns
+    -------
+    data: :obj:`numpy.ndarray`
+        Array of shape `(len(paths), n_parameters)` with the content of the
+        files. Rows of files that could not be read contain `NaN`.
+    failures: :obj:`list(tuple)`
+        List of `(index, path, message)` tuples for files that could not be
+        read. """
+    data = np.full((len(paths), n_parameters), np.nan)
+    failures = []
+    if n_workers is None or n_workers <= 1 or len(paths) <= 1:
+        chunks = [_read_file_chunk(0, paths, reader, n_parameters)]
+    else:
+        if chunksize is None:
+            chunksize = max(1, -(-len(paths) // (4 * n_workers)))
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(_read_file_chunk, start,
+                                paths[start:start + chunksize], reader,
+                                n_parameters)
+                for start in range(0, len(paths), chunksize)
+            ]
+            chunks = [future.result() for future in futures]
+    for start, rows, chunk_failures in chunks:
+        data[start:start + len(rows)] = rows
+        failures.extend(chunk_failures)
+    return (data, failures)
+
+
+def _read_file_chunk(start, paths, reader, n_parameters):
+    """ Reads a chunk of files for :func:`phenoai.io.read_files`
+
+    Parameters
+    ----------
+    start: :obj:`int`
+        Index of the first path of the chunk in the full list of paths.
+    paths: :obj:`list(str)`
+        Paths in this chunk.
+    reader: :obj:`list(list)`, :obj:`callable`, :obj:`str`
+        Reader, see :func:`phenoai.io.read_files`.
+    n_parameters: :obj:`int`
+        Number of values read from each file.
+
+    Returns
+    -------
+    start: :obj:`int`
+        Index of the first path of the chunk.
+    rows: :obj:`numpy.ndarray`
+        Content of the files in the chunk.
+    failures: :obj:`list(tuple)`
+        List of `(index, path, message)` tuples for failed files. """
+    if isinstance(reader, str):
+        if reader not in __readermodules__:
+            __readermodules__[reader] = utils.load_module(reader)
+        reader = __readermodules__[reader].read
+    rows = np.full((len(paths), n_parameters), np.nan)
+    failures = []
+    for i, path in enumerate(paths):
+        try:
+            if isinstance(reader, list):
+                rows[i, :] = read_slha(path, reader)
+            elif is_buffer(path):
+                rows[i, :] = _read_buffer_with_function(path, reader)
+            else:
+                rows[i, :] = reader(path)
+        except Exception as e:
+            failures.append((start + i, path, str(e)))
+    return (start, rows, failures)
+
+
+def _read_buffer_with_function(source, reader):
+    """ Reads a buffer with a reader function, falling back to a temporary
+    file for readers that only accept paths
+
+    A reader is considered to only accept paths if it raises a
+    :exc:`TypeError`, :exc:`AttributeError` or :exc:`OSError` (e.g. by
+    passing the buffer to `open`) without reading from the buffer. Other
+    errors are raised as they are. """
+    start = None
+    if getattr(source, "seekable", lambda: False)():
+        source.seek(0)
+        start = source.tell()
+    try:
+        values = reader(source)
+    except (TypeError, AttributeError, OSError):
+        if start is not None and source.tell() != start:
+            raise
+        with buffer_file(source) as path:
+            values = reader(path)
+    return np.asarray(values, dtype=np.float64)
+
+
 def read_hdf5(path, name):
     """ Reads hdf5 file to :obj:`numpy.ndarray`
 
@@ -203,6 +684,7 @@ def read_hdf5(path, name):
     -------
     content: :obj:`numpy.ndarray`
         Content of the .hdf5 file. """
+    import h5py
     with h5py.File(path, 'r') as f:
         content = f[name][()]
     return content
@@ -303,7 +785,7 @@ def get_lsp_from_slha(slha):
         for i, s in enumerate(slha):
             correct_lsp[i] = get_lsp_from_slha(s)
         return correct_lsp
-    if isinstance(slha, (str, pyslha.Doc)):
+    if isinstance(slha, str) or _is_pyslha_doc(slha):
         spectrum = read_slha(slha)
         blocks = [spectrum.blocks[i].name for i in spectrum.blocks]
         if 'MASS' in blocks:
@@ -320,7 +802,7 @@ def get_lsp_from_slha(slha):
                                       "'{}'").format(type(slha)))
 
 
-def write_hdf5(path, name, nparray):
+def write_hdf5(path, name, nparray, mode='w', resizable=False):
     """ Writes a :obj:`numpy.ndarray` to a file in .hdf5 format.
 
     Parameters
@@ -330,9 +812,65 @@ def write_hdf5(path, name, nparray):
     name: :obj:`str`
         Name of the array in the .hdf5 file
     nparray: :obj:`numpy.ndarray`
-        Numpy array that should be saved in the .hdf5 file. """
-    with h5py.File(path, 'w') as hf:
-        hf.create_dataset(name, data=nparray)
+        Numpy array that should be saved in the .hdf5 file.
+    mode: :obj:`str`, optional
+        Mode in which the .hdf5 file is opened. Use 'w' to overwrite the file
+        and 'a' to add the array to an existing file. Default is 'w'.
+    resizable: :obj:`bool`, optional
+        Create the array such that rows can be added to it later via
+        :func:`~phenoai.io.append_hdf5`. Byte strings are then stored with
+        variable length. Default is `False`. """
+    import h5py
+    with h5py.File(path, mode) as hf:
+        if not resizable:
+            hf.create_dataset(name, data=nparray)
+            return
+        nparray = np.asarray(nparray)
+        dtype = nparray.dtype
+        if dtype.kind in "SO":
+            nparray = nparray.astype(object)
+            dtype = h5py.vlen_dtype(bytes)
+        hf.create_dataset(name, data=nparray, dtype=dtype,
+                          maxshape=(None, ) + nparray.shape[1:])
+
+
+def append_hdf5(path, arrays):
+    """ Appends rows to arrays in a .hdf5 file
+
+    The arrays have to be created with `resizable=True` (see
+    :func:`~phenoai.io.write_hdf5`). Arrays are extended one after another
+    in the provided order, so if appending is interrupted, the arrays
+    earlier in the order can be longer than the later ones.
+
+    Parameters
+    ----------
+    path: :obj:`str`
+        Path to the .hdf5 file.
+    arrays: :obj:`dict`
+        Rows to append (as :obj:`numpy.ndarray`), keyed by array name.
+
+    Returns
+    -------
+    appended: :obj:`bool`
+        `True` if the rows were appended, `False` if nothing was written
+        because the file does not exist or does not contain all arrays as
+        resizable array. """
+    import h5py
+    if not os.path.isfile(path):
+        return False
+    with h5py.File(path, 'a') as hf:
+        for name in arrays:
+            if name not in hf or hf[name].maxshape[0] is not None:
+                return False
+        for name, rows in arrays.items():
+            rows = np.asarray(rows)
+            if rows.dtype.kind in "SO":
+                rows = rows.astype(object)
+            dataset = hf[name]
+            n = dataset.shape[0]
+            dataset.resize(n + len(rows), axis=0)
+            dataset[n:] = rows
+    return True
 
 
 def write_csv(path, nparray, header=None):
@@ -412,3 +950,84 @@ def unpickle(pickle):
     obj: :obj:`obj`
         Unserialized version of provided object. """
     return pkl.loads(codecs.decode(pickle.encode(), "base64"))
+
+
+def encode_binary(header, arrays=None):
+    """ Creates a binary message from a header and numerical arrays
+
+    The message consists of the length of the header as 4-byte little-endian
+    unsigned integer, the header as utf-8 encoded JSON and the raw
+    little-endian buffers of the arrays, each starting at a multiple of 8
+    bytes. Name, dtype and shape of the arrays are stored in the "arrays"
+    entry of the header. The message can be decoded with
+    :func:`~phenoai.io.decode_binary` and has content type
+    `BINARY_CONTENT_TYPE`.
+
+    Parameters
+    ----------
+    header: :obj:`dict`
+        JSON serializable dictionary with information on the message.
+    arrays: :obj:`dict`, `None`. Optional
+        Numerical :obj:`numpy.ndarray` objects to add to the message, keyed
+        by name. Default is `None`.
+
+    Returns
+    -------
+    message: :obj:`bytes`
+        The binary message. """
+    header = dict(header)
+    header["arrays"] = []
+    buffers = []
+    offset = 0
+    for name, array in (arrays or {}).items():
+        array = np.asarray(array)
+        if array.dtype.kind not in "biuf":
+            raise exceptions.PhenoAIException(
+                ("Only numerical arrays can be encoded in a binary message, "
+                 "array '{}' has dtype '{}'.").format(name, array.dtype))
+        array = array.astype(array.dtype.newbyteorder("<"), order="C",
+                             copy=False)
+        header["arrays"].append([name, array.dtype.str, list(array.shape)])
+        padding = -offset % 8
+        buffers += [b"\0" * padding, array.reshape(-1).view(np.uint8)]
+        offset += padding + array.nbytes
+    headertext = json.dumps(header).encode("utf-8")
+    headertext += b" " * (-(len(headertext) + 4) % 8)
+    return b"".join([struct.pack("<I", len(headertext)), headertext]
+                    + buffers)
+
+
+def decode_binary(message):
+    """ Decodes a message created by :func:`~phenoai.io.encode_binary`
+
+    The arrays are not copied, but created with :func:`numpy.frombuffer` on
+    the message and are therefore read-only.
+
+    Parameters
+    ----------
+    message: :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview`
+        The binary message.
+
+    Returns
+    -------
+    header: :obj:`dict`
+        The header of the message, without the "arrays" entry.
+    arrays: :obj:`dict`
+        The arrays in the message, keyed by name. """
+    try:
+        length = struct.unpack_from("<I", message)[0]
+        header = json.loads(bytes(message[4:4 + length]).decode("utf-8"))
+        offset = 0
+        arrays = {}
+        start = 4 + length
+        for name, dtype, shape in header.pop("arrays"):
+            dtype = np.dtype(dtype)
+            offset += -offset % 8
+            count = int(np.prod(shape))
+            arrays[name] = np.frombuffer(message, dtype, count,
+                                         start + offset).reshape(shape)
+            offset += count * dtype.itemsize
+    except (struct.error, ValueError, KeyError, TypeError) as e:
+        raise exceptions.PhenoAIException(
+            "Could not decode binary message: {}".format(e))
+    return header, arrays
@@ -742,12 +742,21 @@ class AInalysisMaker:
         logger.info("Configuration validated")
         return v
 
-    def make(self):
+    def make(self, mmap=False):
         """ Creates the AInalysis
 
         Creats the AInalysis at the location provided in construction of this
         object. Will raise an :exc:`phenoai.exceptions.MakerError` if not all
-        flags are True."""
+        flags are True.
+
+        Parameters
+        ----------
+        mmap: :obj:`bool`, optional
+            Store a scikit-learn estimator as "estimator.joblib" instead of
+            "estimator.pkl", so that its arrays are memory-mapped when the
+            AInalysis is loaded (see
+            :meth:`phenoai.estimators.SklearnEstimator.load`). Default is
+            `False`."""
 
         logger.info("Create AInalysis")
 
@@ -769,8 +778,12 @@ class AInalysisMaker:
         # Estimator
         # Store sklearn estimator
         if self.configuration["class"] == "sklearnestimator":
-            with open(self.location + "/estimator.pkl", "wb") as f:
-                pkl.dump(self.estimator, f)
+            if mmap:
+                estimators.save_joblib(self.estimator,
+                                       self.location + "/estimator.joblib")
+            else:
+                with open(self.location + "/estimator.pkl", "wb") as f:
+                    pkl.dump(self.estimator, f)
         # Store keras estimator
         elif self.configuration["class"] == "kerasestimator":
             self.estimator.save(self.location + "/estimator.hdf5")
@@ -1533,6 +1546,39 @@ def update_checksums(location):
             f.write("{:<24}{}\n".format(cname, csums[cname]))
 
 
+def convert_estimator(location, remove_pickle=True):
+    """ Converts the estimator of a scikit-learn AInalysis to the joblib
+    format
+
+    The "estimator.pkl" file is stored as "estimator.joblib", of which the
+    arrays are memory-mapped when the AInalysis is loaded (see
+    :meth:`phenoai.estimators.SklearnEstimator.load`). Afterwards the
+    checksums of the AInalysis are updated.
+
+    Parameters
+    ----------
+    location: :obj:`str`
+        Path to the AInalysis folder.
+    remove_pickle: :obj:`bool`, optional
+        Remove the "estimator.pkl" file after conversion. Default is `True`.
+        """
+    if location[-1] == "/":
+        location = location[:-1]
+    if not os.path.isfile(location + "/estimator.pkl"):
+        raise exceptions.MakerError(
+            ("Could not convert estimator, no estimator.pkl file found in "
+             "'{}'.").format(location))
+    logger.info("Converting estimator in '{}' to joblib format".format(
+        location))
+    with open(location + "/estimator.pkl", "rb") as f:
+        estimator = pkl.load(f)
+    estimators.save_joblib(estimator, location + "/estimator.joblib")
+    if remove_pickle:
+        os.remove(location + "/estimator.pkl")
+    update_checksums(location)
+    logger.debug("Estimator converted and checksums updated")
+
+
 def get_template_file(filename):
     """ Gets the content of one of the template files in the PhenoAI package
 
@@ -10,19 +10,108 @@ All functions in this module are already implemented in various parts of the
 PhenoAI package. In normal circumstances the user should not need to call any
 of the functions in this module him- or herself.
 
+Update checks can be run in three modes (see
+:func:`~phenoai.updatechecker.get_mode`): "sync" (the server is queried right
+away, the default), "background" (the server is queried on a background
+thread and the result is logged when it arrives) and "off" (no checks at
+all). Setting the environment variable `PHENOAI_OFFLINE` to "1" turns all
+update checks off. Answers of the server are cached on disk (see
+:func:`phenoai.utils.get_cache_folder`) for `CACHE_TTL` seconds.
+
 .. attention:: None of the functions in this module install anything
     automatically. This module is merely an update checker. Any updating has
     to be initiated manually by the user.
 """
 
+import os
 import sys
-import importlib
+import threading
+import time
 from math import floor
-import requests
 import json
 
 from phenoai.__version__ import __apiurl__, __version__
+from phenoai import exceptions
 from phenoai import logger
+from phenoai import utils
+
+# Update check modes
+MODES = ["sync", "background", "off"]
+
+# Time in seconds for which answers of the server are cached
+CACHE_TTL = 24 * 3600
+
+# Lock for reading and writing the cache file
+_cache_lock = threading.Lock()
+
+
+def get_mode(check_updates=None):
+    """ Returns the mode in which update checks are run
+
+    If the environment variable `PHENOAI_OFFLINE` is set to "1", "true" or
+    "yes", update checks are always off. Otherwise the mode is determined by
+    `check_updates` or, if that is `None`, by the environment variable
+    `PHENOAI_UPDATE_CHECKS`. If neither is set, the mode is "sync".
+
+    Parameters
+    ----------
+    check_updates: :obj:`bool`, :obj:`str`, `None`. Optional
+        Requested mode: `True` (or "sync"), "background" or `False` (or
+        "off"). Default is `None`.
+
+    Returns
+    -------
+    mode: :obj:`str`
+        "sync", "background" or "off". """
+    if os.environ.get("PHENOAI_OFFLINE", "").lower() in ["1", "true", "yes"]:
+        return "off"
+    if check_updates is None:
+        check_updates = os.environ.get("PHENOAI_UPDATE_CHECKS", "sync")
+    if check_updates is True:
+        return "sync"
+    if check_updates is False:
+        return "off"
+    if check_updates not in MODES:
+        raise exceptions.PhenoAIException(
+            ("Unknown update check mode '{}', use True, False, 'sync', "
+             "'background' or 'off'.").format(check_updates))
+    return check_updates
+
+
+def check_in_background(function, args=(), callback=None):
+    """ Runs an update check on a background thread
+
+    The thread is a daemon thread, so that it never delays the exit of the
+    program.
+
+    Parameters
+    ----------
+    function: :obj:`callable`
+        Check function to run, e.g.
+        :func:`~phenoai.updatechecker.check_ainalysis_update`.
+    args: :obj:`tuple`. Optional
+        Arguments for the check function. Default is `()`.
+    callback: :obj:`callable`, `None`. Optional
+        Function called with the `(error, update, text)` tuple returned by
+        the check function. Default is `None`.
+
+    Returns
+    -------
+    thread: :obj:`threading.Thread`
+        The started thread. """
+    def run():
+        try:
+            answer = function(*args)
+        except Exception as e:
+            logger.debug("Background update check failed: {}".format(e))
+            return
+        if callback is not None:
+            callback(*answer)
+
+    thread = threading.Thread(target=run, name="phenoai-update-check",
+                              daemon=True)
+    thread.start()
+    return thread
 
 
 def check_ainalysis_update(uniquedbid, version):
@@ -62,11 +151,13 @@ def check_ainalysis_update(uniquedbid, version):
     logger.debug(("Querying server for ainalysis update information (dbid: {},"
                   " version: {})").format(uniquedbid, version))
     logger.set_indent("+")
-    answer = query_server("ainalysis", {
+    answer = cached_query_server("ainalysis", {
         "ainalysis": uniquedbid,
         "current": version
     })
     logger.set_indent("-")
+    if answer["error"]:
+        return (answer["error"], answer["update"], answer["text"])
     return (answer["error"], answer["update"],
             format_server_message(answer["text"]))
 
@@ -95,15 +186,76 @@ def check_phenoai_update():
         Return message. If return variable `update` is True, this message will
         be formatted.
     """
-    answer = query_server("phenoai")
+    answer = cached_query_server("phenoai")
     logger.set_indent("+")
     logger.debug(("Querying server for phenoai update information"
                   "(version: {})").format(__version__))
     logger.set_indent("-")
+    if answer["error"]:
+        return (answer["error"], answer["update"], answer["text"])
     return (answer["error"], answer["update"],
             format_server_message(answer["text"]))
 
 
+def cached_query_server(target, extra_post_data=None, ttl=None):
+    """ Query server for information, using cached answers if available
+
+    Answers of the server are stored in the "updates.json" file in the cache
+    folder (see :func:`phenoai.utils.get_cache_folder`) and reused for `ttl`
+    seconds. Failed queries are not cached.
+
+    Parameters
+    ----------
+    target: :obj:`str`
+        Select which update script to call on the server. Can be 'ainalysis'
+        or 'phenoai'.
+    extra_post_data: :obj:`dict`
+        Add extra information to the dictionary that is sent to the server via
+        POST request.
+    ttl: :obj:`float`, `None`
+        Time in seconds for which cached answers are valid. If `None`,
+        `CACHE_TTL` is used. Default is `None`.
+
+    Returns
+    -------
+    json_decoded: :obj:`dict`
+        Dictionary of json decoded returned information. """
+    if ttl is None:
+        ttl = CACHE_TTL
+    key = json.dumps([target, __version__, extra_post_data], sort_keys=True)
+    path = os.path.join(utils.get_cache_folder(), "updates.json")
+    with _cache_lock:
+        cache = _read_cache(path)
+    entry = cache.get(key)
+    if entry is not None and time.time() - entry["time"] < ttl:
+        logger.debug("Using cached update information")
+        return entry["answer"]
+    answer = query_server(target, extra_post_data)
+    if answer.get("failed"):
+        return answer
+    with _cache_lock:
+        cache = _read_cache(path)
+        cache[key] = {"time": time.time(), "answer": answer}
+        try:
+            tmppath = "{}.{}.tmp".format(path, os.getpid())
+            with open(tmppath, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmppath, path)
+        except OSError as e:
+            logger.debug("Could not write update cache: {}".format(e))
+    return answer
+
+
+def _read_cache(path):
+    """ Reads the update cache file, returning an empty dictionary if it does
+    not exist or cannot be read """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
 def query_server(target, extra_post_data=None):
     """ Query server for information
 
@@ -122,7 +274,9 @@ def query_server(target, extra_post_data=None):
     Returns
     -------
     json_decoded: :obj:`dict`
-        Dictionary of json decoded returned information.
+        Dictionary of json decoded returned information. If the server could
+        not be queried, the dictionary contains an error message and a
+        "failed" entry set to `True`.
     """
     postdata = {
         "phenoai":
@@ -132,11 +286,9 @@ def query_server(target, extra_post_data=None):
                           sys.version_info[2])
     }
     for lib in ["sklearn", "tensorflow", "keras"]:
-        try:
-            package = importlib.import_module(lib)
-            postdata[lib] = package.__version__
-        except Exception:
-            pass
+        version = utils.get_library_version(lib)
+        if version is not None:
+            postdata[lib] = version
 
     if extra_post_data is not None:
         postdata.update(extra_post_data)
@@ -145,7 +297,8 @@ def query_server(target, extra_post_data=None):
     if __apiurl__ is None:
         logger.warning(("Could make no request to the server, as no API URL "
                         "was specified for this PhenoAI version."))
-        return (False, None, "Unknown API URL")
+        return _failure("Unknown API URL")
+    import requests
     try:
         data = requests.post(__apiurl__.format(target),
                             data=postdata,
@@ -155,10 +308,16 @@ def query_server(target, extra_post_data=None):
         return j
     except requests.exceptions.ConnectionError:
         logger.debug("Could not connect with PhenoAI update server")
-        return (False, None, "Could not connect with PhenoAI server.")
+        return _failure("Could not connect with PhenoAI server.")
     except json.decoder.JSONDecodeError:
         logger.debug("Server response was incorrectly formatted")
-        return (False, None, "Got invalid formatted response from the server.")
+        return _failure("Got invalid formatted response from the server.")
+
+
+def _failure(text):
+    """ Returns the answer of :func:`~phenoai.updatechecker.query_server` if
+    the server could not be queried """
+    return {"error": True, "update": None, "text": text, "failed": True}
 
 
 def format_server_message(text, border=True, line_length=75):
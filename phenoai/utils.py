@@ -6,7 +6,15 @@ and serve general purposes. """
 import random
 import string
 import os
+import itertools
+import json
+import mmap
+import threading
 import zlib
+from concurrent.futures import ThreadPoolExecutor
+import importlib
+import importlib.machinery
+import importlib.util
 
 import numpy as np
 
@@ -177,7 +185,266 @@ def dict_to_square_matrix(dictionary, n=None):
     return dict_to_matrix(dictionary, n, n)
 
 
+def iter_chunks(data, chunksize, data_ids=None):
+    """ Splits a stream of data points or file paths into chunks
+
+    Accepts a :obj:`numpy.ndarray` of data points, a file path, a list of file
+    paths or any iterable yielding arrays of data points, single file paths or
+    lists of file paths. Arrays are split into views of at most `chunksize`
+    rows, file paths are collected into lists of at most `chunksize` paths.
+    Only one chunk is held in memory at a time (apart from what the iterable
+    itself holds).
+
+    Parameters
+    ----------
+    data: :obj:`numpy.ndarray`, :obj:`str`, :obj:`list(str)`, iterable
+        Data points or file paths to split into chunks.
+    chunksize: :obj:`int`
+        Maximum number of data points or file paths per chunk.
+    data_ids: iterable, `None`. Optional
+        IDs of the data points, consumed in the same order as the data points.
+        Default is `None`.
+
+    Yields
+    ------
+    chunk: :obj:`numpy.ndarray`, :obj:`list(str)`
+        Array of at most `chunksize` data points or list of at most
+        `chunksize` file paths.
+    ids: :obj:`list`, `None`
+        IDs of the data points in the chunk. `None` if no `data_ids` were
+        provided. """
+    if chunksize < 1:
+        raise ValueError("Chunk size has to be a positive integer.")
+    if isinstance(data, (str, np.ndarray)):
+        data = [data]
+    elif isinstance(data, list) and data and isinstance(data[0], str):
+        data = [data]
+    if data_ids is not None:
+        data_ids = iter(data_ids)
+
+    def take_ids(n):
+        if data_ids is None:
+            return None
+        return list(itertools.islice(data_ids, n))
+
+    # Single file paths and single data points are collected in a buffer
+    buffer = []
+    for item in data:
+        if not isinstance(item, str):
+            item = item if isinstance(item, list) else np.asarray(item)
+            if isinstance(item, np.ndarray) and item.ndim == 1:
+                item = item.tolist()
+            single = (isinstance(item, list) and len(item) > 0
+                      and not isinstance(item[0], (str, list)))
+        else:
+            single = False
+        if isinstance(item, str) or single:
+            if buffer and isinstance(buffer[0], str) != isinstance(item, str):
+                yield _buffer_to_chunk(buffer, take_ids)
+                buffer = []
+            buffer.append(item)
+            if len(buffer) == chunksize:
+                yield _buffer_to_chunk(buffer, take_ids)
+                buffer = []
+            continue
+        if buffer:
+            yield _buffer_to_chunk(buffer, take_ids)
+            buffer = []
+        if not (isinstance(item, list) and item and isinstance(item[0], str)):
+            item = np.asarray(item)
+        for start in range(0, len(item), chunksize):
+            chunk = item[start:start + chunksize]
+            yield (chunk, take_ids(len(chunk)))
+    if buffer:
+        yield _buffer_to_chunk(buffer, take_ids)
+
+
+def _buffer_to_chunk(buffer, take_ids):
+    """ Converts a buffer of single file paths or data points, collected by
+    :func:`phenoai.utils.iter_chunks`, into a chunk """
+    if isinstance(buffer[0], str):
+        chunk = list(buffer)
+    else:
+        chunk = np.array(buffer)
+    return (chunk, take_ids(len(chunk)))
+
+
+def parameter_bounds(parameters, mapping=0.0):
+    """ Returns the lower and upper bounds of the parameters of an AInalysis
+
+    The bounds are taken from the `parameters` entry of the AInalysis
+    configuration, in which every parameter is defined as [name, unit,
+    minimum, maximum]. If `mapping` is non-zero, the bounds of the mapping
+    target area are returned instead: every bound is moved inwards by
+    `mapping` times the range of the parameter.
+
+    Parameters
+    ----------
+    parameters: :obj:`list(list)`
+        Parameter definitions from the AInalysis configuration.
+    mapping: :obj:`float`. Optional
+        Fraction of the parameter range by which the bounds are moved inwards.
+        Default is 0.0.
+
+    Returns
+    -------
+    mins: :obj:`numpy.ndarray`
+        Lower bounds of the parameters.
+    maxs: :obj:`numpy.ndarray`
+        Upper bounds of the parameters. """
+    mins = np.array([parameter[2] for parameter in parameters], dtype=float)
+    maxs = np.array([parameter[3] for parameter in parameters], dtype=float)
+    if mapping:
+        ranges = maxs - mins
+        mins = mins + ranges * mapping
+        maxs = maxs - ranges * mapping
+    return (mins, maxs)
+
+
+def nearest_bin(x, bins):
+    """ Finds the nearest bin for all entries in an array
+
+    Vectorized equivalent of `np.argmin(np.abs(bins - value))` for every value
+    in `x`: the bins are sorted once, after which the nearest bin of every
+    value is looked up with a binary search (:func:`numpy.searchsorted`). If
+    a value is equally close to two bins, the bin that occurs first in `bins`
+    is selected. For `NaN` values the first bin is selected, as
+    :func:`numpy.argmin` would do.
+
+    Parameters
+    ----------
+    x: :obj:`numpy.ndarray`
+        Array of values for which the nearest bin has to be found. Can have
+        any shape.
+    bins: :obj:`list(float)`, :obj:`numpy.ndarray`
+        Centers of the bins.
+
+    Returns
+    -------
+    indices: :obj:`numpy.ndarray`
+        Array with the same shape as `x` containing the indices of the
+        nearest bins. """
+    x = np.asarray(x, dtype=float)
+    bins = np.asarray(bins, dtype=float)
+    order = np.argsort(bins, kind="stable")
+    sbins = bins[order]
+    flat = x.ravel()
+    # Candidates: the first bin at or above the value and the first of the
+    # (possibly repeated) bins below it
+    upper = np.searchsorted(sbins, flat, side="left")
+    lower = np.clip(upper - 1, 0, len(sbins) - 1)
+    if np.any(sbins[1:] == sbins[:-1]):
+        lower = np.searchsorted(sbins, sbins[lower], side="left")
+    upper = np.clip(upper, 0, len(sbins) - 1)
+    d_lower = np.abs(sbins[lower] - flat)
+    d_upper = np.abs(sbins[upper] - flat)
+    use_upper = (d_upper < d_lower) | ((d_upper == d_lower) &
+                                       (order[upper] < order[lower]))
+    indices = order[np.where(use_upper, upper, lower)]
+    indices[np.isnan(flat)] = 0
+    return indices.reshape(x.shape)
+
+
+def load_module(path, name="module"):
+    """ Loads a Python source file as a module
+
+    The file is executed every time this function is called. Callers that need
+    the module repeatedly should cache the result (as
+    :meth:`phenoai.ainalyses.AInalysis.get_functions` does).
+
+    Parameters
+    ----------
+    path: :obj:`str`
+        Path to the Python source file.
+    name: :obj:`str`. Optional
+        Name given to the module. Default is "module".
+
+    Returns
+    -------
+    module: :obj:`module`
+        The executed module. """
+    loader = importlib.machinery.SourceFileLoader(name, path)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def get_cache_folder():
+    """ Returns the folder in which PhenoAI caches information on disk
+
+    The folder is set by the environment variable `PHENOAI_CACHE`. If it is
+    not set, "phenoai" in the user cache folder (`XDG_CACHE_HOME` or
+    ~/.cache) is used. The folder is created if it does not exist yet.
+
+    Returns
+    -------
+    folder: :obj:`str`
+        Path to the cache folder. """
+    folder = os.environ.get("PHENOAI_CACHE")
+    if not folder:
+        folder = os.path.join(
+            os.environ.get("XDG_CACHE_HOME",
+                           os.path.join(os.path.expanduser("~"), ".cache")),
+            "phenoai")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+# Distribution names of libraries whose import name differs
+_DISTRIBUTIONS = {
+    "sklearn": ["scikit-learn"],
+    "tensorflow": ["tensorflow", "tensorflow-cpu", "tensorflow-gpu"]
+}
+
+
+def get_library_version(library):
+    """ Returns the installed version of a library without importing it
+
+    The version is read from the package metadata of the distribution that
+    provides the library, so that heavy libraries like tensorflow do not have
+    to be imported just to check their version. Only if no metadata could be
+    found (e.g. for libraries that were not installed via pip), the library
+    is imported and its `__version__` attribute is returned.
+
+    Parameters
+    ----------
+    library: :obj:`str`
+        Import name of the library, e.g. "sklearn".
+
+    Returns
+    -------
+    version: :obj:`str`, `None`
+        Installed version of the library. `None` if the library is not
+        installed. """
+    try:
+        from importlib import metadata
+    except ImportError:
+        try:
+            import importlib_metadata as metadata
+        except ImportError:
+            metadata = None
+    if metadata is not None:
+        for distribution in _DISTRIBUTIONS.get(library, [library]):
+            try:
+                return metadata.version(distribution)
+            except metadata.PackageNotFoundError:
+                pass
+    if importlib.util.find_spec(library) is None:
+        return None
+    try:
+        return importlib.import_module(library).__version__
+    except Exception:
+        return None
+
+
 # Checksum functions
+
+# Size of the reads when calculating checksums. Files of at least this size
+# are memory-mapped instead.
+CHECKSUM_BUFFER_SIZE = 1024 * 1024
+
+
 def convert_to_hex(number, n=9):
     """ Convert number to hexadecimal notation
 
@@ -198,7 +465,11 @@ def convert_to_hex(number, n=9):
 def calculate_file_checksum(filepath, format_checksum=True):
     """ Calculate the checksum of specified file
 
-    Checksum is calculated with :func:`zlib.crc32`.
+    Checksum is calculated with :func:`zlib.crc32`. Files of at least
+    `CHECKSUM_BUFFER_SIZE` bytes are memory-mapped and hashed at once, smaller
+    files are read in a single read. :func:`zlib.crc32` releases the GIL, so
+    that files can be hashed concurrently by threads (see
+    :func:`~phenoai.utils.calculate_file_checksums`).
 
     Parameters
     ----------
@@ -214,24 +485,87 @@ def calculate_file_checksum(filepath, format_checksum=True):
         Calculated checksum. If format_checksum was `True`, a hexadecimal
         string representation of integer checksum is returned. If `False`,
         this integer is returned. """
-    buffersize = 65536
     crcvalue = 0
     if os.path.exists(filepath):
         with open(filepath, 'rb') as afile:
-            buffr = afile.read(buffersize)
-            while buffr:
-                crcvalue = zlib.crc32(buffr, crcvalue)
-                buffr = afile.read(buffersize)
+            crcvalue = _stream_checksum(afile)
     if format_checksum:
         return convert_to_hex(crcvalue)
     return crcvalue
 
 
+def _stream_checksum(afile):
+    """ Calculates the unformatted checksum of an opened binary file """
+    crcvalue = 0
+    try:
+        if os.fstat(afile.fileno()).st_size >= CHECKSUM_BUFFER_SIZE:
+            with mmap.mmap(afile.fileno(), 0,
+                           access=mmap.ACCESS_READ) as mapped:
+                return zlib.crc32(mapped)
+    except (OSError, ValueError):
+        # Not all files can be memory-mapped, read them instead
+        pass
+    buffr = afile.read(CHECKSUM_BUFFER_SIZE)
+    while buffr:
+        crcvalue = zlib.crc32(buffr, crcvalue)
+        buffr = afile.read(CHECKSUM_BUFFER_SIZE)
+    return crcvalue
+
+
+def calculate_file_checksums(filepaths, format_checksum=True,
+                             use_cache=False, n_workers=None):
+    """ Calculate the checksums of multiple files concurrently
+
+    Files are hashed by a pool of threads, see
+    :func:`~phenoai.utils.calculate_file_checksum`.
+
+    Parameters
+    ----------
+    filepaths: :obj:`list` of :obj:`str`
+        Paths to the files for which the checksums have to be calculated.
+    format_checksum: :obj:`bool`. Optional
+        Boolean indicating if the checksums have to be formatted to
+        hexadecimal notation. Default is `True`.
+    use_cache: :obj:`bool`. Optional
+        Take checksums of unchanged files from the checksum cache (see
+        :func:`~phenoai.utils.cached_file_checksum`). Default is `False`.
+    n_workers: :obj:`int`, `None`. Optional
+        Number of threads. If `None`, the default of
+        :class:`concurrent.futures.ThreadPoolExecutor` is used. If 1, files
+        are hashed on the calling thread. Default is `None`.
+
+    Returns
+    -------
+    checksums: :obj:`dict`
+        Dictionary with the checksum of each file, keyed by the provided
+        paths. """
+    if use_cache:
+        function = cached_file_checksum
+    else:
+        function = calculate_file_checksum
+    filepaths = list(dict.fromkeys(filepaths))
+    if n_workers == 1 or len(filepaths) < 2:
+        checksums = [function(path, False) for path in filepaths]
+    else:
+        if n_workers is not None:
+            n_workers = min(n_workers, len(filepaths))
+        with ThreadPoolExecutor(n_workers) as executor:
+            checksums = list(executor.map(lambda path: function(path, False),
+                                          filepaths))
+    if format_checksum:
+        checksums = [convert_to_hex(crcvalue) for crcvalue in checksums]
+    return dict(zip(filepaths, checksums))
+
+
 def calculate_folder_checksum(folderpath, format_checksum=True,
-                              recursive=True):
+                              recursive=True, use_cache=False,
+                              n_workers=None):
     """ Calculate the checksum of a specified folder
 
-    Checksum is calculated with :func:`zlib.crc32`.
+    Checksum is calculated with :func:`zlib.crc32`. Files in subfolders
+    contribute to the checksum of a recursive search multiple times, which
+    is preserved for compatibility with existing checksums.sfv files, but
+    every file is read only once.
 
     Parameters
     ----------
@@ -244,6 +578,12 @@ def calculate_folder_checksum(folderpath, format_checksum=True,
         Boolean indicating if the folder has to be searched resursively, also
         making checksums of files in folders in the folder (depth: unlimited).
         Default is `True`.
+    use_cache: :obj:`bool`. Optional
+        Take checksums of unchanged files from the checksum cache (see
+        :func:`~phenoai.utils.cached_file_checksum`). Default is `False`.
+    n_workers: :obj:`int`, `None`. Optional
+        Number of threads hashing the files, see
+        :func:`~phenoai.utils.calculate_file_checksums`. Default is `None`.
 
     Returns
     -------
@@ -251,54 +591,222 @@ def calculate_folder_checksum(folderpath, format_checksum=True,
         Calculated checksum. If format_checksum was `True`, a hexadecimal
         string representation of integer checksum is returned. If `False`,
         this integer is returned. """
+    file_checksum = _file_checksum_function(
+        use_cache, calculate_file_checksums(
+            _list_checksum_files(folderpath, recursive), False, use_cache,
+            n_workers))
+    crcvalue = _folder_checksum(folderpath, recursive, file_checksum, {})
+    if use_cache:
+        flush_checksum_cache()
+    if format_checksum:
+        return convert_to_hex(crcvalue)
+    return crcvalue
+
+
+def _folder_checksum(folderpath, recursive, file_checksum, memo):
+    """ Calculates the unformatted checksum of a folder
 
-    # buffersize = 65536
+    Follows the original algorithm of
+    :func:`~phenoai.utils.calculate_folder_checksum`, in which every folder
+    is walked recursively and the checksums of the subfolders of the
+    provided folder are added again. File checksums are provided by the
+    `file_checksum` function and checksums of folders are memoized in
+    `memo`, so that no file is read twice. """
+    if (folderpath, recursive) in memo:
+        return memo[(folderpath, recursive)]
     crcvalue = 0
     if os.path.exists(folderpath):
         for root, subdirs, files in os.walk(folderpath):
             for f in files:
                 if f != 'checksums.sfv':
-                    crcvalue += calculate_file_checksum(
-                        "{}/{}".format(root, f), False)
+                    crcvalue += file_checksum("{}/{}".format(root, f))
             if recursive:
                 for s in subdirs:
-                    crcvalue += calculate_folder_checksum(
-                        folderpath + "/" + s, False)
+                    crcvalue += _folder_checksum(folderpath + "/" + s, True,
+                                                 file_checksum, memo)
+    memo[(folderpath, recursive)] = crcvalue
+    return crcvalue
+
+
+def _list_checksum_files(folderpath, recursive):
+    """ Lists the files contributing to the checksum of a folder, with paths
+    as constructed by :func:`~phenoai.utils._folder_checksum` """
+    filepaths = []
+    for root, subdirs, files in os.walk(folderpath):
+        filepaths += ["{}/{}".format(root, f) for f in files
+                      if f != 'checksums.sfv']
+        if not recursive:
+            break
+    return filepaths
+
+
+def _file_checksum_function(use_cache, checksums=None):
+    """ Returns a function that calculates the unformatted checksum of a
+    file, reading every file at most once per call of this function.
+    Checksums that were already calculated can be provided in the
+    `checksums` dictionary. """
+    if checksums is None:
+        checksums = {}
+
+    def file_checksum(path):
+        if path not in checksums:
+            if use_cache:
+                checksums[path] = cached_file_checksum(path, False)
+            else:
+                checksums[path] = calculate_file_checksum(path, False)
+        return checksums[path]
+
+    return file_checksum
+
+
+# Cache of file checksums, see cached_file_checksum. Paths of entries that
+# were not written to disk yet are kept in _checksum_cache_new.
+_checksum_cache = None
+_checksum_cache_new = set()
+_checksum_cache_lock = threading.Lock()
+
+
+def cached_file_checksum(filepath, format_checksum=True):
+    """ Calculate the checksum of specified file, using the checksum cache
+
+    Checksums are cached in memory and in the "checksums.json" file in the
+    cache folder (see :func:`~phenoai.utils.get_cache_folder`), keyed by the
+    absolute path of the file. A cached checksum is only used if the size,
+    modification time (in nanoseconds) and inode of the file did not change
+    since it was calculated. New checksums are written to disk by
+    :func:`~phenoai.utils.flush_checksum_cache`.
+
+    Parameters
+    ----------
+    filepath: :obj:`str`
+        Path to the file for which the checksum has to be calculated.
+    format_checksum: :obj:`bool`. Optional
+        Boolean indicating if the checksum has to be formatted to hexadecimal
+        notation. Default is `True`.
+
+    Returns
+    -------
+    checksum: :obj:`int`, :obj:`str`
+        Calculated checksum, see
+        :func:`~phenoai.utils.calculate_file_checksum`. """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return calculate_file_checksum(filepath, format_checksum)
+    path = os.path.abspath(filepath)
+    key = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+    with _checksum_cache_lock:
+        entry = _get_checksum_cache().get(path)
+    if entry is not None and entry[:3] == key:
+        crcvalue = entry[3]
+    else:
+        crcvalue = calculate_file_checksum(filepath, False)
+        with _checksum_cache_lock:
+            _get_checksum_cache()[path] = key + [crcvalue]
+            _checksum_cache_new.add(path)
     if format_checksum:
         return convert_to_hex(crcvalue)
     return crcvalue
 
 
-def calculate_ainalysis_checksums(folder):
+def flush_checksum_cache():
+    """ Writes new entries of the checksum cache to disk
+
+    Several processes (e.g. the worker processes of a server) can share the
+    checksums.json file. The file is therefore read again right before it is
+    replaced and the new entries of this process are merged into it, while
+    holding a lock on the file where supported (POSIX), so that entries
+    written by other processes are kept. """
+    with _checksum_cache_lock:
+        if not _checksum_cache_new:
+            return
+        path = os.path.join(get_cache_folder(), "checksums.json")
+        tmppath = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open(path + ".lock", "w") as lock:
+                try:
+                    import fcntl
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                except ImportError:
+                    pass
+                entries = _read_checksum_file(path)
+                for new in _checksum_cache_new:
+                    entries[new] = _checksum_cache[new]
+                with open(tmppath, "w") as f:
+                    json.dump(entries, f)
+                os.replace(tmppath, path)
+        except OSError:
+            return
+        _checksum_cache.update(entries)
+        _checksum_cache_new.clear()
+
+
+def _get_checksum_cache():
+    """ Returns the checksum cache, loading it from disk on first use. Should
+    be called with the lock of the cache acquired. """
+    global _checksum_cache
+    if _checksum_cache is None:
+        _checksum_cache = _read_checksum_file(
+            os.path.join(get_cache_folder(), "checksums.json"))
+    return _checksum_cache
+
+
+def _read_checksum_file(path):
+    """ Returns the entries in a checksums.json file, or an empty dictionary
+    if it does not exist or cannot be read """
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+
+def calculate_ainalysis_checksums(folder, use_cache=False, n_workers=None):
     """ Calculate checksums of specified AInalysis
 
     Calculates all relevant checksums for an AInalysis, namely for
 
-    - the estimator.pkl or estimator.hdf5 file
+    - the estimator.joblib, estimator.pkl or estimator.hdf5 file
     - the configuration.yaml file
     - the functions.py file
     - the AInalysis folder as a whole (recursive)
 
     Results are returned as a dictionary of hexadecimal representations of the
-    checksums.
+    checksums. Every file is read only once and files are hashed concurrently
+    (see :func:`~phenoai.utils.calculate_file_checksums`).
 
     Parameters
     ----------
     folder: :obj:`str`
         Path to the AInalysis folder.
+    use_cache: :obj:`bool`. Optional
+        Take checksums of unchanged files from the checksum cache (see
+        :func:`~phenoai.utils.cached_file_checksum`). Default is `False`.
+    n_workers: :obj:`int`, `None`. Optional
+        Number of threads hashing the files. Default is `None`.
 
     Returns
     -------
     checksums: :obj:`dict`
         Dictionary containing the checksums of the AInalysis folder (see above
         for specification). """
-    if os.path.isfile(folder + "/estimator.pkl"):
-        cs_estimator = calculate_file_checksum(folder + "/estimator.pkl")
+    file_checksum = _file_checksum_function(
+        use_cache, calculate_file_checksums(
+            _list_checksum_files(folder, True), False, use_cache, n_workers))
+    if os.path.isfile(folder + "/estimator.joblib"):
+        estimator = folder + "/estimator.joblib"
+    elif os.path.isfile(folder + "/estimator.pkl"):
+        estimator = folder + "/estimator.pkl"
     else:
-        cs_estimator = calculate_file_checksum(folder + "/estimator.hdf5")
-    cs_card = calculate_file_checksum(folder + "/configuration.yaml")
-    cs_functions = calculate_file_checksum(folder + "/functions.py")
-    cs_total = calculate_folder_checksum(folder)
+        estimator = folder + "/estimator.hdf5"
+    cs_estimator = convert_to_hex(file_checksum(estimator))
+    cs_card = convert_to_hex(file_checksum(folder + "/configuration.yaml"))
+    cs_functions = convert_to_hex(file_checksum(folder + "/functions.py"))
+    cs_total = convert_to_hex(_folder_checksum(folder, True, file_checksum,
+                                               {}))
+    if use_cache:
+        flush_checksum_cache()
     return {
         "estimator": cs_estimator,
         "configuration.yaml": cs_card,
@@ -0,0 +1,77 @@
+""" Fixtures shared by the tests """
+import numpy as np
+import pytest
+
+from phenoai import logger
+
+
+def make_ainalysis(location, ainalysis_id, coefficients, filereader):
+    """ Creates a linear regressor AInalysis with two parameters in [0, 1],
+    reading .slha files via a reader list and allowing mapping """
+    from sklearn.linear_model import LinearRegression
+    from phenoai import maker
+    rng = np.random.RandomState(0)
+    x = np.vstack([[0.0, 0.0], [1.0, 1.0], rng.uniform(0, 1, (48, 2))])
+    estimator = LinearRegression().fit(x, x.dot(coefficients))
+    m = maker.AInalysisMaker(default_id=ainalysis_id, location=location,
+                             overwrite=True)
+    m.set_about("Test AInalysis", "AInalysis used by the tests.")
+    m.add_author("PhenoAI tests", "tests@example.com")
+    m.set_estimator(estimator=estimator, estimator_type="regressor",
+                    output="pointvalue")
+    m.set_application_box(data=x, names=["a", "b"], units=["GeV", "GeV"])
+    m.set_filereader(filereader=filereader, formats=[".slha"])
+    m.set_mapping(mapping=True)
+    m.make()
+    return location
+
+
+def write_slha(path, mass, nmix, minpar=None):
+    """ Writes a .slha file with the given values, without MINPAR block if
+    `minpar` is `None` """
+    blocks = ["BLOCK MODSEL\n    1    1   # sugra\n"]
+    if minpar is not None:
+        blocks.append("BLOCK MINPAR\n    1    {:.8E}   # m0\n".format(minpar))
+    blocks.append("BLOCK MASS\n        25     {:.8E}   # h\n".format(mass))
+    blocks.append("BLOCK NMIX\n  1  1   {:.8E}\n".format(nmix))
+    with open(path, "w") as f:
+        f.write("".join(blocks))
+    return str(path)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def phenoai_environment(tmp_path_factory):
+    """ Keeps PhenoAI from querying the update server and caching outside of
+    the test folders """
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setenv("PHENOAI_OFFLINE", "1")
+    monkeypatch.setenv("PHENOAI_CACHE", str(tmp_path_factory.mktemp("cache")))
+    logger.mute()
+    yield
+    monkeypatch.undo()
+
+
+@pytest.fixture(scope="session")
+def ainalysis_folder(tmp_path_factory):
+    """ AInalysis "test_mass" reading MASS 25 and NMIX 1,1 """
+    return make_ainalysis(str(tmp_path_factory.mktemp("ainalyses") / "mass"),
+                          "test_mass", [1.0, 2.0],
+                          [["MASS", 25], ["NMIX", [1, 1]]])
+
+
+@pytest.fixture(scope="session")
+def second_ainalysis_folder(tmp_path_factory):
+    """ AInalysis "test_minpar" reading MINPAR 1 and MASS 25 """
+    return make_ainalysis(
+        str(tmp_path_factory.mktemp("ainalyses") / "minpar"), "test_minpar",
+        [-1.0, 0.5], [["MINPAR", 1], ["MASS", 25]])
+
+
+@pytest.fixture
+def slha_files(tmp_path):
+    """ Five .slha files with parameters inside and outside the application
+    box of the test AInalyses """
+    values = [(0.1, 0.2, 0.3), (0.5, 0.5, 0.5), (0.9, 0.1, 0.7),
+              (2.0, 0.4, 0.2), (0.3, -1.0, 0.9)]
+    return [write_slha(tmp_path / "point{}.slha".format(i), *v)
+            for i, v in enumerate(values)]
@@ -0,0 +1,166 @@
+""" Tests of the AInalysis class """
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pytest
+
+from phenoai import ainalyses
+from phenoai import utils
+
+
+@pytest.fixture
+def ainalysis(ainalysis_folder):
+    """ AInalysis "test_mass" mapping to a target area via a float """
+    a = ainalyses.AInalysis(ainalysis_folder, load_estimator=False)
+    a.configuration["mapping"] = 0.1
+    return a
+
+
+def map_per_row(ainalysis, data):
+    """ Maps data one data point and one parameter at a time, as map_data
+    did before mapping all data points at once """
+    mapping = ainalysis.configuration["mapping"]
+    mapped = np.array(data, dtype=float)
+    has_changed = np.zeros(len(mapped), dtype=bool)
+    for row in range(len(mapped)):
+        for i, parameter in enumerate(ainalysis.configuration["parameters"]):
+            r = parameter[3] - parameter[2]
+            newmin = parameter[2] + r * mapping
+            newmax = parameter[3] - r * mapping
+            if mapped[row, i] < newmin:
+                mapped[row, i] = newmin
+                has_changed[row] = True
+            elif mapped[row, i] > newmax:
+                mapped[row, i] = newmax
+                has_changed[row] = True
+    return mapped, has_changed
+
+
+def test_map_data_matches_per_row_mapping(ainalysis):
+    """Test that mapping all data points at once gives the data points
+    mapped one by one, clipped at the mapping bounds."""
+    rng = np.random.RandomState(2)
+    data = rng.uniform(-0.5, 1.5, (50, 2))
+    data[:3] = [[0.5, 0.5], [0.1, 0.9], [-1.0, 2.0]]
+    expected, expected_changed = map_per_row(ainalysis, data)
+    mapped, has_changed = ainalysis.map_data(data)
+    assert np.allclose(mapped, expected)
+    assert np.array_equal(has_changed, expected_changed)
+    assert 0 < has_changed.sum() < len(data)
+    mins, maxs = ainalysis.configuration.get_mapping_bounds()
+    assert np.allclose(mapped[2], [mins[0], maxs[1]])
+    assert np.all((mapped >= mins) & (mapped <= maxs))
+    # Single data points and integer data
+    mapped, has_changed = ainalysis.map_data(data[2])
+    assert np.allclose(mapped, expected[2]) and has_changed
+    mapped, has_changed = ainalysis.map_data(np.array([[0, 1], [2, -1]]))
+    assert np.allclose(mapped, map_per_row(ainalysis, [[0, 1], [2, -1]])[0])
+    # Bounds follow changes of the configuration
+    ainalysis.configuration["mapping"] = 0.25
+    assert np.allclose(ainalysis.map_data(data)[0],
+                       map_per_row(ainalysis, data)[0])
+
+
+def test_map_data_in_place(ainalysis):
+    """Test that only in_place mapping changes the provided array."""
+    data = np.array([[-1.0, 0.5], [0.5, 0.5], [0.5, 3.0]])
+    original = data.copy()
+    mapped, _ = ainalysis.map_data(data)
+    assert np.array_equal(data, original)
+    assert mapped is not data
+    mapped, _ = ainalysis.map_data(data, in_place=True)
+    assert mapped is data
+    assert np.allclose(data, map_per_row(ainalysis, original)[0])
+    # Integer arrays cannot hold the mapped values and are copied
+    integers = np.array([[-1, 0], [2, 1]])
+    mapped, _ = ainalysis.map_data(integers, in_place=True)
+    assert np.array_equal(integers, [[-1, 0], [2, 1]])
+
+
+@pytest.fixture
+def ainalysis_copy(ainalysis_folder, tmp_path):
+    """ Copy of AInalysis "test_mass" of which files can be changed """
+    folder = str(tmp_path / "mass")
+    shutil.copytree(ainalysis_folder, folder)
+    return folder
+
+
+@pytest.fixture
+def module_loads(monkeypatch):
+    """ Records the paths of modules loaded via utils.load_module """
+    loads = []
+    load_module = utils.load_module
+
+    def counting_load_module(path, *args, **kwargs):
+        loads.append(os.path.basename(path))
+        return load_module(path, *args, **kwargs)
+
+    monkeypatch.setattr(utils, "load_module", counting_load_module)
+    return loads
+
+
+def append_to_functions(folder, line):
+    """ Appends a line to functions.py, keeping its modification time """
+    path = folder + "/functions.py"
+    stat = os.stat(path)
+    with open(path, "a") as f:
+        f.write(line)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return stat
+
+
+def test_functions_are_loaded_once(ainalysis_copy, module_loads):
+    """Test that functions.py is executed once per AInalysis, also over
+    several runs, and again after clearing the cache."""
+    a = ainalyses.AInalysis(ainalysis_copy)
+    functions = a.get_functions()
+    assert a.get_functions() is functions
+    for _ in range(3):
+        a.run(np.array([[0.1, 0.2], [0.3, 0.4]]))
+    assert module_loads == ["functions.py"]
+    assert a.functions_cache_misses == 1 and a.functions_cache_hits >= 4
+    # Every AInalysis has its own module
+    other = ainalyses.AInalysis(ainalysis_copy, load_estimator=False)
+    assert other.get_functions() is not functions
+    assert len(module_loads) == 2
+    a.clear_functions_cache()
+    assert a.get_functions() is not functions
+    assert len(module_loads) == 3
+
+
+def test_changed_functions_are_reloaded(ainalysis_copy, module_loads):
+    """Test that a changed functions.py is executed again, detected by
+    modification time and size or by checksum."""
+    a = ainalyses.AInalysis(ainalysis_copy, load_estimator=False)
+    a.get_functions()
+    stat = append_to_functions(ainalysis_copy, "\nVALUE = 1\n")
+    assert a.get_functions().VALUE == 1
+    assert len(module_loads) == 2
+    # Same size and modification time: only found via the checksum
+    path = ainalysis_copy + "/functions.py"
+    with open(path) as f:
+        content = f.read()
+    with open(path, "w") as f:
+        f.write(content.replace("VALUE = 1", "VALUE = 2"))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert a.get_functions().VALUE == 1
+    a.functions_cache_validation = "checksum"
+    assert a.get_functions().VALUE == 2
+    assert a.get_functions().VALUE == 2
+    assert len(module_loads) == 3
+
+
+def test_pickled_ainalysis_drops_functions(ainalysis_copy, module_loads):
+    """Test that the cached module and loaded estimator are not pickled and
+    are loaded again by the unpickled AInalysis."""
+    a = ainalyses.AInalysis(ainalysis_copy)
+    a.get_functions()
+    copy = pickle.loads(pickle.dumps(a))
+    assert a.functions is not None and a.estimator.is_loaded()
+    assert copy.functions is None and not copy.estimator.is_loaded()
+    copy.get_functions()
+    assert len(module_loads) == 2
+    data = np.array([[0.1, 0.2]])
+    assert np.allclose(copy.run(data).predictions, a.run(data).predictions)
@@ -0,0 +1,143 @@
+""" Tests of the RequestBatcher """
+import threading
+
+import numpy as np
+import pytest
+
+from phenoai import batcher
+from phenoai import containers
+from phenoai import exceptions
+
+
+class StubConfiguration:
+    """ Configuration as stored on an AInalysis """
+
+    def __init__(self):
+        self.configuration = {"defaultid": "stub"}
+
+
+class StubPhenoAI:
+    """ PhenoAI that predicts the sum of every data point and fails on data
+    with negative values """
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def run(self, data, map_data=False, ainalysis_ids=None, data_ids=None):
+        data = np.asarray(data)
+        with self._lock:
+            self.calls.append((len(data), ainalysis_ids, map_data))
+        if np.any(data < 0):
+            raise ValueError("negative data")
+        results = containers.PhenoAIResults()
+        results.add(containers.AInalysisResults(
+            "stub", StubConfiguration(), data, data_ids, False,
+            data.sum(axis=1)))
+        return results
+
+
+def run_concurrently(requests, target):
+    """ Calls `target` with each set of arguments on its own thread, all at
+    the same time, and returns the results or raised exceptions in order """
+    barrier = threading.Barrier(len(requests))
+    outcomes = [None] * len(requests)
+
+    def call(i, args):
+        barrier.wait()
+        try:
+            outcomes[i] = target(*args)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i, args))
+               for i, args in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return outcomes
+
+
+def make_request(offset, n, prefix):
+    data = np.arange(offset, offset + 2 * n, dtype=float).reshape(n, 2)
+    data_ids = ["{}{}".format(prefix, i) for i in range(n)]
+    return data, data_ids
+
+
+def test_concurrent_requests_form_one_batch():
+    """Test that concurrent requests are run as a single batch and every
+    request gets only its own results."""
+    phenoai = StubPhenoAI()
+    requests = [make_request(10 * i, i + 1, "r{}_".format(i))
+                for i in range(4)]
+    b = batcher.RequestBatcher(phenoai, max_wait=5.0,
+                               max_batch_size=sum(len(r[0])
+                                                  for r in requests))
+    outcomes = run_concurrently(
+        [(data, False, ["stub"], data_ids) for data, data_ids in requests],
+        b.run)
+    assert len(phenoai.calls) == 1
+    assert phenoai.calls[0] == (10, ["stub"], False)
+    for (data, data_ids), results in zip(requests, outcomes):
+        result = results.get("stub")
+        assert np.array_equal(result.data, data)
+        assert result.data_ids == data_ids
+        assert np.array_equal(result.predictions, data.sum(axis=1))
+    metrics = b.get_metrics()
+    assert metrics["batches"] == 1
+    assert metrics["requests"] == 4
+    assert metrics["points"] == 10
+    assert metrics["mean_fill"] == 1.0
+
+
+def test_failing_batch_falls_back_to_single_requests():
+    """Test that an error in a batch only affects the request causing it."""
+    phenoai = StubPhenoAI()
+    good, good_ids = make_request(0, 2, "good_")
+    bad, bad_ids = make_request(-10, 1, "bad_")
+    b = batcher.RequestBatcher(phenoai, max_wait=5.0, max_batch_size=3)
+    outcomes = run_concurrently([(good, False, None, good_ids),
+                                 (bad, False, None, bad_ids)], b.run)
+    # One failed batch run, then every request on its own
+    assert sorted(call[0] for call in phenoai.calls) == [1, 2, 3]
+    assert isinstance(outcomes[1], ValueError)
+    assert np.array_equal(outcomes[0].get("stub").predictions,
+                          good.sum(axis=1))
+    assert outcomes[0].get("stub").data_ids == good_ids
+
+
+def test_max_batch_size_starts_new_batch():
+    """Test that a full batch no longer accepts requests."""
+    phenoai = StubPhenoAI()
+    requests = [make_request(10 * i, 2, "r{}_".format(i)) for i in range(3)]
+    b = batcher.RequestBatcher(phenoai, max_wait=0.2, max_batch_size=3)
+    outcomes = run_concurrently(
+        [(data, False, None, data_ids) for data, data_ids in requests],
+        b.run)
+    assert sorted(call[0] for call in phenoai.calls) == [2, 4]
+    assert b.get_metrics()["batches"] == 2
+    for (data, data_ids), results in zip(requests, outcomes):
+        assert results.get("stub").data_ids == data_ids
+        assert np.array_equal(results.get("stub").data, data)
+
+
+def test_incompatible_requests_are_not_combined():
+    """Test that requests for other AInalyses or map modes are batched
+    separately."""
+    phenoai = StubPhenoAI()
+    data, data_ids = make_request(0, 1, "r_")
+    b = batcher.RequestBatcher(phenoai, max_wait=0.2, max_batch_size=100)
+    run_concurrently([(data, False, None, data_ids),
+                      (data, True, None, data_ids),
+                      (data, False, ["other"], data_ids)], b.run)
+    assert len(phenoai.calls) == 3
+    assert b.get_metrics()["batches"] == 3
+
+
+def test_invalid_settings():
+    """Test that invalid batch settings are refused."""
+    with pytest.raises(exceptions.PhenoAIException):
+        batcher.RequestBatcher(StubPhenoAI(), max_wait=-1)
+    with pytest.raises(exceptions.PhenoAIException):
+        batcher.RequestBatcher(StubPhenoAI(), max_batch_size=0)
@@ -0,0 +1,142 @@
+""" Tests of the result containers """
+import numpy as np
+import pytest
+
+from phenoai import containers
+from phenoai import exceptions
+
+
+class StubConfiguration:
+    """ Configuration as stored on an AInalysis """
+
+    def __init__(self, entries=None):
+        self.configuration = entries or {}
+
+
+def make_result(result_id, n=2):
+    data = np.arange(2 * n, dtype=float).reshape(n, 2)
+    return containers.AInalysisResults(result_id, StubConfiguration(), data,
+                                       None, False, data.sum(axis=1))
+
+
+def test_results_index():
+    """Test that results are found by ResultID and by position."""
+    results = containers.PhenoAIResults()
+    a, b = make_result("a"), make_result("b")
+    results.add(a)
+    results.add(b)
+    assert results.get("a") is a and results["b"] is b
+    assert results.get(1) is b
+    assert results.get("c") is None and results.get(2) is None
+    assert results.get(["unhashable"]) is None
+    with pytest.raises(exceptions.ResultsException):
+        results.add(make_result("a"))
+
+
+def test_results_index_follows_changed_list():
+    """Test that results replaced, removed or reordered in the results list
+    are found, and removed ones no longer."""
+    results = containers.PhenoAIResults()
+    a, b, c = make_result("a"), make_result("b"), make_result("c")
+    results.add(a)
+    results.add(b)
+    results.get("a")
+    # Replaced in place
+    results.results[0] = c
+    assert results.get("a") is None
+    assert results.get("c") is c
+    assert results.get("b") is b
+    # Reordered and removed
+    results.results.reverse()
+    assert results.get("b") is b and results.get("c") is c
+    del results.results[0]
+    assert results.get("b") is None
+    # A replaced result can be added again
+    results.add(a)
+    assert results.get_ids() == ["c", "a"]
+    assert results.get("a") is a
+    # Replaced list
+    results.results = [b]
+    assert results.get("b") is b and results.get("a") is None
+
+
+PARAMETERS = [["a", "GeV", 0.0, 1.0], ["b", "GeV", -2.0, 2.0],
+              ["c", "", 10.0, 20.0]]
+
+
+@pytest.fixture
+def outlier_results():
+    """ Results with data points inside, on the boundary of and outside the
+    sampled region and the mapping target area """
+    rng = np.random.RandomState(1)
+    data = np.column_stack([rng.uniform(-0.2, 1.2, 40),
+                            rng.uniform(-2.5, 2.5, 40),
+                            rng.uniform(9.0, 21.0, 40)])
+    data[:4] = [[0.0, -2.0, 10.0], [1.0, 2.0, 20.0], [0.1, -1.6, 11.0],
+                [0.9, 1.6, 19.0]]
+    data_ids = ["p{}".format(i) for i in range(len(data))]
+    configuration = StubConfiguration({"parameters": PARAMETERS,
+                                       "mapping": 0.1})
+    return containers.AInalysisResults("test", configuration, data, data_ids,
+                                       False, data.sum(axis=1))
+
+
+def outlier_per_point(point, mapping=0.0):
+    """ Checks a single data point against the bounds of every parameter, one
+    parameter after another, as is_outlier did before outliers were
+    determined for all data points at once """
+    for j, (_, _, i_min, i_max) in enumerate(PARAMETERS):
+        r = i_max - i_min
+        if point[j] < i_min + r * mapping or point[j] > i_max - r * mapping:
+            return True
+    return False
+
+
+@pytest.mark.parametrize("use_map_target_area", [False, True])
+def test_get_outliers_matches_per_point_check(outlier_results,
+                                              use_map_target_area):
+    """Test that outliers of all data points at once equal the outliers of
+    every data point checked on its own, also as counts per parameter."""
+    mapping = 0.1 if use_map_target_area else 0.0
+    data = outlier_results.data
+    expected = np.array([outlier_per_point(point, mapping)
+                         for point in data])
+    assert 0 < expected.sum() < len(data)
+    outliers = outlier_results.get_outliers(
+        use_map_target_area=use_map_target_area)
+    assert outliers.dtype == bool
+    assert np.array_equal(outliers, expected)
+    assert np.array_equal(outlier_results.is_outlier(
+        use_map_target_area=use_map_target_area), expected)
+    # Selections of data points
+    for i in range(len(data)):
+        assert outlier_results.is_outlier(i, use_map_target_area) \
+            is bool(expected[i])
+        assert outlier_results.get_outliers(
+            "p{}".format(i), use_map_target_area) is bool(expected[i])
+    selection = [5, "p3", 0, 17]
+    rows = [5, 3, 0, 17]
+    assert np.array_equal(
+        outlier_results.get_outliers(selection, use_map_target_area),
+        expected[rows])
+    # Counts per parameter
+    mins = [p[2] + (p[3] - p[2]) * mapping for p in PARAMETERS]
+    maxs = [p[3] - (p[3] - p[2]) * mapping for p in PARAMETERS]
+
+    def count(points):
+        return [sum(point[j] < mins[j] or point[j] > maxs[j]
+                    for point in points) for j in range(len(PARAMETERS))]
+
+    assert outlier_results.get_outliers(
+        use_map_target_area=use_map_target_area, counts=True).tolist() == \
+        count(data)
+    assert outlier_results.get_outliers(
+        rows, use_map_target_area, counts=True).tolist() == count(data[rows])
+
+
+def test_get_outliers_without_mapping_area(outlier_results):
+    """Test that the mapping target area can only be used if mapping is
+    configured via a floating point number."""
+    outlier_results.configuration["mapping"] = True
+    with pytest.raises(exceptions.ResultsException):
+        outlier_results.get_outliers(use_map_target_area=True)
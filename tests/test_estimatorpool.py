@@ -0,0 +1,188 @@
+""" Tests of the EstimatorPool """
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+from phenoai import core
+from phenoai import estimatorpool
+from phenoai import exceptions
+
+
+class StubEstimator:
+    """ Estimator that only keeps track of being loaded """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.loaded = False
+        self.loads = 0
+
+    def load(self):
+        self.loaded = True
+        self.loads += 1
+
+    def clear(self):
+        self.loaded = False
+
+    def is_loaded(self):
+        return self.loaded
+
+
+def use(pool, *estimators):
+    """ Acquires and releases estimators one after another """
+    for estimator in estimators:
+        pool.acquire(estimator)
+        pool.release(estimator)
+
+
+def loaded(*estimators):
+    return [estimator.is_loaded() for estimator in estimators]
+
+
+def sized_estimator(folder, size):
+    """ Stub estimator with an estimator file of `size` bytes """
+    folder.mkdir()
+    (folder / "estimator.pkl").write_bytes(b"\0" * size)
+    (folder / "configuration.yaml").write_bytes(b"\0" * 1000)
+    return StubEstimator(str(folder))
+
+
+def test_lru_eviction():
+    """Test that the least recently used estimator is evicted."""
+    pool = estimatorpool.EstimatorPool(max_estimators=2)
+    a, b, c = StubEstimator(), StubEstimator(), StubEstimator()
+    use(pool, a, b, a, c)
+    assert loaded(a, b, c) == [True, False, True]
+    use(pool, b)
+    assert loaded(a, b, c) == [False, True, True]
+    assert a.loads == 1 and b.loads == 2
+
+
+def test_lfu_eviction():
+    """Test that the least frequently used estimator is evicted, ties
+    broken by least recent use."""
+    pool = estimatorpool.EstimatorPool(max_estimators=2, policy="lfu")
+    a, b, c, d = (StubEstimator() for _ in range(4))
+    # b and c are used once, b longer ago
+    use(pool, a, a, a, b, c)
+    assert loaded(a, b, c) == [True, False, True]
+    # c is used twice, a more often but longer ago
+    use(pool, c, d)
+    assert loaded(a, b, c, d) == [True, False, False, True]
+
+
+def test_acquired_estimators_are_not_evicted():
+    """Test that estimators in use stay loaded, exceeding the budget."""
+    pool = estimatorpool.EstimatorPool(max_estimators=1)
+    a, b = StubEstimator(), StubEstimator()
+    pool.acquire(a)
+    pool.acquire(b)
+    assert loaded(a, b) == [True, True]
+    pool.release(b)
+    assert loaded(a, b) == [True, False]
+    pool.release(a)
+    assert loaded(a) == [True]
+    with pytest.raises(exceptions.PhenoAIException):
+        pool.release(a)
+    with pytest.raises(exceptions.PhenoAIException):
+        pool.release(StubEstimator())
+
+
+def test_pinned_estimators_are_not_evicted():
+    """Test that pinned estimators stay loaded until unpinned."""
+    pool = estimatorpool.EstimatorPool(max_estimators=1)
+    a, b, c = StubEstimator(), StubEstimator(), StubEstimator()
+    pool.pin(a)
+    use(pool, b)
+    assert loaded(a, b) == [True, False]
+    assert pool.evict(a) == 0
+    pool.unpin(a)
+    use(pool, c)
+    assert loaded(a, b, c) == [False, False, True]
+    assert pool.evict() == 1
+    assert loaded(c) == [False]
+
+
+def test_byte_budget(tmp_path):
+    """Test that estimators are evicted to stay within a byte budget."""
+    a = sized_estimator(tmp_path / "a", 100)
+    b = sized_estimator(tmp_path / "b", 200)
+    c = sized_estimator(tmp_path / "c", 300)
+    assert estimatorpool.EstimatorPool.estimator_size(a) == 100
+    assert estimatorpool.EstimatorPool.estimator_size(StubEstimator()) == 0
+    pool = estimatorpool.EstimatorPool(max_bytes=400)
+    use(pool, a, b)
+    assert loaded(a, b) == [True, True]
+    use(pool, c)
+    assert loaded(a, b, c) == [False, False, True]
+    use(pool, a)
+    assert loaded(a, b, c) == [True, False, True]
+    assert pool.get_metrics()["bytes"] == 400
+
+
+def test_metrics():
+    """Test the hit, miss and eviction counters."""
+    pool = estimatorpool.EstimatorPool(max_estimators=1)
+    assert pool.get_metrics()["hit_rate"] is None
+    a, b = StubEstimator(), StubEstimator()
+    use(pool, a, a, a, b)
+    metrics = pool.get_metrics()
+    assert metrics["hits"] == 2
+    assert metrics["misses"] == 2
+    assert metrics["evictions"] == 1
+    assert metrics["hit_rate"] == 0.5
+    assert metrics["loaded"] == 1
+    assert metrics["load_time"] >= 0
+    pool.reset_metrics()
+    metrics = pool.get_metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["evictions"]) == \
+        (0, 0, 0)
+
+
+def test_discard():
+    """Test that discarded estimators are cleared and no longer referenced
+    by the pool."""
+    pool = estimatorpool.EstimatorPool(max_estimators=2)
+    a, b = StubEstimator(), StubEstimator()
+    pool.pin(a)
+    pool.acquire(b)
+    with pytest.raises(exceptions.PhenoAIException):
+        pool.discard(b)
+    pool.release(b)
+    assert pool.discard(a)
+    assert not pool.discard(a)
+    assert loaded(a, b) == [False, True]
+    reference = weakref.ref(a)
+    del a
+    gc.collect()
+    assert reference() is None
+    assert pool.get_metrics()["evictions"] == 0
+
+
+def test_invalid_settings():
+    """Test that invalid pool settings are refused."""
+    with pytest.raises(exceptions.PhenoAIException):
+        estimatorpool.EstimatorPool(policy="fifo")
+    with pytest.raises(exceptions.PhenoAIException):
+        estimatorpool.EstimatorPool(max_estimators=0)
+
+
+def test_phenoai_with_pool(ainalysis_folder, second_ainalysis_folder):
+    """Test that a PhenoAI instance with a pool gives the results of one
+    without, keeping at most one estimator loaded."""
+    pool = estimatorpool.EstimatorPool(max_estimators=1)
+    with_pool = core.PhenoAI(estimator_pool=pool)
+    without_pool = core.PhenoAI()
+    for instance in [with_pool, without_pool]:
+        instance.add(ainalysis_folder)
+        instance.add(second_ainalysis_folder)
+    data = np.array([[0.1, 0.2], [0.5, 1.5]])
+    for _ in range(2):
+        results = with_pool.run(data, "both")
+        expected = without_pool.run(data, "both")
+        for result, other in zip(results.results, expected.results):
+            assert result.result_id == other.result_id
+            assert np.array_equal(result.predictions, other.predictions)
+        assert pool.get_metrics()["loaded"] == 1
+    assert pool.get_metrics()["misses"] == 4
@@ -0,0 +1,66 @@
+""" Tests of the estimators and their storage formats """
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from phenoai import ainalyses
+from phenoai import estimators
+from phenoai import exceptions
+from phenoai import io
+from phenoai import maker
+from phenoai import utils
+
+DATA = np.array([[0.1, 0.2], [0.5, 0.9], [1.5, 0.5], [0.3, -0.2]])
+
+
+def memmapped_arrays(estimator):
+    """ Returns the names of the array attributes of an estimator that are
+    memory-mapped """
+    return [name for name, value in vars(estimator).items()
+            if isinstance(value, np.memmap)]
+
+
+def test_convert_estimator(ainalysis_folder, tmp_path, monkeypatch):
+    """Test that a converted estimator is loaded with memory-mapped arrays,
+    gives the predictions of the pickled estimator and is included in the
+    checksums."""
+    folder = str(tmp_path / "mass")
+    shutil.copytree(ainalysis_folder, folder)
+    pickled = ainalyses.AInalysis(folder)
+    assert memmapped_arrays(pickled.estimator.est) == []
+    maker.convert_estimator(folder)
+    assert not os.path.exists(folder + "/estimator.pkl")
+    assert os.path.isfile(folder + "/estimator.joblib")
+    converted = ainalyses.AInalysis(folder)
+    assert "coef_" in memmapped_arrays(converted.estimator.est)
+    assert np.array_equal(converted.run(DATA).predictions,
+                          pickled.run(DATA).predictions)
+    # Checksums were updated and include the joblib file
+    checksums = utils.calculate_ainalysis_checksums(folder)
+    assert checksums["estimator"] == utils.calculate_file_checksum(
+        folder + "/estimator.joblib")
+    assert io.read_checksum(folder + "/checksums.sfv") == checksums
+    assert converted.configuration.validate_checksum()
+    # Without memory mapping the arrays are read into memory
+    monkeypatch.setattr(estimators.SklearnEstimator, "mmap_mode", None)
+    converted.estimator.clear()
+    converted.estimator.load()
+    assert memmapped_arrays(converted.estimator.est) == []
+    assert np.array_equal(converted.run(DATA).predictions,
+                          pickled.run(DATA).predictions)
+    with pytest.raises(exceptions.MakerError):
+        maker.convert_estimator(folder)
+
+
+def test_convert_estimator_keeps_pickle(ainalysis_folder, tmp_path):
+    """Test that the joblib file is preferred over a kept pickle file."""
+    folder = str(tmp_path / "mass")
+    shutil.copytree(ainalysis_folder, folder)
+    maker.convert_estimator(folder + "/", remove_pickle=False)
+    assert os.path.isfile(folder + "/estimator.pkl")
+    estimator = ainalyses.AInalysis(folder).estimator
+    assert memmapped_arrays(estimator.est) != []
+    assert utils.calculate_ainalysis_checksums(folder)["estimator"] == \
+        utils.calculate_file_checksum(folder + "/estimator.joblib")
@@ -0,0 +1,187 @@
+""" Tests of the persistent FileCache """
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from phenoai import exceptions
+from phenoai import filecache
+from phenoai import io
+
+from .conftest import write_slha
+
+READER = [["MASS", 25], ["NMIX", [1, 1]]]
+
+
+def read(cache, paths):
+    data, failures = cache.read_files(paths, READER, len(READER))
+    assert failures == []
+    return data
+
+
+def modify(path, mass):
+    """ Changes the content of a file and makes sure its modification time
+    changes as well """
+    stat = os.stat(path)
+    write_slha(path, mass, 0.5)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_stat_keyed_hits(tmp_path, slha_files):
+    """Test that files read before are taken from the cache, also by a new
+    cache instance on the same folder."""
+    expected, _ = io.read_files(slha_files, READER, len(READER))
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    assert np.array_equal(read(cache, slha_files), expected)
+    assert (cache.hits, cache.misses) == (0, 5)
+    assert np.array_equal(read(cache, slha_files[::-1]), expected[::-1])
+    assert (cache.hits, cache.misses) == (5, 5)
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    assert np.array_equal(read(cache, slha_files), expected)
+    assert (cache.hits, cache.misses) == (5, 0)
+    # Copies of the files are different files
+    copy = str(tmp_path / "copy.slha")
+    shutil.copy(slha_files[0], copy)
+    assert np.array_equal(read(cache, [copy]), expected[:1])
+    assert cache.misses == 1
+
+
+def test_content_keyed_hits(tmp_path, slha_files):
+    """Test that content keys find copies of cached files."""
+    cache = filecache.FileCache(str(tmp_path / "cache"), key="content")
+    expected = read(cache, slha_files[:2])
+    copies = []
+    for i, path in enumerate(slha_files[:2]):
+        copies.append(str(tmp_path / "copy{}.slha".format(i)))
+        shutil.copy(path, copies[-1])
+    assert np.array_equal(read(cache, copies), expected)
+    assert (cache.hits, cache.misses) == (2, 2)
+    with pytest.raises(exceptions.FileIOException):
+        filecache.FileCache(str(tmp_path / "cache"), key="name")
+
+
+@pytest.mark.parametrize("key", ["stat", "content"])
+def test_modified_files_are_read_again(tmp_path, slha_files, key):
+    """Test that a file that changed is not taken from the cache."""
+    cache = filecache.FileCache(str(tmp_path / "cache"), key=key)
+    read(cache, slha_files)
+    modify(slha_files[1], 0.8)
+    data = read(cache, slha_files)
+    assert data[1, 0] == 0.8
+    assert (cache.hits, cache.misses) == (4, 6)
+
+
+def test_failures_are_not_cached(tmp_path, slha_files):
+    """Test that files that could not be read are reported and not
+    cached."""
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    broken = str(tmp_path / "broken.slha")
+    with open(broken, "w") as f:
+        f.write("BLOCK MASS\n   25  0.5\n")
+    paths = [slha_files[0], broken]
+    for _ in range(2):
+        data, failures = cache.read_files(paths, READER, len(READER))
+        assert [failure[:2] for failure in failures] == [(1, broken)]
+        assert np.all(np.isnan(data[1]))
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_prune(tmp_path, slha_files):
+    """Test that entries of removed and changed files are pruned, as well
+    as the oldest entries beyond `max_entries`."""
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    read(cache, slha_files)
+    signature = cache.signature(READER, len(READER))
+    assert cache.info()[signature]["entries"] == 5
+    os.remove(slha_files[0])
+    modify(slha_files[1], 0.8)
+    assert cache.prune() == 2
+    assert cache.info()[signature]["entries"] == 3
+    assert cache.prune(signature, max_entries=1) == 2
+    # Pruning is written to disk
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    assert cache.info()[signature]["entries"] == 1
+    read(cache, slha_files[1:])
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_flush_appends_new_entries(tmp_path, slha_files, monkeypatch):
+    """Test that flushing only writes the new entries to an existing
+    store."""
+    expected, _ = io.read_files(slha_files, READER, len(READER))
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    writes = []
+    appends = []
+
+    def write_hdf5(path, name, *args, **kwargs):
+        writes.append(name)
+        return io_write_hdf5(path, name, *args, **kwargs)
+
+    def append_hdf5(path, arrays):
+        appends.append(len(arrays["keys"]))
+        return io_append_hdf5(path, arrays)
+
+    io_write_hdf5, io_append_hdf5 = io.write_hdf5, io.append_hdf5
+    monkeypatch.setattr(io, "write_hdf5", write_hdf5)
+    monkeypatch.setattr(io, "append_hdf5", append_hdf5)
+    for chunk in [slha_files[:2], slha_files[1:4], slha_files[4:]]:
+        read(cache, chunk)
+    # Store is written completely once (the first append finds no store),
+    # new entries are appended
+    assert writes == ["keys", "paths", "data"]
+    assert appends == [2, 2, 1]
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    assert np.array_equal(read(cache, slha_files), expected)
+    assert cache.hits == 5
+
+
+def test_interrupted_append(tmp_path, slha_files):
+    """Test that a store with an interrupted append keeps its complete
+    entries and is rewritten on the next flush."""
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    read(cache, slha_files[:2])
+    signature = cache.signature(READER, len(READER))
+    path = os.path.join(str(tmp_path / "cache"), signature + ".hdf5")
+    # Only the key of a third entry was written
+    io.append_hdf5(path, {"keys": np.array([b"partial"])})
+    cache = filecache.FileCache(str(tmp_path / "cache"))
+    read(cache, slha_files[:3])
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert len(io.read_hdf5(path, "keys")) == 3
+    assert len(io.read_hdf5(path, "data")) == 3
+
+
+def test_corrupt_store_is_rebuilt(tmp_path, slha_files):
+    """Test that a store that cannot be read is rebuilt by the first read,
+    also after inspecting and pruning the cache."""
+    folder = str(tmp_path / "cache")
+    signature = filecache.FileCache.signature(READER, len(READER))
+    os.makedirs(folder)
+    path = os.path.join(folder, signature + ".hdf5")
+    with open(path, "wb") as f:
+        f.write(b"not an hdf5 file")
+    cache = filecache.FileCache(folder)
+    assert cache.prune() == 0
+    assert cache.info()[signature]["entries"] == 0
+    expected, _ = io.read_files(slha_files, READER, len(READER))
+    assert np.array_equal(read(cache, slha_files), expected)
+    assert len(io.read_hdf5(path, "keys")) == 5
+    cache = filecache.FileCache(folder)
+    assert np.array_equal(read(cache, slha_files), expected)
+    assert cache.hits == 5
+    # The number of parameters is checked for stores in memory as well
+    with pytest.raises(exceptions.FileIOException):
+        cache.read_files(slha_files, READER[:1], 1, signature=signature)
+
+
+def test_ainalysis_file_cache(tmp_path, ainalysis_folder, slha_files):
+    """Test that an AInalysis reads files through its file cache."""
+    from phenoai import ainalyses
+    ainalysis = ainalyses.AInalysis(ainalysis_folder)
+    expected = ainalysis.read_files(slha_files)
+    ainalysis.file_cache = filecache.FileCache(str(tmp_path / "cache"))
+    for _ in range(2):
+        assert np.array_equal(ainalysis.read_files(slha_files), expected)
+    assert (ainalysis.file_cache.hits, ainalysis.file_cache.misses) == \
+        (5, 5)
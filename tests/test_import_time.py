@@ -0,0 +1,48 @@
+""" Import time tests """
+import os
+import subprocess
+import sys
+import time
+
+# Libraries that may only be imported when they are actually needed
+HEAVY_MODULES = ["sklearn", "tensorflow", "keras", "requests", "h5py",
+                 "pyslha", "matplotlib"]
+
+# Maximum time in seconds that importing PhenoAI may take on top of starting
+# the interpreter
+MAX_IMPORT_TIME = 2.0
+
+
+def run_python(code):
+    """ Runs code in a fresh interpreter and returns its output and the
+    elapsed time """
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [package_root] + [p for p in [env.get("PYTHONPATH")] if p])
+    start = time.time()
+    output = subprocess.check_output([sys.executable, "-c", code], env=env)
+    return (output.decode("utf-8"), time.time() - start)
+
+
+def imported_heavy_modules(statement):
+    """ Returns the heavy modules imported by an import statement """
+    code = ("import sys\n{}\nprint('MODULES:' + ','.join(m for m in {} if m "
+            "in sys.modules))").format(statement, HEAVY_MODULES)
+    output, _ = run_python(code)
+    line = [line for line in output.splitlines()
+            if line.startswith("MODULES:")][0]
+    return [m for m in line[len("MODULES:"):].split(",") if m]
+
+
+def test_import_does_not_load_heavy_libraries():
+    """Test that importing PhenoAI does not import heavy libraries."""
+    assert imported_heavy_modules("import phenoai") == []
+    assert imported_heavy_modules("from phenoai import PhenoAI") == []
+
+
+def test_import_time():
+    """Test that importing PhenoAI is fast."""
+    _, baseline = run_python("pass")
+    _, elapsed = run_python("from phenoai import PhenoAI")
+    assert elapsed - baseline < MAX_IMPORT_TIME
@@ -0,0 +1,198 @@
+""" Tests of the readers and message formats in the io module """
+import numpy as np
+import pytest
+
+from phenoai import exceptions
+from phenoai import io
+
+# .slha file in which blocks and entries are repeated, as written by spectrum
+# generators that report running parameters at several Q scales
+REPEATED_SLHA = """# Repeated blocks and entries
+BLOCK MODSEL
+    1    1   # sugra
+BLOCK MINPAR
+    1    1.00000000E+02   # m0
+    2    2.50000000E+02   # m12
+    1    2.00000000E+02   # m0, repeated
+BLOCK MASS
+        25     1.25000000E+02   # h
+   1000022     9.70000000E+01   # ~chi_10
+DECAY   1000022   0.00000000E+00
+BLOCK HMIX Q= 1.00000000E+02
+    1    3.00000000E+02   # mu(Q)
+    2    9.00000000E+00   # tan beta(Q)
+BLOCK MASS
+        25     1.26000000E+02   # h, repeated block
+   1000022     9.80000000E+01
+   1000023     1.81000000E+02
+BLOCK HMIX Q= 1.00000000E+03
+    1    3.50000000E+02   # mu(Q)
+    2    1.00000000E+01   # tan beta(Q)
+BLOCK NMIX
+  1  1   9.80000000E-01
+  1  2  -1.00000000E-01
+  1  1   9.90000000E-01
+"""
+
+
+@pytest.fixture
+def repeated_slha(tmp_path):
+    path = tmp_path / "repeated.slha"
+    path.write_text(REPEATED_SLHA)
+    return str(path)
+
+
+def test_extract_slha_matches_pyslha_for_repeated_blocks(repeated_slha):
+    """Test that the fast .slha reader uses the last occurrence of repeated
+    blocks and entries, like pyslha."""
+    pytest.importorskip("pyslha")
+    reader_list = [["MASS", 25], ["MINPAR", 1], ["mass", "1000022"],
+                   ["HMIX", 1], ["HMIX", 2], ["MINPAR", 2], ["NMIX", "1,1"],
+                   ["MASS", 1000023], ["MODSEL", 1]]
+    fast = io.read_slha(repeated_slha, reader_list, fast=True)
+    slow = io.read_slha(repeated_slha, reader_list, fast=False)
+    assert np.array_equal(fast, slow)
+    assert np.array_equal(
+        fast, [126., 200., 98., 350., 10., 250., 0.99, 181., 1.])
+    # Same result when reading from memory
+    with open(repeated_slha) as f:
+        buffered = io.read_slha(f.read().encode("utf-8"), reader_list)
+    assert np.array_equal(buffered, slow)
+
+
+def test_extract_slha_missing_in_last_block(tmp_path):
+    """Test that an entry that is only present in an earlier occurrence of a
+    block is not found, like in pyslha."""
+    pytest.importorskip("pyslha")
+    path = tmp_path / "missing.slha"
+    path.write_text("BLOCK MASS\n   25  125.0\n   35  500.0\n"
+                    "BLOCK MASS\n   25  126.0\n")
+    for fast in [True, False]:
+        with pytest.raises(exceptions.FileIOException):
+            io.read_slha(str(path), [["MASS", 35]], fast=fast)
+
+
+def test_slha_entry_key_normalizes_switches():
+    """Test that all forms of a switch refer to the same .slha entry."""
+    assert io.slha_entry_key(["mass", "25"]) == ("MASS", 25)
+    assert io.slha_entry_key(["MASS", 25]) == ("MASS", 25)
+    for switch in ["1,2", " 1, 2", [1, 2], ["1", "2"], (1, 2)]:
+        assert io.slha_entry_key(["nmix", switch]) == ("NMIX", (1, 2))
+    assert io.slha_entry_key(["MASS", [25]]) == ("MASS", 25)
+    with pytest.raises(exceptions.FileIOException):
+        io.slha_entry_key(["MASS"])
+
+
+def test_binary_message_round_trip():
+    """Test that arrays survive encoding and decoding as binary message."""
+    arrays = {
+        "data": np.arange(12, dtype=float).reshape(4, 3),
+        "empty": np.zeros((0, 3)),
+        "scalar": np.array(3.5),
+        "bigendian": np.arange(6, dtype=">i4").reshape(2, 3),
+        "flags": np.array([True, False, True]),
+        "single": np.ones(3, dtype=np.float32),
+        "empty_last": np.zeros(0, dtype=np.int8)
+    }
+    message = io.encode_binary({"mode": "values", "ids": ["a", "b"]}, arrays)
+    assert len(message) % 8 == 0
+    header, decoded = io.decode_binary(message)
+    assert header == {"mode": "values", "ids": ["a", "b"]}
+    assert list(decoded) == list(arrays)
+    for name, array in arrays.items():
+        assert decoded[name].shape == array.shape
+        assert decoded[name].dtype == array.dtype.newbyteorder("<")
+        assert np.array_equal(decoded[name], array)
+    # Arrays are views on the message, unless it is mutable
+    assert not decoded["data"].flags.writeable
+    _, decoded = io.decode_binary(bytearray(message))
+    assert decoded["data"].flags.writeable
+    assert io.decode_binary(io.encode_binary({})) == ({}, {})
+
+
+def test_binary_message_errors():
+    """Test that invalid arrays and messages raise PhenoAI exceptions."""
+    with pytest.raises(exceptions.PhenoAIException):
+        io.encode_binary({}, {"ids": np.array(["a", "b"])})
+    message = io.encode_binary({}, {"data": np.ones(4)})
+    with pytest.raises(exceptions.PhenoAIException):
+        io.decode_binary(message[:-8])
+    with pytest.raises(exceptions.PhenoAIException):
+        io.decode_binary(b"\x01")
+
+
+@pytest.mark.parametrize("chunksize", [None, 1, 2])
+def test_read_files_in_worker_processes(tmp_path, slha_files, chunksize):
+    """Test that files read by worker processes give the data of a serial
+    read, in the same order, and that unreadable files are reported."""
+    missing = str(tmp_path / "missing.slha")
+    broken = str(tmp_path / "broken.slha")
+    with open(broken, "w") as f:
+        f.write("BLOCK MASS\n   25  0.5\n")
+    paths = slha_files[:2] + [missing] + slha_files[2:] + [broken]
+    reader = [["MASS", 25], ["NMIX", [1, 1]]]
+    serial, serial_failures = io.read_files(paths, reader, 2)
+    data, failures = io.read_files(paths, reader, 2, n_workers=2,
+                                   chunksize=chunksize)
+    assert np.array_equal(data, serial, equal_nan=True)
+    assert [failure[:2] for failure in failures] == \
+        [failure[:2] for failure in serial_failures] == \
+        [(2, missing), (6, broken)]
+    assert np.all(np.isnan(data[[2, 6]]))
+    assert data[:, 0].tolist()[:2] == [0.1, 0.5]
+
+
+def test_ainalysis_read_files_in_worker_processes(tmp_path, ainalysis_folder,
+                                                  slha_files):
+    """Test that an AInalysis reading files in worker processes gives the
+    data of a serial read and reports unreadable files."""
+    from phenoai import ainalyses
+    ainalysis = ainalyses.AInalysis(ainalysis_folder)
+    missing = str(tmp_path / "missing.slha")
+    paths = slha_files + [missing]
+    serial, serial_failures = ainalysis.read_files(paths,
+                                                   return_failures=True)
+    data, failures = ainalysis.read_files(paths, n_workers=2, chunksize=2,
+                                          return_failures=True)
+    assert np.array_equal(data, serial, equal_nan=True)
+    assert [failure[:2] for failure in failures] == \
+        [failure[:2] for failure in serial_failures] == [(5, missing)]
+    assert isinstance(failures[0][2], str)
+    ainalysis.read_workers = 2
+    assert np.array_equal(ainalysis.read_files(paths), serial,
+                          equal_nan=True)
+
+
+def test_read_files_buffers_with_functions(tmp_path):
+    """Test that reader functions only get a temporary file if they reject
+    buffers, and that errors of readers accepting buffers are reported as
+    they are."""
+    from io import StringIO
+    content = "1.5 2.5\n"
+    calls = []
+
+    def path_reader(path):
+        calls.append(type(path))
+        with open(path) as f:
+            return f.read().split()
+
+    def buffer_reader(source):
+        calls.append(type(source))
+        values = source.read().split()
+        if len(values) != 2:
+            raise ValueError("expected two values")
+        return values
+
+    buffers = [StringIO(content), content.encode("utf-8")]
+    data, failures = io.read_files(buffers, path_reader, 2)
+    assert failures == []
+    assert data.dtype == np.float64
+    assert np.array_equal(data, [[1.5, 2.5], [1.5, 2.5]])
+    assert calls == [StringIO, str, bytes, str]
+    calls.clear()
+    data, failures = io.read_files([StringIO(content), StringIO("1.5\n")],
+                                   buffer_reader, 2)
+    assert np.array_equal(data[0], [1.5, 2.5])
+    assert [(i, message) for i, _, message in failures] == \
+        [(1, "expected two values")]
+    assert calls == [StringIO, StringIO]
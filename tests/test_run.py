@@ -0,0 +1,292 @@
+""" Tests of the ways PhenoAI.run and PhenoAI.run_iter process data """
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from phenoai import containers
+from phenoai import core
+from phenoai import estimators
+from phenoai import exceptions
+from phenoai import io
+from phenoai import utils
+
+from .conftest import write_slha
+
+DATA = np.array([[0.1, 0.2], [0.5, 0.9], [1.5, 0.5], [0.3, -0.2],
+                 [0.7, 0.4], [0.2, 0.8], [0.9, 0.9]])
+DATA_IDS = ["p{}".format(i) for i in range(len(DATA))]
+
+
+def make_phenoai(ainalysis_folders, **kwargs):
+    instance = core.PhenoAI(**kwargs)
+    for folder in ainalysis_folders:
+        instance.add(folder)
+    return instance
+
+
+@pytest.fixture
+def phenoai_instance(ainalysis_folder, second_ainalysis_folder):
+    return make_phenoai([ainalysis_folder, second_ainalysis_folder])
+
+
+def summarize(results):
+    """ Returns the predictions, data, data IDs and map flags (per data
+    point) of every AInalysisResults object, in order """
+    return [(r.result_id, np.asarray(r.predictions), np.asarray(r.data),
+             None if r.data_ids is None else list(r.data_ids),
+             np.broadcast_to(r.mapped, (len(r.predictions), )))
+            for r in results.results]
+
+
+def concatenate(chunks):
+    """ Joins the results of the chunks of a stream per result ID """
+    summaries = [summarize(results) for results in chunks]
+    joined = []
+    for i, (result_id, _, _, data_ids, _) in enumerate(summaries[0]):
+        parts = [summary[i] for summary in summaries]
+        assert all(part[0] == result_id for part in parts)
+        joined.append((
+            result_id,
+            np.concatenate([part[1] for part in parts]),
+            np.concatenate([part[2] for part in parts]),
+            None if data_ids is None else sum([part[3] for part in parts],
+                                              []),
+            np.concatenate([part[4] for part in parts])))
+    return joined
+
+
+def assert_same_results(summary, expected):
+    assert [s[0] for s in summary] == [e[0] for e in expected]
+    for (_, predictions, data, data_ids, mapped), \
+            (_, e_predictions, e_data, e_data_ids, e_mapped) in \
+            zip(summary, expected):
+        assert np.allclose(predictions, e_predictions)
+        assert np.allclose(data, e_data)
+        assert data_ids == e_data_ids
+        assert np.array_equal(mapped, e_mapped)
+
+
+@pytest.mark.parametrize("chunksize", [1, 3, 7, 100])
+def test_run_iter_arrays(phenoai_instance, chunksize):
+    """Test that chunks of an array give the results of a single run, in
+    order."""
+    expected = summarize(phenoai_instance.run(DATA, "both",
+                                              data_ids=DATA_IDS))
+    chunks = list(phenoai_instance.run_iter(DATA, "both", data_ids=DATA_IDS,
+                                            chunksize=chunksize))
+    assert len(chunks) == -(-len(DATA) // chunksize)
+    assert_same_results(concatenate(chunks), expected)
+
+
+def test_run_iter_generator(phenoai_instance):
+    """Test that data yielded by a generator, as arrays of several sizes
+    and single data points, gives the results of a single run."""
+    expected = summarize(phenoai_instance.run(DATA, data_ids=DATA_IDS))
+
+    def stream():
+        yield DATA[:2]
+        yield DATA[2]
+        yield DATA[3].tolist()
+        yield DATA[4:]
+
+    chunks = list(phenoai_instance.run_iter(stream(), data_ids=iter(DATA_IDS),
+                                            chunksize=2))
+    assert_same_results(concatenate(chunks), expected)
+    # Without data IDs
+    expected = summarize(phenoai_instance.run(DATA))
+    assert_same_results(
+        concatenate(phenoai_instance.run_iter(stream(), chunksize=2)),
+        expected)
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 5])
+def test_run_iter_files(phenoai_instance, slha_files, chunksize):
+    """Test that chunks of file paths, as list or generator, give the
+    results of a single run, in order."""
+    expected = summarize(phenoai_instance.run(slha_files, True))
+    chunks = list(phenoai_instance.run_iter(slha_files, True,
+                                            chunksize=chunksize))
+    assert len(chunks) == -(-len(slha_files) // chunksize)
+    assert_same_results(concatenate(chunks), expected)
+    chunks = phenoai_instance.run_iter(iter(slha_files), True,
+                                       chunksize=chunksize)
+    assert_same_results(concatenate(chunks), expected)
+
+
+def test_iter_chunks():
+    """Test that iter_chunks keeps data and IDs together and in order."""
+    chunks = list(utils.iter_chunks(DATA, 3, DATA_IDS))
+    assert [len(chunk) for chunk, _ in chunks] == [3, 3, 1]
+    assert np.array_equal(np.concatenate([c for c, _ in chunks]), DATA)
+    assert sum([ids for _, ids in chunks], []) == DATA_IDS
+    paths = ["a.slha", "b.slha", "c.slha"]
+    assert list(utils.iter_chunks(iter(paths), 2)) == \
+        [(["a.slha", "b.slha"], None), (["c.slha"], None)]
+    assert list(utils.iter_chunks("a.slha", 2)) == [(["a.slha"], None)]
+    with pytest.raises(ValueError):
+        list(utils.iter_chunks(DATA, 0))
+
+
+@pytest.mark.parametrize("executor", ["thread", "process", "instance"])
+@pytest.mark.parametrize("dynamic", [True, False])
+def test_run_with_executor(ainalysis_folder, second_ainalysis_folder,
+                           slha_files, executor, dynamic):
+    """Test that AInalyses run by an executor give the results of a serial
+    run, in the same order."""
+    folders = [ainalysis_folder, second_ainalysis_folder]
+    serial = make_phenoai(folders, dynamic=dynamic)
+    pool = ThreadPoolExecutor(2) if executor == "instance" else None
+    concurrent = make_phenoai(folders, dynamic=dynamic,
+                              executor=pool or executor, n_workers=2)
+    try:
+        for _ in range(2):
+            for data, map_data, data_ids in [(DATA, "both", DATA_IDS),
+                                             (DATA, False, None),
+                                             (slha_files, True, None)]:
+                assert_same_results(
+                    summarize(concurrent.run(data, map_data,
+                                             data_ids=data_ids)),
+                    summarize(serial.run(data, map_data, data_ids=data_ids)))
+        # Only the selected AInalyses are run
+        results = concurrent.run(DATA, ainalysis_ids=["test_minpar"])
+        assert [r.result_id for r in results.results] == ["test_minpar"]
+    finally:
+        concurrent.close()
+    if pool is not None:
+        # Executors that were passed in are not shut down
+        assert pool.submit(sum, [1, 2]).result() == 3
+        pool.shutdown()
+    else:
+        # A new pool is created after closing
+        assert concurrent.get_executor() is not None
+        concurrent.close()
+
+
+def run_separately(phenoai_instance, paths):
+    """ Runs every AInalysis on its own, reading the files itself """
+    results = containers.PhenoAIResults()
+    for ainalysis in phenoai_instance.ainalyses:
+        ainalysis.estimator.load()
+        results.add(ainalysis.run(paths, True))
+        ainalysis.estimator.clear()
+    return results
+
+
+def test_files_are_read_once_for_all_ainalyses(phenoai_instance, tmp_path,
+                                               slha_files, monkeypatch):
+    """Test that files read once with the union of the reader lists give
+    the results of every AInalysis reading the files itself, also for files
+    that only lack entries of one AInalysis."""
+    no_minpar = write_slha(tmp_path / "nominpar.slha", 0.4, 0.6)
+    missing = str(tmp_path / "missing.slha")
+    paths = slha_files[:2] + [no_minpar, missing] + slha_files[2:]
+    expected = [run_separately(phenoai_instance, files)
+                for files in [paths, slha_files]]
+    reads = []
+
+    def read_files(paths, reader, *args, **kwargs):
+        reads.append((len(paths), len(reader)))
+        return io_read_files(paths, reader, *args, **kwargs)
+
+    io_read_files = io.read_files
+    monkeypatch.setattr(io, "read_files", read_files)
+    results = phenoai_instance.run(paths, True)
+    # One read of all files with the three distinct entries, then the two
+    # failed files are read again for each AInalysis
+    assert reads == [(7, 3), (2, 2), (2, 2)]
+    assert_same_results(summarize(results), summarize(expected[0]))
+    assert no_minpar in results.get("test_mass").data_ids
+    assert no_minpar not in results.get("test_minpar").data_ids
+    assert missing not in results.get("test_mass").data_ids
+    # Without failures the files are read once
+    reads.clear()
+    results = phenoai_instance.run(slha_files, True)
+    assert reads == [(5, 3)]
+    assert_same_results(summarize(results), summarize(expected[1]))
+
+
+def test_concurrent_runs_share_estimators(phenoai_instance):
+    """Test that concurrent runs in dynamic mode do not clear estimators
+    that other runs still use, and that estimators are cleared after the
+    last run."""
+    expected = summarize(phenoai_instance.run(DATA, "both"))
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(phenoai_instance.run, DATA, "both")
+                   for _ in range(64)]
+        for future in futures:
+            assert_same_results(summarize(future.result()), expected)
+    assert not any(ainalysis.estimator.is_loaded()
+                   for ainalysis in phenoai_instance.ainalyses)
+    # Estimators loaded outside of runs stay loaded
+    phenoai_instance.ainalyses[0].estimator.load()
+    phenoai_instance.run(DATA)
+    assert phenoai_instance.ainalyses[0].estimator.is_loaded()
+
+
+@pytest.fixture
+def estimator_calls(monkeypatch):
+    """ Records the loads (with the name of the loading thread) and the
+    predictions of scikit-learn estimators """
+    calls = {"load": [], "predict": []}
+    load = estimators.SklearnEstimator.load
+    predict = estimators.SklearnEstimator.predict
+
+    def counting_load(self):
+        calls["load"].append(threading.current_thread().name)
+        return load(self)
+
+    def counting_predict(self, data):
+        calls["predict"].append(len(data))
+        return predict(self, data)
+
+    monkeypatch.setattr(estimators.SklearnEstimator, "load", counting_load)
+    monkeypatch.setattr(estimators.SklearnEstimator, "predict",
+                        counting_predict)
+    return calls
+
+
+def test_warm_up(ainalysis_folder, second_ainalysis_folder, estimator_calls):
+    """Test that freshly loaded estimators make a dummy prediction when
+    warm_up is set, and that adding a duplicate AInalysis loads nothing."""
+    folders = [ainalysis_folder, second_ainalysis_folder]
+    static = make_phenoai(folders, dynamic=False, warm_up=True)
+    assert estimator_calls == {"load": ["MainThread"] * 2, "predict": [1, 1]}
+    with pytest.raises(exceptions.PhenoAIException):
+        static.add(ainalysis_folder)
+    assert len(estimator_calls["load"]) == 2
+    static.run(DATA)
+    assert estimator_calls["predict"] == [1, 1, len(DATA), len(DATA)]
+    # Dynamic mode warms up every time an estimator is loaded
+    estimator_calls["load"].clear()
+    estimator_calls["predict"].clear()
+    dynamic = make_phenoai(folders, warm_up=True)
+    assert estimator_calls == {"load": [], "predict": []}
+    for _ in range(2):
+        dynamic.run(DATA)
+    assert len(estimator_calls["load"]) == 4
+    assert estimator_calls["predict"] == [1, len(DATA)] * 4
+    # Without warm_up only the data is predicted
+    estimator_calls["predict"].clear()
+    make_phenoai(folders).run(DATA)
+    assert estimator_calls["predict"] == [len(DATA)] * 2
+
+
+def test_prefetch(ainalysis_folder, second_ainalysis_folder,
+                  estimator_calls):
+    """Test that with prefetch the estimator of the next AInalysis is loaded
+    on a background thread, giving the results of a run without prefetch."""
+    folders = [ainalysis_folder, second_ainalysis_folder]
+    expected = summarize(make_phenoai(folders).run(DATA, "both"))
+    estimator_calls["load"].clear()
+    instance = make_phenoai(folders, prefetch=True)
+    try:
+        assert_same_results(summarize(instance.run(DATA, "both")), expected)
+        assert estimator_calls["load"][0] == "MainThread"
+        assert estimator_calls["load"][1] != "MainThread"
+        assert len(estimator_calls["load"]) == 2
+        assert not any(ainalysis.estimator.is_loaded()
+                       for ainalysis in instance.ainalyses)
+    finally:
+        instance.close()
@@ -0,0 +1,386 @@
+""" Tests of the communication between PhenoAI clients and servers """
+import asyncio
+import os
+import signal
+import socket
+import threading
+import time
+from io import StringIO
+
+import numpy as np
+import pytest
+import requests
+
+from phenoai import client
+from phenoai import core
+from phenoai import exceptions
+from phenoai import io
+
+
+class CountingHTTPServer(core.ThreadedHTTPServer):
+    """ Server counting the connections it accepted """
+
+    connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+class QuietRequestHandler(core.PhenoAIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def phenoai_instance(ainalysis_folder, second_ainalysis_folder):
+    """ PhenoAI instance with both test AInalyses """
+    instance = core.PhenoAI()
+    instance.add(ainalysis_folder)
+    instance.add(second_ainalysis_folder)
+    yield instance
+    instance.close()
+
+
+def start_server(instance, handler=QuietRequestHandler):
+    """ Serves a PhenoAI instance on a free port on a background thread """
+    core.__serverinstance__ = instance
+    core.__serverbatcher__ = None
+    server = CountingHTTPServer(("localhost", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def stop_server(server, thread):
+    server.shutdown()
+    server.server_close()
+    thread.join(5)
+    core.__serverinstance__ = None
+
+
+@pytest.fixture
+def server(phenoai_instance):
+    """ Server running the test AInalyses, yielding its port """
+    server, thread = start_server(phenoai_instance)
+    yield server
+    stop_server(server, thread)
+
+
+def assert_same_results(results, expected):
+    assert [r.result_id for r in results.results] == \
+        [r.result_id for r in expected.results]
+    for result, other in zip(results.results, expected.results):
+        assert np.allclose(result.predictions, other.predictions)
+        assert np.allclose(result.data, other.data)
+        assert result.data_ids == other.data_ids
+        assert np.array_equal(result.mapped, other.mapped)
+
+
+DATA = np.array([[0.1, 0.2], [0.5, 0.9], [1.5, 0.5], [0.3, -0.2]])
+DATA_IDS = ["a", "b", "c", "d"]
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_binary_and_text_requests(server, phenoai_instance, binary):
+    """Test that data sent as binary message or as text gives the results of
+    a local run."""
+    port = server.server_address[1]
+    c = client.PhenoAIClient("localhost", port, binary=binary,
+                             array_results=False)
+    assert c.server_formats == ["binary", "arrays"]
+    assert c.use_binary() == binary
+    expected = phenoai_instance.run(DATA, True, data_ids=DATA_IDS)
+    assert_same_results(c.predict(DATA, True, data_ids=DATA_IDS),
+                        expected)
+    # Single data point, selected AInalysis
+    c.ainalysis_ids = ["test_minpar"]
+    expected = phenoai_instance.run(DATA[:1], ainalysis_ids=["test_minpar"])
+    assert_same_results(c.predict(DATA[0]), expected)
+    c.close()
+
+
+class ConfigurationCountingHandler(QuietRequestHandler):
+    """ Handler counting the requests for configurations """
+
+    configuration_requests = []
+
+    def _do_post_configuration(self, post):
+        self.configuration_requests.append(post["ainalysis_ids"])
+        return super()._do_post_configuration(post)
+
+
+def test_array_results_equal_pickled_results(phenoai_instance):
+    """Test that results returned as arrays are rebuilt to the results
+    returned as pickled object, with configurations requested once."""
+    handler = type("Handler", (ConfigurationCountingHandler, ),
+                   {"configuration_requests": []})
+    server, thread = start_server(phenoai_instance, handler)
+    try:
+        port = server.server_address[1]
+        pickled = client.PhenoAIClient("localhost", port, array_results=False)
+        arrays = client.PhenoAIClient("localhost", port)
+        assert arrays.use_array_results()
+        for map_data in [False, True]:
+            expected = pickled.predict(DATA, map_data, DATA_IDS)
+            results = arrays.predict(DATA, map_data, DATA_IDS)
+            assert_same_results(results, expected)
+            for result, other in zip(results.results, expected.results):
+                assert result.configuration.configuration == \
+                    other.configuration.configuration
+            # Rebuilt results can be used like the pickled ones
+            assert np.allclose(results.get("test_mass").get_predictions("b"),
+                               expected.get("test_mass").get_predictions("b"))
+        assert sorted(handler.configuration_requests) == \
+            ['["test_mass"]', '["test_minpar"]']
+        pickled.close()
+        arrays.close()
+    finally:
+        stop_server(server, thread)
+
+
+def test_rebuild_results(phenoai_instance):
+    """Test that results are rebuilt from arrays and cached
+    configurations."""
+    expected = io.unpickle(io.pickle(
+        phenoai_instance.run(DATA, "both", data_ids=DATA_IDS)))
+    header = {"results": []}
+    arrays = {}
+    configurations = {}
+    for i, result in enumerate(expected.results):
+        ainalysis_id = result.result_id.replace("_mapped", "")
+        configuration = phenoai_instance.get(ainalysis_id).configuration
+        version = configuration["ainalysisversion"]
+        configurations[(ainalysis_id, version)] = configuration.configuration
+        mapped = isinstance(result.mapped, np.ndarray)
+        header["results"].append({
+            "result_id": result.result_id, "ainalysis_id": ainalysis_id,
+            "version": version, "data_ids": result.data_ids,
+            "mapped": mapped})
+        arrays["predictions.{}".format(i)] = result.predictions
+        if mapped:
+            arrays["mapped.{}".format(i)] = result.mapped
+            arrays["data.{}".format(i)] = result.data
+    header, arrays = io.decode_binary(io.encode_binary(header, arrays))
+    # Data of results that were not mapped is taken from the sent data
+    results = client._rebuild_results(header, arrays, configurations, DATA)
+    assert_same_results(results, expected)
+    with pytest.raises(exceptions.ClientException):
+        client._rebuild_results(header, arrays, configurations)
+
+
+def test_client_reuses_connection(server, phenoai_instance):
+    """Test that a client sends all requests over one kept alive
+    connection."""
+    port = server.server_address[1]
+    c = client.PhenoAIClient("localhost", port)
+    expected = phenoai_instance.run(DATA, data_ids=DATA_IDS)
+    for _ in range(5):
+        assert_same_results(c.predict(DATA, data_ids=DATA_IDS), expected)
+    assert server.connections == 1
+    # A closed client reconnects
+    c.close()
+    assert_same_results(c.predict(DATA, data_ids=DATA_IDS), expected)
+    assert server.connections == 2
+    c.close()
+
+
+def test_idle_and_draining_connections_are_closed(phenoai_instance):
+    """Test that the server closes idle connections and connections of a
+    stopping server, after which the client reconnects."""
+    handler = type("Handler", (QuietRequestHandler, ), {"timeout": 0.2})
+    server, thread = start_server(phenoai_instance, handler)
+    try:
+        url = "http://localhost:{}".format(server.server_address[1])
+        session = requests.Session()
+        response = session.get(url, timeout=5)
+        assert response.headers["Content-Length"] == \
+            str(len(response.content))
+        assert "close" not in response.headers.get("Connection", "")
+        # Idle connection is closed by the server, the session reconnects
+        time.sleep(0.5)
+        session.get(url, timeout=5).raise_for_status()
+        assert server.connections == 2
+        # Draining server closes the connection after the response
+        server.draining = True
+        response = session.get(url, timeout=5)
+        assert response.headers["Connection"] == "close"
+        server.draining = False
+        session.get(url, timeout=5).raise_for_status()
+        assert server.connections == 3
+        session.close()
+    finally:
+        stop_server(server, thread)
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_async_predict_many(server, phenoai_instance, binary):
+    """Test that the asyncio client returns the results of all chunks in
+    order, over at most `concurrency` connections."""
+    port = server.server_address[1]
+    chunks = [DATA + 0.01 * i for i in range(12)]
+    chunk_ids = [["{}{}".format(i, data_id) for data_id in DATA_IDS]
+                 for i in range(12)]
+
+    async def predict():
+        async with client.AsyncPhenoAIClient(
+                "localhost", port, binary=binary, concurrency=3) as c:
+            return await c.predict_many(chunks, True, chunk_ids)
+
+    results = asyncio.run(predict())
+    assert len(results) == len(chunks)
+    for chunk, ids, result in zip(chunks, chunk_ids, results):
+        assert_same_results(result, phenoai_instance.run(chunk, True,
+                                                         data_ids=ids))
+    assert server.connections <= 3
+
+
+def test_async_client_retries_closed_connection(phenoai_instance):
+    """Test that a request over a connection closed by the server is retried
+    on a new connection, and that server errors are raised."""
+    handler = type("Handler", (QuietRequestHandler, ), {"timeout": 0.2})
+    server, thread = start_server(phenoai_instance, handler)
+    expected = phenoai_instance.run(DATA)
+
+    async def predict():
+        c = client.AsyncPhenoAIClient("localhost", server.server_address[1])
+        try:
+            first = await c.predict(DATA)
+            # Server closes the idle connection
+            await asyncio.sleep(0.5)
+            second = await c.predict(DATA)
+            with pytest.raises(exceptions.AInalysisException):
+                await c.predict_many([DATA, DATA[:, :1]])
+            return first, second
+        finally:
+            await c.close()
+
+    try:
+        for results in asyncio.run(predict()):
+            assert_same_results(results, expected)
+        assert server.connections >= 2
+    finally:
+        stop_server(server, thread)
+
+
+def test_async_client_connection_errors():
+    """Test that an unreachable server raises a ClientException."""
+    with pytest.raises(exceptions.ClientException):
+        client.AsyncPhenoAIClient("localhost", 1, concurrency=0)
+    c = client.AsyncPhenoAIClient("localhost", 1)
+    with pytest.raises(exceptions.ClientException):
+        asyncio.run(c.predict(DATA))
+
+
+def test_file_mode(server, phenoai_instance, slha_files):
+    """Test that a file sent to the server is parsed from memory and named
+    after the file at the client."""
+    port = server.server_address[1]
+    c = client.PhenoAIClient("localhost", port)
+    for map_data in [False, True]:
+        results = c.predict(slha_files[1], map_data)
+        expected = phenoai_instance.run(slha_files[1], map_data)
+        assert [r.result_id for r in results.results] == \
+            ["test_mass", "test_minpar"]
+        assert_same_results(results, expected)
+        assert results.get("test_mass").data_ids == [slha_files[1]]
+    c.ainalysis_ids = ["test_mass"]
+    assert_same_results(c.predict(slha_files[3]),
+                        phenoai_instance.run(slha_files[3],
+                                             ainalysis_ids=["test_mass"]))
+    c.close()
+
+    async def predict():
+        async with client.AsyncPhenoAIClient("localhost", port) as c:
+            return await c.predict_many(slha_files[:2])
+
+    for path, results in zip(slha_files, asyncio.run(predict())):
+        assert_same_results(results, phenoai_instance.run(path))
+
+
+def test_run_on_string_buffer(phenoai_instance, slha_files):
+    """Test that a StringIO body gives the same results as the file it
+    contains, with the name of the buffer as data ID."""
+    with open(slha_files[2]) as f:
+        content = f.read()
+    expected = phenoai_instance.run(slha_files[2])
+    source = StringIO(content)
+    source.name = "point.slha"
+    buffers = [source, StringIO(content), content.encode("utf-8")]
+    for buffer in buffers:
+        results = phenoai_instance.run(buffer)
+        for result, other in zip(results.results, expected.results):
+            assert result.result_id == other.result_id
+            assert np.array_equal(result.predictions, other.predictions)
+            assert np.array_equal(result.data, other.data)
+        if buffer is source:
+            assert results.get("test_mass").data_ids == ["point.slha"]
+
+
+def worker_pid(port):
+    """ Asks a prefork server for the pid of the worker handling a request,
+    over a new connection """
+    c = client.PhenoAIClient("localhost", port, binary=False)
+    try:
+        return int(c.predict(DATA, return_object=False))
+    finally:
+        c.close()
+
+
+def wait_for_server(port, timeout=30):
+    """ Waits until a server accepts requests """
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return worker_pid(port)
+        except exceptions.ClientException:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_prefork_server(phenoai_instance):
+    """Test that a server with worker processes serves requests, restarts
+    workers that die and stops on SIGTERM."""
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            phenoai_instance.run_as_server(
+                "localhost", port, workers=2, graceful_timeout=5,
+                to_string_function=lambda results: str(os.getpid()))
+            status = 0
+        finally:
+            os._exit(status)
+    try:
+        worker = wait_for_server(port)
+        assert worker != pid
+        # A killed worker is replaced
+        os.kill(worker, signal.SIGKILL)
+        deadline = time.time() + 10
+        workers = set()
+        while len(workers) < 2 and time.time() < deadline:
+            workers.add(worker_pid(port))
+        assert len(workers) == 2 and worker not in workers
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.time() + 15
+        while time.time() < deadline:
+            stopped, status = os.waitpid(pid, os.WNOHANG)
+            if stopped == pid:
+                break
+            time.sleep(0.1)
+        else:
+            pytest.fail("Server did not stop after SIGTERM")
+        pid = None
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+        for worker in workers:
+            with pytest.raises(OSError):
+                os.kill(worker, 0)
+    finally:
+        if pid is not None:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
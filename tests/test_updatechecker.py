@@ -0,0 +1,132 @@
+""" Tests of the update check modes and the cache of server answers """
+import os
+
+import pytest
+
+import phenoai
+from phenoai import ainalyses
+from phenoai import exceptions
+from phenoai import updatechecker
+
+ANSWER = {"error": False, "update": False, "text": "up to date"}
+
+
+@pytest.fixture
+def queries(tmp_path, monkeypatch):
+    """ Replaces the query of the update server, recording the queries, and
+    uses an empty cache folder. Update checks are not turned off. """
+    monkeypatch.setenv("PHENOAI_CACHE", str(tmp_path / "cache"))
+    monkeypatch.delenv("PHENOAI_OFFLINE", raising=False)
+    monkeypatch.delenv("PHENOAI_UPDATE_CHECKS", raising=False)
+    calls = []
+
+    def query_server(target, extra_post_data=None):
+        calls.append((target, extra_post_data))
+        if target == "failing":
+            return {"error": True, "update": None, "text": "no connection",
+                    "failed": True}
+        return dict(ANSWER)
+
+    monkeypatch.setattr(updatechecker, "query_server", query_server)
+    return calls
+
+
+@pytest.fixture
+def ainalysis(ainalysis_folder):
+    """ AInalysis with a database ID, so that it can check for updates """
+    a = ainalyses.AInalysis(ainalysis_folder, load_estimator=False,
+                            check_updates=False)
+    a.configuration["uniquedbid"] = "test"
+    a.configuration["unique_db_id"] = "test"
+    return a
+
+
+def test_get_mode(monkeypatch):
+    """Test that the mode follows the argument, then the environment, and
+    that PHENOAI_OFFLINE overrides both."""
+    monkeypatch.delenv("PHENOAI_OFFLINE", raising=False)
+    monkeypatch.delenv("PHENOAI_UPDATE_CHECKS", raising=False)
+    assert updatechecker.get_mode() == "sync"
+    assert updatechecker.get_mode(True) == "sync"
+    assert updatechecker.get_mode(False) == "off"
+    assert updatechecker.get_mode("background") == "background"
+    monkeypatch.setenv("PHENOAI_UPDATE_CHECKS", "background")
+    assert updatechecker.get_mode() == "background"
+    assert updatechecker.get_mode("sync") == "sync"
+    with pytest.raises(exceptions.PhenoAIException):
+        updatechecker.get_mode("sometimes")
+    for value in ["1", "true", "YES"]:
+        monkeypatch.setenv("PHENOAI_OFFLINE", value)
+        assert updatechecker.get_mode(True) == "off"
+        assert updatechecker.get_mode("background") == "off"
+
+
+def test_offline_mode_skips_the_server(queries, ainalysis, monkeypatch):
+    """Test that no query is made when update checks are off."""
+    monkeypatch.setenv("PHENOAI_OFFLINE", "1")
+    phenoai.check_updates(True)
+    assert ainalysis.check_for_update(check_updates=True)[2] == \
+        "update checks are turned off"
+    monkeypatch.delenv("PHENOAI_OFFLINE")
+    ainalysis.check_for_update(check_updates=False)
+    phenoai.check_updates(False)
+    assert queries == []
+    ainalysis.check_for_update(check_updates=True)
+    assert queries == [("ainalysis", {"ainalysis": "test",
+                                      "current": ainalysis.configuration[
+                                          "ainalysisversion"]})]
+
+
+def test_answers_are_cached(queries, monkeypatch):
+    """Test that answers are taken from updates.json until they are older
+    than the TTL, and that failed queries are not cached."""
+    now = [1000.0]
+    monkeypatch.setattr(updatechecker.time, "time", lambda: now[0])
+    for _ in range(2):
+        assert updatechecker.cached_query_server("phenoai") == ANSWER
+        assert updatechecker.cached_query_server(
+            "ainalysis", {"ainalysis": "a"}) == ANSWER
+    assert len(queries) == 2
+    assert os.path.isfile(os.path.join(os.environ["PHENOAI_CACHE"],
+                                       "updates.json"))
+    # Other arguments are cached separately
+    updatechecker.cached_query_server("ainalysis", {"ainalysis": "b"})
+    assert len(queries) == 3
+    # Expired answers are queried again
+    now[0] += updatechecker.CACHE_TTL - 1
+    updatechecker.cached_query_server("phenoai")
+    assert len(queries) == 3
+    now[0] += 2
+    updatechecker.cached_query_server("phenoai")
+    assert len(queries) == 4
+    updatechecker.cached_query_server("phenoai", ttl=0)
+    assert len(queries) == 5
+    # Failures are not cached
+    for _ in range(2):
+        assert updatechecker.cached_query_server("failing")["failed"]
+    assert len(queries) == 7
+
+
+def test_check_in_background(queries):
+    """Test that background checks report the answer to the callback and
+    ignore errors."""
+    answers = []
+    thread = updatechecker.check_in_background(
+        updatechecker.check_ainalysis_update, ("test", 1),
+        lambda *answer: answers.append(answer))
+    assert thread.daemon
+    thread.join(10)
+    assert len(answers) == 1 and answers[0][:2] == (False, False)
+
+    def failing():
+        raise RuntimeError("no connection")
+
+    thread = updatechecker.check_in_background(
+        failing, callback=lambda *answer: answers.append(answer))
+    thread.join(10)
+    assert len(answers) == 1
+    # Without callback the answer is dropped
+    updatechecker.check_in_background(
+        updatechecker.check_phenoai_update).join(10)
+    assert len(answers) == 1
+    assert [target for target, _ in queries] == ["ainalysis", "phenoai"]
@@ -0,0 +1,185 @@
+""" Tests of the checksum functions in the utils module """
+import json
+import os
+import threading
+
+import pytest
+
+from phenoai import ainalyses
+from phenoai import exceptions
+from phenoai import utils
+
+
+@pytest.fixture
+def checksum_cache(tmp_path, monkeypatch):
+    """ Empty checksum cache in a temporary cache folder, counting the files
+    that are hashed """
+    monkeypatch.setenv("PHENOAI_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(utils, "_checksum_cache", None)
+    monkeypatch.setattr(utils, "_checksum_cache_new", set())
+    hashed = []
+    calculate = utils.calculate_file_checksum
+
+    def counting_checksum(filepath, format_checksum=True):
+        hashed.append(os.path.basename(filepath))
+        return calculate(filepath, format_checksum)
+
+    monkeypatch.setattr(utils, "calculate_file_checksum", counting_checksum)
+    return hashed
+
+
+def write(path, content, mtime_ns=None):
+    with open(path, "w") as f:
+        f.write(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def test_cached_file_checksum(tmp_path, checksum_cache):
+    """Test that cached checksums are used until the size or modification
+    time of the file changes."""
+    path = write(tmp_path / "a.txt", "abcd", 10**18)
+    expected = utils.calculate_file_checksum(path)
+    checksum_cache.clear()
+    assert utils.cached_file_checksum(path) == expected
+    assert utils.cached_file_checksum(path) == expected
+    assert checksum_cache == ["a.txt"]
+    # Same size, other modification time
+    write(path, "efgh", 2 * 10**18)
+    assert utils.cached_file_checksum(path) == \
+        utils.calculate_file_checksum(path)
+    assert checksum_cache == ["a.txt"] * 3
+    # Same modification time, other size
+    write(path, "efghi", 2 * 10**18)
+    assert utils.cached_file_checksum(path, False) == \
+        utils.calculate_file_checksum(path, False)
+    assert checksum_cache == ["a.txt"] * 5
+
+
+def test_flush_checksum_cache(tmp_path, checksum_cache, monkeypatch):
+    """Test that flushing keeps the entries written by other processes and
+    that a new process uses the flushed entries."""
+    a = write(tmp_path / "a.txt", "a")
+    b = write(tmp_path / "b.txt", "b")
+    cache_file = os.path.join(utils.get_cache_folder(), "checksums.json")
+    utils.cached_file_checksum(a)
+    utils.flush_checksum_cache()
+    # Another process adds an entry after this process read the file
+    utils.cached_file_checksum(b)
+    with open(cache_file) as f:
+        entries = json.load(f)
+    entries["/other/process.txt"] = [1, 2, 3, 4]
+    with open(cache_file, "w") as f:
+        json.dump(entries, f)
+    utils.flush_checksum_cache()
+    with open(cache_file) as f:
+        entries = json.load(f)
+    assert sorted(entries) == sorted(["/other/process.txt",
+                                      os.path.abspath(a),
+                                      os.path.abspath(b)])
+    # A new process takes the checksums from the file
+    monkeypatch.setattr(utils, "_checksum_cache", None)
+    checksum_cache.clear()
+    utils.cached_file_checksum(a)
+    utils.cached_file_checksum(b)
+    assert checksum_cache == []
+
+
+def test_get_checksum_policy(monkeypatch):
+    """Test that the policy is taken from the argument, then from the
+    environment, defaulting to "cached"."""
+    monkeypatch.delenv("PHENOAI_CHECKSUM_VALIDATION", raising=False)
+    assert ainalyses.get_checksum_policy() == "cached"
+    monkeypatch.setenv("PHENOAI_CHECKSUM_VALIDATION", "lazy")
+    assert ainalyses.get_checksum_policy() == "lazy"
+    assert ainalyses.get_checksum_policy("full") == "full"
+    with pytest.raises(exceptions.AInalysisException):
+        ainalyses.get_checksum_policy("sometimes")
+    monkeypatch.setenv("PHENOAI_CHECKSUM_VALIDATION", "never")
+    with pytest.raises(exceptions.AInalysisException):
+        ainalyses.get_checksum_policy()
+
+
+@pytest.mark.parametrize("policy, on_load, on_run", [
+    ("full", [False], []),
+    ("cached", [True], []),
+    ("lazy", [], [True]),
+    ("background", [True], []),
+    ("trusted", [], []),
+])
+def test_checksum_validation_policies(ainalysis_folder, monkeypatch, policy,
+                                      on_load, on_run):
+    """Test when and with or without cache the checksums of an AInalysis
+    are validated under every policy."""
+    calls = []
+    done = threading.Event()
+    validate_checksum = ainalyses.AInalysisConfiguration.validate_checksum
+
+    def recording_validate_checksum(self, use_cache=False):
+        calls.append(use_cache)
+        result = validate_checksum(self, use_cache)
+        done.set()
+        return result
+
+    monkeypatch.setattr(ainalyses.AInalysisConfiguration,
+                        "validate_checksum", recording_validate_checksum)
+    ainalysis = ainalyses.AInalysis(ainalysis_folder, load_estimator=False,
+                                    checksum_validation=policy)
+    if policy == "background":
+        assert done.wait(10)
+    assert calls == on_load
+    for _ in range(2):
+        assert ainalysis.can_run()
+    assert calls == on_load + on_run
+
+
+def folder_checksum_per_file(folderpath, recursive=True):
+    """ Calculates the checksum of a folder file by file, as
+    calculate_folder_checksum did before files were hashed concurrently """
+    crcvalue = 0
+    for root, subdirs, files in os.walk(folderpath):
+        for f in files:
+            if f != 'checksums.sfv':
+                crcvalue += utils.calculate_file_checksum(
+                    "{}/{}".format(root, f), False)
+        if recursive:
+            for s in subdirs:
+                crcvalue += folder_checksum_per_file(folderpath + "/" + s)
+    return crcvalue
+
+
+@pytest.fixture
+def checksum_folder(tmp_path):
+    """ Folder with files in nested subfolders and a checksums.sfv file """
+    folder = tmp_path / "folder"
+    for sub in ["", "a", "a/b", "a/b/c", "d"]:
+        (folder / sub).mkdir(exist_ok=True)
+        for i in range(3):
+            write(folder / sub / "file{}.txt".format(i),
+                  "{} {}\n".format(sub, i) * (i * 1000 + 1))
+    write(folder / "checksums.sfv", "ignored")
+    write(folder / "a" / "checksums.sfv", "ignored")
+    return str(folder)
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+@pytest.mark.parametrize("recursive", [True, False])
+def test_calculate_folder_checksum(checksum_folder, checksum_cache,
+                                   recursive, use_cache):
+    """Test that hashing files concurrently gives the checksum of a serial
+    calculation and of the file by file calculation, reading every file
+    once."""
+    expected = folder_checksum_per_file(checksum_folder, recursive)
+    checksum_cache.clear()
+    checksums = [utils.calculate_folder_checksum(
+        checksum_folder, False, recursive, use_cache, n_workers)
+        for n_workers in [1, 4]]
+    assert checksums == [expected, expected]
+    # Every file is hashed once per calculation, or once with the cache
+    assert len(checksum_cache) == 15 if use_cache else 2 * 15
+    assert sorted(set(checksum_cache)) == \
+        ["file{}.txt".format(i) for i in range(3)]
+    assert utils.calculate_folder_checksum(
+        checksum_folder, recursive=recursive, use_cache=use_cache,
+        n_workers=4) == utils.convert_to_hex(expected)